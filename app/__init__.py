@@ -3,11 +3,17 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 
-db = SQLAlchemy()
+from .replica import SesionEnrutada
+
+db = SQLAlchemy(session_options={'class_': SesionEnrutada})
 login_manager = LoginManager()
 
-def create_app():
-    """Crea y configura la aplicación Flask."""
+def create_app(config=None):
+    """Crea y configura la aplicación Flask.
+
+    `config` permite sobrescribir valores de configuración, por ejemplo para
+    apuntar a una base de datos temporal en benchmarks.
+    """
     app = Flask(__name__)
     # Configuración segura usando variables de entorno
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'clave-secreta')
@@ -16,20 +22,62 @@ def create_app():
         'DATABASE_URL',
         f"sqlite:///{os.path.join(basedir, 'inventario.db')}"
     )
+    # Réplica opcional para las lecturas de reportes y listados
+    if os.environ.get('REPLICA_DATABASE_URL'):
+        app.config['REPLICA_DATABASE_URI'] = os.environ['REPLICA_DATABASE_URL']
+    # Calentar cada worker al crearlo (ver app/arranque.py)
+    if os.environ.get('CALENTAR_AL_INICIAR'):
+        app.config['CALENTAR_AL_INICIAR'] = os.environ['CALENTAR_AL_INICIAR'] not in ('0', 'false')
+    # Con varios workers las cachés se invalidan por archivos compartidos
+    # (ver app/catalogo.py); gunicorn toma la cantidad de WEB_CONCURRENCY
+    if os.environ.get('CATALOGO_BACKEND'):
+        app.config['CATALOGO_BACKEND'] = os.environ['CATALOGO_BACKEND']
+    elif os.environ.get('WEB_CONCURRENCY', '').isdigit() and int(os.environ['WEB_CONCURRENCY']) > 1:
+        app.config['CATALOGO_BACKEND'] = 'archivo'
+    if config:
+        app.config.update(config)
+
+    # Pool y PRAGMAs según el motor (ver app/motor.py)
+    from . import motor, replica
+    replica.configurar(app.config)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        **motor.opciones(app.config['SQLALCHEMY_DATABASE_URI'], app.config),
+        **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}),
+    }
 
     db.init_app(app)
+    motor.init_app(app, db)
+    replica.init_app(app, db)
     login_manager.init_app(app)
+
+    from . import arranque, cache_reportes, cache_usuarios, catalogo, metricas
+    arranque.init_app(app)
+    catalogo.init_app(app)
+    cache_reportes.init_app(app)
+    cache_usuarios.init_app(app)
+    metricas.init_app(app)
     login_manager.login_view = 'main.login'
 
     # Registro de blueprints
     from .routes import main
     app.register_blueprint(main)
+    from .api import api
+    app.register_blueprint(api)
 
-    # Importa modelos después de inicializar la app
-    from .models import Usuario
+    # Comandos de mantenimiento (flask reconstruir-resumenes, ...)
+    from .comandos import registrar_comandos
+    registrar_comandos(app)
 
     @login_manager.user_loader
     def load_user(user_id):
-        return Usuario.query.get(int(user_id))
+        # Instantánea cacheada; devuelve None si el usuario fue desactivado
+        return cache_usuarios.cargar(user_id)
+
+    if app.config.get('CALENTAR_AL_INICIAR'):
+        try:
+            arranque.calentar(app)
+        except Exception as e:
+            # Un worker frío sigue sirviendo; solo tarda más en las primeras peticiones
+            app.logger.warning(f'No se pudo calentar la aplicación: {e}')
 
     return app
\ No newline at end of file
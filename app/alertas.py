@@ -0,0 +1,115 @@
+from flask import current_app, has_app_context
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import joinedload
+
+from app import cambios, db
+from app.models import EventoStock, Producto
+
+# Alertas de stock bajo.
+#
+# El estado se lee de la columna indexada `Producto.deficit`. Además, cada
+# camino que modifica stock informa los valores anteriores y nuevos con
+# `detectar`; si un producto cruza su umbral se agrega un evento a la tabla
+# eventos_stock en la misma transacción. Así el evento aparece al confirmar
+# y desaparece con un rollback, y cualquier worker lo ve: la página de
+# alertas consulta /stock/alertas/feed con el último id que recibió.
+
+MAX_EVENTOS = 500
+
+
+def margen():
+    return current_app.config.get('MARGEN_STOCK', 2)
+
+
+def productos_bajos():
+    """Productos con stock en o por debajo de stock_minimo + MARGEN_STOCK."""
+    return (
+        Producto.query
+        .options(joinedload(Producto.categoria))
+        .filter(Producto.deficit >= -margen())
+        .order_by(Producto.deficit.desc(), Producto.id)
+        .all()
+    )
+
+
+def _es_bajo(stock, stock_minimo, margen_):
+    return stock <= stock_minimo + margen_
+
+
+def detectar(session, cambios):
+    """Registra los productos que cruzan su umbral en la transacción actual.
+
+    `cambios` es un iterable de tuplas
+    (id, nombre, stock_antes, minimo_antes, stock_despues, minimo_despues).
+    Los eventos se insertan sin hacer commit: se confirman o descartan con
+    la transacción del llamador. Solo se conservan los últimos MAX_EVENTOS.
+    """
+    margen_ = margen()
+    eventos = []
+    for id_, nombre, stock_antes, minimo_antes, stock_despues, minimo_despues in cambios:
+        antes = _es_bajo(stock_antes, minimo_antes, margen_)
+        despues = _es_bajo(stock_despues, minimo_despues, margen_)
+        if antes != despues:
+            eventos.append({
+                'tipo': 'stock_bajo' if despues else 'stock_normal',
+                'producto_id': id_,
+                'nombre': nombre,
+                'stock': stock_despues,
+                'stock_minimo': minimo_despues,
+            })
+    if not eventos:
+        return
+
+    session.execute(insert(EventoStock), eventos)
+    ultimo = session.scalar(select(func.max(EventoStock.id)))
+    if ultimo > MAX_EVENTOS:
+        session.execute(delete(EventoStock).where(EventoStock.id <= ultimo - MAX_EVENTOS))
+    session.info.setdefault('alertas_pendientes', []).extend(eventos)
+
+
+def olvidar(producto_id):
+    """Borra los eventos de un producto que se va a eliminar. No hace commit."""
+    db.session.execute(delete(EventoStock).where(EventoStock.producto_id == producto_id),
+                       execution_options={'synchronize_session': False})
+
+
+def _json(evento):
+    return {
+        'id': evento.id,
+        'fecha': evento.fecha.isoformat(timespec='seconds'),
+        'tipo': evento.tipo,
+        'producto_id': evento.producto_id,
+        'nombre': evento.nombre,
+        'stock': evento.stock,
+        'stock_minimo': evento.stock_minimo,
+    }
+
+
+def eventos_desde(ultimo_id=0):
+    """Eventos con id mayor que `ultimo_id`, del más antiguo al más reciente."""
+    consulta = (
+        select(EventoStock)
+        .where(EventoStock.id > ultimo_id)
+        .order_by(EventoStock.id)
+        .limit(MAX_EVENTOS)
+    )
+    return [_json(e) for e in db.session.scalars(consulta)]
+
+
+def ultimo_id():
+    """Id del evento más reciente, o 0 si no hay ninguno."""
+    return db.session.scalar(select(func.max(EventoStock.id))) or 0
+
+
+@cambios.al_confirmar
+def _despues_de_commit(session, tablas):
+    for evento in session.info.pop('alertas_pendientes', []):
+        if has_app_context():
+            current_app.logger.info(
+                f"Alerta {evento['tipo']}: {evento['nombre']} (stock {evento['stock']})"
+            )
+
+
+@cambios.al_deshacer
+def _despues_de_rollback(session):
+    session.info.pop('alertas_pendientes', None)
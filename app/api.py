@@ -0,0 +1,289 @@
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+
+from flask import Blueprint, current_app, jsonify, request, url_for
+from flask_login import current_user, login_user, logout_user
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from werkzeug.security import check_password_hash
+
+from app import db, servicio_ventas
+from app.consultas import venta_completa
+from app.models import Categoria, Producto, Usuario
+from app.replica import usar_replica
+
+# API JSON para las terminales de mostrador.
+#
+# Usa la misma sesión de Flask-Login que las páginas (POST /api/v1/sesion
+# para iniciarla). Las lecturas de productos consultan solo los ids pedidos
+# en la base principal (no la caché del catálogo, que en otro worker puede
+# estar atrasada) y todas las respuestas GET llevan ETag, así una terminal
+# puede consultar el stock periódicamente y recibir 304 mientras nada cambió.
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+MAX_IDS = 500
+MAX_CLAVE = 64
+CAMPOS_STOCK = ['id', 'precio', 'stock']
+
+
+def _error(mensaje, estado):
+    return jsonify(error=mensaje), estado
+
+
+def requiere_rol(*roles):
+    """Como login_required + rol_requerido, pero responde JSON 401/403."""
+    def decorador(f):
+        @wraps(f)
+        def decorada(*args, **kwargs):
+            if not current_user.is_authenticated:
+                return _error('Sesión requerida.', 401)
+            if current_user.rol not in roles:
+                return _error('Acceso no autorizado.', 403)
+            return f(*args, **kwargs)
+        return decorada
+    return decorador
+
+
+def _condicional(datos, estado=200):
+    """Respuesta JSON con ETag; devuelve 304 si el cliente ya la tiene."""
+    respuesta = jsonify(datos)
+    respuesta.status_code = estado
+    respuesta.add_etag()
+    return respuesta.make_conditional(request)
+
+
+def _ids():
+    """Lee ?ids=1,2,3 (o ids repetidos). Devuelve (ids, error)."""
+    crudos = ','.join(request.args.getlist('ids')).split(',')
+    try:
+        ids = list(dict.fromkeys(int(i) for i in crudos if i.strip()))
+    except ValueError:
+        return None, _error('ids debe ser una lista de enteros.', 400)
+    if not ids:
+        return None, _error('Indicar al menos un id en ?ids=.', 400)
+    if len(ids) > MAX_IDS:
+        return None, _error(f'Máximo {MAX_IDS} ids por consulta.', 400)
+    return ids, None
+
+
+def _por_id(consulta, ids):
+    """Filas de `consulta` (la primera columna es el id) en el orden de `ids`."""
+    por_id = {fila[0]: fila for fila in db.session.execute(consulta)}
+    return [por_id[i] for i in ids if i in por_id]
+
+
+def _venta_json(venta):
+    return {
+        'id': venta.id,
+        'fecha': venta.fecha.isoformat(timespec='seconds'),
+        'total': venta.total,
+        'vendedor': {'id': venta.vendedor.id, 'nombre': venta.vendedor.nombre},
+        'lineas': [
+            {
+                'producto_id': d.producto_id,
+                'nombre': d.producto.nombre,
+                'cantidad': d.cantidad,
+                'subtotal': d.subtotal,
+            }
+            for d in venta.detalles
+        ],
+    }
+
+
+@api.route('/sesion', methods=['POST'])
+def iniciar_sesion():
+    """Inicia sesión con {"username": ..., "password": ...}."""
+    datos = request.get_json(silent=True) or {}
+    usuario = Usuario.query.filter_by(username=datos.get('username', '')).first()
+    if not usuario or not check_password_hash(usuario.password, datos.get('password', '')):
+        return _error('Credenciales inválidas.', 401)
+    if usuario.estado != 'activo':
+        return _error('Cuenta inactiva.', 403)
+    login_user(usuario)
+    return jsonify(id=usuario.id, nombre=usuario.nombre, rol=usuario.rol)
+
+
+@api.route('/sesion', methods=['DELETE'])
+def cerrar_sesion():
+    logout_user()
+    return '', 204
+
+
+@api.route('/productos')
+@requiere_rol('admin', 'vendedor')
+def productos():
+    """Productos pedidos en ?ids=, con su categoría. Los ids inexistentes se omiten."""
+    ids, error = _ids()
+    if error:
+        return error
+    consulta = (
+        select(Producto.id, Producto.nombre, Producto.precio, Producto.stock,
+               Producto.stock_minimo, Producto.categoria_id, Categoria.nombre.label('categoria'))
+        .join(Producto.categoria)
+        .where(Producto.id.in_(ids))
+    )
+    return _condicional({'productos': [fila._asdict() for fila in _por_id(consulta, ids)]})
+
+
+@api.route('/productos/stock')
+@requiere_rol('admin', 'vendedor')
+def stock():
+    """Precio y stock de los productos de ?ids=, en filas compactas [id, precio, stock]."""
+    ids, error = _ids()
+    if error:
+        return error
+    return _condicional({
+        'campos': CAMPOS_STOCK,
+        'filas': [list(fila) for fila in _por_id(
+            select(Producto.id, Producto.precio, Producto.stock).where(Producto.id.in_(ids)), ids
+        )],
+    })
+
+
+def _leer_venta(datos, clave_obligatoria=False):
+    """Valida una venta enviada por una terminal. Devuelve (venta, error).
+
+    La venta resultante es un dict con `clave`, `cantidades` y `fecha`,
+    listo para el servicio de ventas.
+    """
+    if not isinstance(datos, dict) or not isinstance(datos.get('lineas'), list) or not datos['lineas']:
+        return None, 'Se esperaba {"lineas": [{"producto_id": ..., "cantidad": ...}]}.'
+
+    clave = datos.get('clave')
+    if clave is None and clave_obligatoria:
+        return None, 'Cada venta necesita una clave de idempotencia.'
+    if clave is not None and (not isinstance(clave, str) or not 0 < len(clave) <= MAX_CLAVE):
+        return None, f'La clave debe ser un texto de hasta {MAX_CLAVE} caracteres.'
+
+    fecha = None
+    if datos.get('fecha'):
+        try:
+            fecha = datetime.fromisoformat(datos['fecha'])
+        except (TypeError, ValueError):
+            return None, 'fecha debe estar en formato ISO 8601.'
+        # Las fechas se guardan en UTC sin zona, como CURRENT_TIMESTAMP; una
+        # fecha sin zona se toma como UTC
+        if fecha.tzinfo is not None:
+            fecha = fecha.astimezone(timezone.utc).replace(tzinfo=None)
+        if fecha > datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(days=1):
+            return None, 'La fecha de la venta está en el futuro.'
+
+    cantidades = {}
+    for linea in datos['lineas']:
+        try:
+            producto_id = int(linea['producto_id'])
+            cantidad = int(linea['cantidad'])
+        except (KeyError, TypeError, ValueError):
+            return None, 'Cada línea necesita producto_id y cantidad enteros.'
+        if cantidad <= 0:
+            return None, 'La cantidad de cada línea debe ser mayor a cero.'
+        cantidades[producto_id] = cantidades.get(producto_id, 0) + cantidad
+
+    return {'clave': clave, 'cantidades': cantidades, 'fecha': fecha}, None
+
+
+def _respuesta_venta(venta_id, estado):
+    venta = venta_completa(venta_id).populate_existing().one()
+    respuesta = jsonify(_venta_json(venta))
+    respuesta.status_code = estado
+    respuesta.headers['Location'] = url_for('api.venta', id=venta.id)
+    return respuesta
+
+
+@api.route('/ventas', methods=['POST'])
+@requiere_rol('admin', 'vendedor')
+def registrar_venta():
+    """Registra una venta: {"clave": ..., "lineas": [{"producto_id": 1, "cantidad": 2}, ...]}.
+
+    Usa el mismo servicio que el formulario, así que valida y descuenta el
+    stock de la misma forma. Responde 201 con la venta creada; si la clave
+    opcional ya se usó, 200 con la venta original sin volver a registrarla.
+    """
+    datos, error = _leer_venta(request.get_json(silent=True))
+    if error:
+        return _error(error, 400)
+
+    if datos['clave']:
+        existente = servicio_ventas.buscar_por_clave(datos['clave'])
+        if existente is not None:
+            return _respuesta_venta(existente, 200)
+
+    try:
+        venta = servicio_ventas.registrar_venta(current_user.id, datos['cantidades'],
+                                                clave=datos['clave'], fecha=datos['fecha'])
+        db.session.commit()
+    except servicio_ventas.VentaError as e:
+        db.session.rollback()
+        return _error(str(e), 409)
+    except IntegrityError:
+        # La misma clave llegó por otra petición en paralelo
+        db.session.rollback()
+        existente = servicio_ventas.buscar_por_clave(datos['clave'])
+        if existente is None:
+            raise
+        return _respuesta_venta(existente, 200)
+
+    return _respuesta_venta(venta.id, 201)
+
+
+@api.route('/ventas/lote', methods=['POST'])
+@requiere_rol('admin', 'vendedor')
+def registrar_lote():
+    """Sincroniza ventas encoladas sin conexión: {"ventas": [{"clave": ..., "lineas": [...], "fecha": ...}]}.
+
+    Cada venta necesita su clave de idempotencia, así reenviar el mismo lote
+    es seguro. Se procesan en tramos de API_VENTAS_POR_TRANSACCION ventas,
+    cada tramo en una transacción. Responde un resultado por venta, en el
+    mismo orden.
+    """
+    cuerpo = request.get_json(silent=True)
+    crudas = cuerpo.get('ventas') if isinstance(cuerpo, dict) else None
+    if not isinstance(crudas, list) or not crudas:
+        return _error('Se esperaba {"ventas": [...]}.', 400)
+    maximo = current_app.config.get('API_MAX_VENTAS_LOTE', 1000)
+    if len(crudas) > maximo:
+        return _error(f'Máximo {maximo} ventas por lote.', 413)
+
+    resultados = [None] * len(crudas)
+    validas = []
+    for posicion, cruda in enumerate(crudas):
+        datos, error = _leer_venta(cruda, clave_obligatoria=True)
+        if error:
+            clave = cruda.get('clave') if isinstance(cruda, dict) else None
+            resultados[posicion] = {'clave': clave, 'estado': 'error', 'error': error}
+        else:
+            validas.append((posicion, datos))
+
+    tramo = current_app.config.get('API_VENTAS_POR_TRANSACCION', 50)
+    for inicio in range(0, len(validas), tramo):
+        parte = validas[inicio:inicio + tramo]
+        try:
+            procesadas = servicio_ventas.registrar_tramo(current_user.id, [d for _, d in parte])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            current_app.logger.exception('Error al sincronizar un tramo de ventas')
+            procesadas = [
+                {'clave': d['clave'], 'estado': 'error', 'error': 'Error interno; reintentar.'}
+                for _, d in parte
+            ]
+        for (posicion, _), resultado in zip(parte, procesadas):
+            resultados[posicion] = resultado
+
+    return jsonify(
+        resultados=resultados,
+        **{estado: sum(r['estado'] == estado for r in resultados)
+           for estado in ('creada', 'duplicada', 'error')}
+    )
+
+
+@api.route('/ventas/<int:id>')
+@requiere_rol('admin', 'vendedor')
+@usar_replica
+def venta(id):
+    """Una venta con sus líneas. Un vendedor solo puede ver las propias."""
+    venta = venta_completa(id).first()
+    if venta is None or (current_user.rol == 'vendedor' and venta.usuario_id != current_user.id):
+        return _error('Venta no encontrada.', 404)
+    return _condicional(_venta_json(venta))
@@ -0,0 +1,329 @@
+import csv
+import gzip
+import hashlib
+import io
+import os
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from itertools import chain
+
+from flask import current_app
+from sqlalchemy import delete, func, select, update
+
+from app import db
+from app.consultas import como_fecha_hora, en_rango, inicio_de_mes, mes
+from app.models import (
+    DetalleVenta, MesArchivado, MovimientoStock, Producto, ResumenVentaUsuario, Usuario, Venta
+)
+
+# Archivo de ventas por mes.
+#
+# Los meses cerrados más viejos que ARCHIVO_MESES se pasan a un CSV
+# comprimido por mes (una fila por línea de venta, con el nombre del
+# vendedor y del producto de ese momento) y se borran de `ventas` y
+# `detalle_venta`. Quedan en la base los resúmenes diarios, que siguen
+# alimentando los reportes, y una fila en `meses_archivados` con el
+# archivo, su SHA-256 y los totales del mes para verificarlo.
+#
+# Las consultas por rango de fechas (ventas_en_rango, lineas_en_rango)
+# leen los archivos de los meses archivados que toca el rango y los
+# combinan con las tablas, así que las rutas no necesitan saber dónde
+# está cada venta.
+
+COLUMNAS = [
+    'venta_id', 'fecha', 'usuario_id', 'vendedor', 'total_venta', 'clave',
+    'detalle_id', 'producto_id', 'producto', 'cantidad', 'subtotal',
+]
+FILAS_POR_LOTE = 1000
+
+VendedorArchivado = namedtuple('VendedorArchivado', 'id nombre')
+VentaArchivada = namedtuple('VentaArchivada', 'id fecha usuario_id vendedor total archivada')
+Linea = namedtuple('Linea', COLUMNAS)
+
+
+class ArchivoError(Exception):
+    """El archivo de un mes no coincide con los datos que debería contener."""
+
+
+class _Totales:
+    """Ventas, líneas, unidades e importe de un conjunto de líneas."""
+
+    def __init__(self):
+        self.ids = set()
+        self.lineas = 0
+        self.unidades = 0
+        self.total = Decimal(0)
+
+    def sumar(self, linea):
+        if linea.venta_id not in self.ids:
+            self.ids.add(linea.venta_id)
+            self.total += linea.total_venta
+        if linea.detalle_id is not None:
+            self.lineas += 1
+            self.unidades += linea.cantidad
+
+    def como_dict(self):
+        return {'ventas': len(self.ids), 'lineas': self.lineas,
+                'unidades': self.unidades, 'total': _centavos(self.total)}
+
+
+def _directorio():
+    return current_app.config.get('ARCHIVO_VENTAS_DIR') or os.path.join(
+        current_app.instance_path, 'archivo_ventas'
+    )
+
+
+def _rango_mes(mes_):
+    inicio = datetime.strptime(mes_, '%Y-%m')
+    return inicio, como_fecha_hora(inicio_de_mes(inicio, meses_atras=-1))
+
+
+def _centavos(valor):
+    return Decimal(str(valor)).quantize(Decimal('0.01'))
+
+
+def _opcional(valor, tipo):
+    return tipo(valor) if valor != '' else None
+
+
+def _linea_desde_csv(fila):
+    (venta_id, fecha, usuario_id, vendedor, total, clave,
+     detalle_id, producto_id, producto, cantidad, subtotal) = fila
+    return Linea(
+        int(venta_id), datetime.fromisoformat(fecha), int(usuario_id), vendedor, Decimal(total),
+        clave or None, _opcional(detalle_id, int), _opcional(producto_id, int), producto,
+        _opcional(cantidad, int), _opcional(subtotal, Decimal),
+    )
+
+
+def _leer(archivo):
+    """Líneas del archivo de un mes, en el orden en que se guardaron."""
+    with gzip.open(os.path.join(_directorio(), archivo), 'rt', encoding='utf-8', newline='') as texto:
+        lector = csv.reader(texto)
+        next(lector)
+        for fila in lector:
+            yield _linea_desde_csv(fila)
+
+
+def _lineas_en_tablas(inicio, fin):
+    consulta = (
+        db.session.query(
+            Venta.id, Venta.fecha, Venta.usuario_id, Usuario.nombre, Venta.total,
+            Venta.clave_idempotencia, DetalleVenta.id, DetalleVenta.producto_id,
+            Producto.nombre, DetalleVenta.cantidad, DetalleVenta.subtotal,
+        )
+        .join(Usuario, Venta.usuario_id == Usuario.id)
+        .outerjoin(DetalleVenta, DetalleVenta.venta_id == Venta.id)
+        .outerjoin(Producto, DetalleVenta.producto_id == Producto.id)
+        .filter(en_rango(Venta.fecha, inicio, fin))
+        .order_by(Venta.fecha, Venta.id, DetalleVenta.id)
+        .yield_per(FILAS_POR_LOTE)
+    )
+    for fila in consulta:
+        yield Linea(*fila)
+
+
+def _escribir(mes_, lineas):
+    """Escribe el archivo del mes y devuelve (nombre, sha256, totales).
+
+    El nombre lleva parte del hash, así que volver a archivar un mes nunca
+    pisa el archivo al que apunta la fila actual de meses_archivados.
+    """
+    directorio = _directorio()
+    os.makedirs(directorio, exist_ok=True)
+    temporal = os.path.join(directorio, f'{mes_}.{os.getpid()}.tmp')
+    totales = _Totales()
+
+    # mtime=0: el mismo contenido produce siempre el mismo archivo
+    with open(temporal, 'wb') as crudo, \
+            gzip.GzipFile(fileobj=crudo, mode='wb', mtime=0) as comprimido, \
+            io.TextIOWrapper(comprimido, encoding='utf-8', newline='') as texto:
+        escritor = csv.writer(texto)
+        escritor.writerow(COLUMNAS)
+        for linea in lineas:
+            totales.sumar(linea)
+            escritor.writerow([
+                '' if v is None else v.isoformat(sep=' ') if isinstance(v, datetime) else v
+                for v in linea
+            ])
+
+    sha = hashlib.sha256()
+    with open(temporal, 'rb') as archivo:
+        for bloque in iter(lambda: archivo.read(1024 * 1024), b''):
+            sha.update(bloque)
+    nombre = f'{mes_}-{sha.hexdigest()[:12]}.csv.gz'
+    os.replace(temporal, os.path.join(directorio, nombre))
+    return nombre, sha.hexdigest(), totales
+
+
+def _totales_archivo(archivo):
+    totales = _Totales()
+    for linea in _leer(archivo):
+        totales.sumar(linea)
+    return totales.como_dict()
+
+
+def meses_pendientes(meses, hoy=None):
+    """Meses ('YYYY-MM') con ventas en las tablas anteriores a los últimos `meses` meses."""
+    limite = como_fecha_hora(inicio_de_mes(hoy or date.today(), meses_atras=meses - 1))
+    consulta = (
+        db.session.query(mes(Venta.fecha).label('mes'))
+        .filter(Venta.fecha < limite)
+        .group_by('mes')
+        .order_by('mes')
+    )
+    return [m for (m,) in consulta]
+
+
+def archivar_mes(mes_):
+    """Pasa las ventas de `mes_` a su archivo y las borra de las tablas.
+
+    Si el mes ya estaba archivado (por ventas que llegaron tarde, por
+    ejemplo desde una terminal sin conexión) se reescribe el archivo con
+    las líneas anteriores más las nuevas. El archivo se relee y se compara
+    contra las tablas antes de borrar nada. No hace commit: devuelve
+    (MesArchivado, archivo anterior o None) y el archivo anterior puede
+    borrarse con `descartar` después del commit.
+    """
+    inicio, fin = _rango_mes(mes_)
+    previo = db.session.get(MesArchivado, mes_)
+
+    lineas = _lineas_en_tablas(inicio, fin)
+    if previo is not None:
+        lineas = sorted(
+            chain(_leer(previo.archivo), lineas),
+            key=lambda l: (l.fecha, l.venta_id, l.detalle_id or 0),
+        )
+    nombre, sha, totales = _escribir(mes_, lineas)
+
+    esperado = _Totales()
+    for linea in chain(_leer(previo.archivo) if previo else (), _lineas_en_tablas(inicio, fin)):
+        esperado.sumar(linea)
+    if _totales_archivo(nombre) != esperado.como_dict() or totales.como_dict() != esperado.como_dict():
+        descartar(nombre)
+        raise ArchivoError(f'El archivo de {mes_} no coincide con las ventas del mes.')
+
+    ids = select(Venta.id).where(en_rango(Venta.fecha, inicio, fin))
+    sin_sincronizar = {'synchronize_session': False}
+    db.session.execute(
+        update(MovimientoStock).where(MovimientoStock.venta_id.in_(ids)).values(venta_id=None),
+        execution_options=sin_sincronizar,
+    )
+    db.session.execute(delete(DetalleVenta).where(DetalleVenta.venta_id.in_(ids)),
+                       execution_options=sin_sincronizar)
+    db.session.execute(delete(Venta).where(en_rango(Venta.fecha, inicio, fin)),
+                       execution_options=sin_sincronizar)
+
+    anterior = previo.archivo if previo is not None and previo.archivo != nombre else None
+    if previo is None:
+        previo = MesArchivado(mes=mes_)
+        db.session.add(previo)
+    previo.archivo = nombre
+    previo.sha256 = sha
+    previo.fecha = datetime.now()
+    for campo, valor in totales.como_dict().items():
+        setattr(previo, campo, valor)
+    return previo, anterior
+
+
+def descartar(archivo):
+    """Borra un archivo que ya no está referenciado."""
+    if archivo:
+        try:
+            os.remove(os.path.join(_directorio(), archivo))
+        except FileNotFoundError:
+            pass
+
+
+def hasta():
+    """Inicio del mes siguiente al último archivado, o None si no hay ninguno."""
+    ultimo = db.session.query(func.max(MesArchivado.mes)).scalar()
+    return _rango_mes(ultimo)[1] if ultimo else None
+
+
+def _meses_en_rango(inicio, fin):
+    consulta = MesArchivado.query.order_by(MesArchivado.mes)
+    if inicio is not None:
+        consulta = consulta.filter(MesArchivado.mes >= inicio.strftime('%Y-%m'))
+    if fin is not None:
+        consulta = consulta.filter(MesArchivado.mes <= (fin - timedelta(microseconds=1)).strftime('%Y-%m'))
+    return consulta.all()
+
+
+def firma(inicio, fin):
+    """Meses archivados del rango con su hash, para claves de caché."""
+    return [[m.mes, m.sha256] for m in _meses_en_rango(inicio, fin)]
+
+
+def lineas_en_rango(inicio, fin):
+    """Líneas archivadas con fecha en [inicio, fin), de la más vieja a la más nueva."""
+    for archivado in _meses_en_rango(inicio, fin):
+        for linea in _leer(archivado.archivo):
+            if (inicio is None or linea.fecha >= inicio) and (fin is None or linea.fecha < fin):
+                yield linea
+
+
+def ventas_en_rango(inicio, fin):
+    """Ventas con fecha en [inicio, fin), de las tablas y de los meses archivados.
+
+    Las archivadas son VentaArchivada (id, fecha, vendedor.nombre, total)
+    con `archivada=True`; el resto, instancias de Venta. Ordenadas por fecha.
+    """
+    archivadas = {}
+    for linea in lineas_en_rango(inicio, fin):
+        if linea.venta_id not in archivadas:
+            archivadas[linea.venta_id] = VentaArchivada(
+                linea.venta_id, linea.fecha, linea.usuario_id,
+                VendedorArchivado(linea.usuario_id, linea.vendedor), linea.total_venta, True,
+            )
+
+    ventas = Venta.query.filter(en_rango(Venta.fecha, inicio, fin)).order_by(Venta.fecha).all()
+    if not archivadas:
+        return ventas
+    return sorted(chain(archivadas.values(), ventas), key=lambda v: (v.fecha, v.id))
+
+
+def verificar():
+    """Comprueba cada mes archivado. Devuelve una lista de problemas (vacía si todo está bien).
+
+    Para cada mes: el archivo existe y su SHA-256 coincide, sus totales
+    coinciden con los guardados y los resúmenes diarios del mes suman lo
+    archivado más lo que todavía esté en las tablas.
+    """
+    problemas = []
+    for archivado in MesArchivado.query.order_by(MesArchivado.mes):
+        ruta = os.path.join(_directorio(), archivado.archivo)
+        if not os.path.exists(ruta):
+            problemas.append(f'{archivado.mes}: falta el archivo {archivado.archivo}')
+            continue
+
+        sha = hashlib.sha256()
+        with open(ruta, 'rb') as archivo:
+            for bloque in iter(lambda: archivo.read(1024 * 1024), b''):
+                sha.update(bloque)
+        if sha.hexdigest() != archivado.sha256:
+            problemas.append(f'{archivado.mes}: el SHA-256 de {archivado.archivo} no coincide')
+            continue
+
+        guardados = {'ventas': archivado.ventas, 'lineas': archivado.lineas,
+                     'unidades': archivado.unidades, 'total': _centavos(archivado.total)}
+        if _totales_archivo(archivado.archivo) != guardados:
+            problemas.append(f'{archivado.mes}: el contenido no coincide con los totales guardados')
+            continue
+
+        inicio, fin = _rango_mes(archivado.mes)
+        ventas_tablas, total_tablas = db.session.query(
+            func.count(Venta.id), func.coalesce(func.sum(Venta.total), 0)
+        ).filter(en_rango(Venta.fecha, inicio, fin)).one()
+        ventas_resumen, total_resumen = db.session.query(
+            func.coalesce(func.sum(ResumenVentaUsuario.cantidad_ventas), 0),
+            func.coalesce(func.sum(ResumenVentaUsuario.total), 0),
+        ).filter(en_rango(ResumenVentaUsuario.fecha, inicio.date(), fin.date())).one()
+        esperado = (archivado.ventas + ventas_tablas, _centavos(archivado.total) + _centavos(total_tablas))
+        if (ventas_resumen, _centavos(total_resumen)) != esperado:
+            problemas.append(
+                f'{archivado.mes}: los resúmenes suman {ventas_resumen} ventas por ${_centavos(total_resumen)}, '
+                f'archivo y tablas {esperado[0]} por ${esperado[1]}'
+            )
+    return problemas
@@ -0,0 +1,90 @@
+import os
+import time
+
+from jinja2 import FileSystemBytecodeCache
+
+from app import catalogo, db, pdf
+
+# Calentamiento de un worker antes de que reciba peticiones.
+#
+# Sin calentar, la primera petición de cada página compila su plantilla
+# Jinja, la primera que lista productos carga el catálogo y cada conexión
+# del pool se abre (y en SQLite aplica sus PRAGMAs) recién cuando hace
+# falta; esas demoras caen sobre los primeros clientes después de cada
+# reinicio. `calentar` hace todo eso por adelantado y devuelve cuánto tardó
+# cada paso.
+#
+# Con CALENTAR_AL_INICIAR=True, create_app lo ejecuta en cada worker; el
+# comando `flask calentar` lo ejecuta una vez y muestra los tiempos.
+#
+# Las plantillas compiladas se guardan además como bytecode en disco
+# (JINJA_CACHE_DIR), compartido por todos los workers: el primero que
+# compila una plantilla la deja lista para los demás y para los reinicios.
+# Jinja descarta una entrada si cambió el código de la plantilla.
+
+
+def init_app(app):
+    """Configura la caché de bytecode de Jinja; JINJA_CACHE=False la desactiva."""
+    if not app.config.get('JINJA_CACHE', True):
+        return
+    directorio = app.config.get('JINJA_CACHE_DIR') or os.path.join(app.instance_path, 'jinja_cache')
+    os.makedirs(directorio, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directorio)
+
+
+def compilar_plantillas(app):
+    """Compila todas las plantillas y las deja en la caché del entorno Jinja."""
+    nombres = [n for n in app.jinja_env.list_templates() if n.endswith('.html')]
+    for nombre in nombres:
+        app.jinja_env.get_template(nombre)
+    return len(nombres)
+
+
+def abrir_conexiones():
+    """Abre tantas conexiones como el tamaño del pool de cada motor y las devuelve al pool."""
+    total = 0
+    for motor in db.engines.values():
+        cantidad = motor.pool.size() if hasattr(motor.pool, 'size') else 1
+        conexiones = []
+        try:
+            for _ in range(cantidad):
+                conexion = motor.connect()
+                conexiones.append(conexion)
+                conexion.exec_driver_sql('SELECT 1')
+        finally:
+            for conexion in conexiones:
+                conexion.close()
+        total += len(conexiones)
+    return total
+
+
+def cargar_catalogo():
+    """Llena la caché del catálogo; devuelve la cantidad de productos."""
+    catalogo.categorias()
+    return len(catalogo.productos(con_stock=False))
+
+
+def calentar(app, pdf_=None):
+    """Ejecuta cada paso y devuelve una lista de (paso, cantidad, segundos).
+
+    `pdf_` indica si también se importa xhtml2pdf; por defecto se usa
+    CALENTAR_PDF (False), porque solo tres páginas generan PDF.
+    """
+    if pdf_ is None:
+        pdf_ = app.config.get('CALENTAR_PDF', False)
+    pasos = [
+        ('plantillas', lambda: compilar_plantillas(app)),
+        ('conexiones', abrir_conexiones),
+        ('productos', cargar_catalogo),
+    ]
+    if pdf_:
+        pasos.append(('pdf', lambda: pdf.precargar() or 1))
+
+    resultados = []
+    with app.app_context():
+        for nombre, paso in pasos:
+            inicio = time.perf_counter()
+            cantidad = paso()
+            resultados.append((nombre, cantidad, time.perf_counter() - inicio))
+        db.session.remove()
+    return resultados
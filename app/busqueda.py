@@ -0,0 +1,232 @@
+import re
+import threading
+import time
+import unicodedata
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from app import db
+from app.models import Producto
+
+# Índice de búsqueda de productos por nombre.
+#
+# - SQLite: tabla virtual FTS5 `productos_fts` (rowid = id del producto).
+# - MySQL: tabla `productos_busqueda` con índice FULLTEXT y parser ngram.
+# - Cualquier otro caso: índice de trigramas en memoria.
+#
+# En todos los casos se indexa el nombre normalizado (minúsculas y sin
+# acentos), así "ferreteria" encuentra "Ferretería".
+#
+# Si el índice nativo existe se vuelve a comprobar cada TTL_INDICE
+# segundos: `flask reindexar-productos` o `flask actualizar-esquema` pueden
+# crearlo mientras los workers ya están atendiendo.
+
+LIMITE = 50
+TTL_TRIGRAMAS = 60
+TTL_INDICE = 60
+
+_SQL_CREAR = {
+    'sqlite': (
+        "CREATE VIRTUAL TABLE IF NOT EXISTS productos_fts "
+        "USING fts5(nombre, tokenize='unicode61 remove_diacritics 2')",
+    ),
+    'mysql': (
+        "CREATE TABLE IF NOT EXISTS productos_busqueda ("
+        "producto_id INT NOT NULL PRIMARY KEY, "
+        "nombre VARCHAR(255) NOT NULL, "
+        "FULLTEXT KEY ft_productos_nombre (nombre) WITH PARSER ngram"
+        ") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4",
+    ),
+}
+_SQL_BORRAR = {
+    'sqlite': "DELETE FROM productos_fts WHERE rowid = :id",
+    'mysql': "DELETE FROM productos_busqueda WHERE producto_id = :id",
+}
+_SQL_INSERTAR = {
+    'sqlite': "INSERT INTO productos_fts (rowid, nombre) VALUES (:id, :nombre)",
+    'mysql': "REPLACE INTO productos_busqueda (producto_id, nombre) VALUES (:id, :nombre)",
+}
+_SQL_BUSCAR = {
+    'sqlite': (
+        "SELECT f.rowid FROM productos_fts f JOIN productos p ON p.id = f.rowid "
+        "WHERE f.nombre MATCH :consulta {filtro} ORDER BY f.rank LIMIT :limite"
+    ),
+    'mysql': (
+        "SELECT b.producto_id FROM productos_busqueda b "
+        "JOIN productos p ON p.id = b.producto_id "
+        "WHERE MATCH (b.nombre) AGAINST (:consulta IN BOOLEAN MODE) {filtro} "
+        "ORDER BY MATCH (b.nombre) AGAINST (:consulta IN BOOLEAN MODE) DESC LIMIT :limite"
+    ),
+}
+
+_disponible = {}
+_trigramas = {'productos': None, 'cargado': 0.0}
+_candado = threading.Lock()
+
+
+def normalizar(texto):
+    """Pasa a minúsculas, quita acentos y colapsa espacios."""
+    descompuesto = unicodedata.normalize('NFKD', texto or '')
+    sin_acentos = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    return ' '.join(sin_acentos.lower().split())
+
+
+def _terminos(texto):
+    return re.findall(r'\w+', normalizar(texto))
+
+
+def _dialecto():
+    return db.engine.dialect.name
+
+
+def tabla_indice():
+    """Nombre de la tabla del índice nativo en el motor actual, o None."""
+    return {'sqlite': 'productos_fts', 'mysql': 'productos_busqueda'}.get(_dialecto())
+
+
+def _indice_nativo():
+    """Indica si el motor actual tiene su índice de texto disponible."""
+    tabla = tabla_indice()
+    if tabla is None:
+        return False
+    clave = str(db.engine.url)
+    disponible, comprobado = _disponible.get(clave, (False, None))
+    if comprobado is None or time.monotonic() - comprobado > TTL_INDICE:
+        disponible = db.inspect(db.engine).has_table(tabla)
+        _disponible[clave] = (disponible, time.monotonic())
+    return disponible
+
+
+def crear_indice():
+    """Crea (si hace falta) y llena el índice de búsqueda desde la tabla productos."""
+    dialecto = _dialecto()
+    if dialecto in _SQL_CREAR:
+        try:
+            for sentencia in _SQL_CREAR[dialecto]:
+                db.session.execute(text(sentencia))
+        except DBAPIError:
+            db.session.rollback()
+        else:
+            db.session.execute(text(f"DELETE FROM {tabla_indice()}"))
+            filas = [
+                {'id': id_, 'nombre': normalizar(nombre)}
+                for id_, nombre in db.session.query(Producto.id, Producto.nombre)
+            ]
+            if filas:
+                db.session.execute(text(_SQL_INSERTAR[dialecto]), filas)
+            db.session.commit()
+            _disponible[str(db.engine.url)] = (True, time.monotonic())
+            return len(filas)
+
+    _invalidar_trigramas()
+    return 0
+
+
+def indexar(producto):
+    """Agrega o actualiza un producto en el índice. Se ejecuta en la transacción
+    del llamador, así que debe llamarse antes del commit."""
+    if _indice_nativo():
+        dialecto = _dialecto()
+        if dialecto == 'sqlite':
+            db.session.execute(text(_SQL_BORRAR[dialecto]), {'id': producto.id})
+        db.session.execute(
+            text(_SQL_INSERTAR[dialecto]),
+            {'id': producto.id, 'nombre': normalizar(producto.nombre)}
+        )
+    _invalidar_trigramas()
+
+
+def indexar_lote(productos):
+    """Como `indexar`, para muchos (id, nombre) a la vez con executemany."""
+    filas = [{'id': id_, 'nombre': normalizar(nombre)} for id_, nombre in productos]
+    if filas and _indice_nativo():
+        dialecto = _dialecto()
+        if dialecto == 'sqlite':
+            db.session.execute(text(_SQL_BORRAR[dialecto]), [{'id': f['id']} for f in filas])
+        db.session.execute(text(_SQL_INSERTAR[dialecto]), filas)
+    _invalidar_trigramas()
+
+
+def eliminar(producto_id):
+    """Quita un producto del índice."""
+    if _indice_nativo():
+        db.session.execute(text(_SQL_BORRAR[_dialecto()]), {'id': producto_id})
+    _invalidar_trigramas()
+
+
+def _consulta_nativa(terminos):
+    if _dialecto() == 'sqlite':
+        return ' '.join(f'"{t}"*' for t in terminos)
+    return ' '.join(f'+"{t}"' for t in terminos)
+
+
+def _buscar_ids_nativo(terminos, categoria_id, limite):
+    filtro = 'AND p.categoria_id = :categoria_id' if categoria_id else ''
+    sentencia = text(_SQL_BUSCAR[_dialecto()].format(filtro=filtro))
+    parametros = {'consulta': _consulta_nativa(terminos), 'limite': limite}
+    if categoria_id:
+        parametros['categoria_id'] = categoria_id
+    return [fila[0] for fila in db.session.execute(sentencia, parametros)]
+
+
+# --- Respaldo en Python: índice de trigramas en memoria ---
+
+def _trigramas_de(texto):
+    relleno = f'  {texto} '
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+
+def _invalidar_trigramas():
+    with _candado:
+        _trigramas['productos'] = None
+
+
+def _indice_trigramas():
+    with _candado:
+        vencido = time.monotonic() - _trigramas['cargado'] > TTL_TRIGRAMAS
+        if _trigramas['productos'] is None or vencido:
+            productos = {}
+            for id_, nombre, categoria_id in db.session.query(
+                Producto.id, Producto.nombre, Producto.categoria_id
+            ):
+                nombre = normalizar(nombre)
+                productos[id_] = (nombre, categoria_id, _trigramas_de(nombre))
+            _trigramas['productos'] = productos
+            _trigramas['cargado'] = time.monotonic()
+        return _trigramas['productos']
+
+
+def _buscar_ids_trigramas(terminos, categoria_id, limite, umbral=0.5):
+    consulta = ' '.join(terminos)
+    buscados = _trigramas_de(consulta)
+    resultados = []
+    for id_, (nombre, categoria, trigramas) in _indice_trigramas().items():
+        if categoria_id and categoria != categoria_id:
+            continue
+        puntaje = len(buscados & trigramas) / len(buscados)
+        if consulta in nombre:
+            puntaje += 1 if nombre.startswith(consulta) else 0.5
+        if puntaje >= umbral:
+            resultados.append((-puntaje, nombre, id_))
+    resultados.sort()
+    return [id_ for _, _, id_ in resultados[:limite]]
+
+
+def buscar_ids(texto, categoria_id=None, limite=LIMITE):
+    """Ids de productos que coinciden con `texto`, del más al menos relevante."""
+    terminos = _terminos(texto)
+    if not terminos:
+        return []
+    if _indice_nativo():
+        return _buscar_ids_nativo(terminos, categoria_id, limite)
+    return _buscar_ids_trigramas(terminos, categoria_id, limite)
+
+
+def buscar(texto, categoria_id=None, limite=LIMITE):
+    """Productos que coinciden con `texto`, ordenados por relevancia."""
+    ids = buscar_ids(texto, categoria_id, limite)
+    if not ids:
+        return []
+    por_id = {p.id: p for p in Producto.query.filter(Producto.id.in_(ids))}
+    return [por_id[i] for i in ids if i in por_id]
@@ -0,0 +1,218 @@
+import hashlib
+import os
+import threading
+import time
+import uuid
+from datetime import date, datetime, time as hora, timezone
+from functools import wraps
+
+from flask import current_app, g, has_app_context, make_response, request, session as sesion_web
+from flask_login import current_user
+
+from app import cambios
+from app.catalogo import MemoriaBackend
+
+# Caché de las páginas de reportes (reporte general, ventas por mes y
+# ventas por usuario).
+#
+# Las entradas se guardan por (reporte, parámetros) junto con el sello de
+# versión de los datos con que se generaron. El sello cambia al hacer commit
+# de cualquier transacción que toque ventas, compras o los nombres que
+# muestran los reportes; una entrada con otro sello cuenta como fallo y se
+# regenera. Con CATALOGO_BACKEND='archivo' el sello vive en un archivo del
+# directorio del catálogo, así todos los workers ven el mismo.
+#
+# Además, con el sello en archivo las páginas llevan ETag y Last-Modified:
+# mientras el sello no cambie, el navegador revalida y recibe 304 sin que se
+# consulte la base. El sello en memoria no sirve para eso: vuelve a empezar
+# con cada reinicio y no ve los commits de otros workers ni de los comandos
+# `flask`, así que un ETag viejo podría coincidir con datos nuevos.
+
+TABLAS = {'ventas', 'detalle_venta', 'compras', 'productos', 'categorias', 'usuarios'}
+
+
+class SelloMemoria:
+    """Versión de los datos en memoria del proceso (un solo worker)."""
+
+    compartido = False
+
+    def __init__(self):
+        self._candado = threading.Lock()
+        self._sello = (0, time.time())
+
+    def leer(self):
+        return self._sello
+
+    def incrementar(self):
+        with self._candado:
+            self._sello = (self._sello[0] + 1, time.time())
+
+
+class SelloArchivo:
+    """Versión de los datos en un archivo compartido por los workers.
+
+    Cada cambio escribe un valor nuevo al azar en lugar de sumar uno, para
+    que dos workers que hacen commit a la vez no dejen el mismo sello. La
+    fecha de modificación del archivo es el momento del último cambio.
+    """
+
+    compartido = True
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+
+    def leer(self):
+        try:
+            with open(self.ruta) as archivo:
+                return archivo.read(), os.fstat(archivo.fileno()).st_mtime
+        except FileNotFoundError:
+            return '', 0.0
+
+    def incrementar(self):
+        temporal = f'{self.ruta}.{os.getpid()}.tmp'
+        with open(temporal, 'w') as archivo:
+            archivo.write(uuid.uuid4().hex)
+        os.replace(temporal, self.ruta)
+
+
+class CacheReportes:
+    """Entradas versionadas por sello, con contadores por reporte."""
+
+    def __init__(self, backend, sello, activa=True):
+        self.backend = backend
+        self.sello = sello
+        self.activa = activa
+        self._contadores = {}
+        self._candado = threading.Lock()
+
+    def contar(self, nombre, tipo):
+        with self._candado:
+            contadores = self._contadores.setdefault(
+                nombre, {'aciertos': 0, 'fallos': 0, 'revalidaciones': 0}
+            )
+            contadores[tipo] += 1
+
+    def obtener(self, nombre, parametros, version, cargar, guardar=True):
+        clave = (nombre, parametros)
+        entrada = self.backend.obtener(clave)
+        if entrada is not None and entrada[0] == version:
+            self.contar(nombre, 'aciertos')
+            return entrada[1]
+        self.contar(nombre, 'fallos')
+        valor = cargar()
+        if guardar:
+            self.backend.guardar(clave, (version, valor))
+        return valor
+
+    def estadisticas(self):
+        with self._candado:
+            reportes = {}
+            for nombre, contadores in sorted(self._contadores.items()):
+                consultas = contadores['aciertos'] + contadores['fallos']
+                reportes[nombre] = dict(
+                    contadores,
+                    tasa_aciertos=round(contadores['aciertos'] / consultas, 3) if consultas else None,
+                )
+        version, momento = self.sello.leer()
+        return {
+            'activa': self.activa,
+            'sello': version,
+            'ultimo_cambio': datetime.fromtimestamp(momento).isoformat(timespec='seconds') if momento else None,
+            'reportes': reportes,
+        }
+
+
+def init_app(app):
+    """Configura la caché de reportes; REPORTES_CACHE=False la desactiva."""
+    ttl = app.config.get('REPORTES_CACHE_TTL', 600)
+    if app.config.get('CATALOGO_BACKEND', 'memoria') == 'archivo':
+        directorio = app.config.get('CATALOGO_DIR') or os.path.join(app.instance_path, 'catalogo')
+        sello = SelloArchivo(os.path.join(directorio, 'reportes.version'))
+    else:
+        sello = SelloMemoria()
+    app.extensions['cache_reportes'] = CacheReportes(
+        MemoriaBackend(ttl), sello, activa=app.config.get('REPORTES_CACHE', True)
+    )
+
+
+def _cache():
+    return current_app.extensions['cache_reportes']
+
+
+def _sello():
+    """Sello leído una sola vez por petición, para que ETag y datos coincidan."""
+    if 'sello_reportes' not in g:
+        g.sello_reportes = _cache().sello.leer()
+    return g.sello_reportes
+
+
+def _confiable(momento):
+    """False si la petición lee de una réplica que quizás no vio el último cambio."""
+    demora = current_app.config.get('REPLICA_PEGAJOSA_SEGUNDOS', 5)
+    return not g.get('usar_replica') or time.time() - momento >= demora
+
+
+def datos(nombre, parametros, cargar):
+    """Resultado de `cargar()` cacheado por reporte, parámetros y sello.
+
+    `parametros` debe ser hashable (una tupla). Sirve tanto para los datos
+    de los gráficos como para fragmentos HTML ya renderizados.
+    """
+    cache = _cache()
+    if not cache.activa:
+        return cargar()
+    version, momento = _sello()
+    return cache.obtener(nombre, parametros, version, cargar, guardar=_confiable(momento))
+
+
+def condicional(f):
+    """Agrega ETag y Last-Modified a una página de reportes y responde 304
+    si el navegador ya tiene la versión actual.
+
+    El ETag incluye al usuario (la barra superior muestra su nombre) y el
+    día, porque los reportes del mes actual dependen de la fecha. Solo se
+    compara el ETag: If-Modified-Since no distingue usuarios. Sin un sello
+    compartido (CATALOGO_BACKEND='archivo') la página se genera siempre.
+    """
+    @wraps(f)
+    def decorada(*args, **kwargs):
+        cache = _cache()
+        # Con mensajes flash pendientes la página no es la misma
+        if not cache.activa or not cache.sello.compartido or sesion_web.get('_flashes'):
+            return f(*args, **kwargs)
+
+        version, momento = _sello()
+        hoy = date.today()
+        etag = hashlib.sha1(repr((
+            request.endpoint, sorted(request.args.items(multi=True)), sorted(kwargs.items()),
+            current_user.get_id(), version, hoy,
+        )).encode()).hexdigest()
+
+        if request.if_none_match.contains(etag):
+            cache.contar(f.__name__, 'revalidaciones')
+            respuesta = current_app.response_class(status=304)
+        else:
+            respuesta = make_response(f(*args, **kwargs))
+            if respuesta.status_code != 200 or not _confiable(momento):
+                return respuesta
+
+        medianoche = datetime.combine(hoy, hora()).timestamp()
+        respuesta.set_etag(etag)
+        respuesta.last_modified = datetime.fromtimestamp(max(momento, medianoche), timezone.utc)
+        respuesta.cache_control.private = True
+        respuesta.cache_control.no_cache = True
+        return respuesta
+    return decorada
+
+
+def estadisticas():
+    return _cache().estadisticas()
+
+
+# --- Cambio de sello al confirmar ---
+
+@cambios.al_confirmar
+def _despues_de_commit(session, tablas):
+    if TABLAS.intersection(tablas) and has_app_context() and 'cache_reportes' in current_app.extensions:
+        _cache().sello.incrementar()
@@ -0,0 +1,119 @@
+import os
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app import cambios, db
+from app.catalogo import ArchivoBackend, MemoriaBackend
+from app.models import Usuario
+
+# Caché corta de los datos mínimos del usuario autenticado. El user_loader
+# de Flask-Login se ejecuta en cada petición; con esta caché la sesión se
+# resuelve sin consultar la base y los roles se comprueban en memoria.
+#
+# Al confirmar una transacción que cambió el rol, el estado o el nombre de
+# un usuario por el ORM, o lo borró, se descarta su instantánea: el cambio
+# vale desde la petición siguiente y no recién al vencer el TTL.
+
+# Columnas de la instantánea y marca en `session.info` de los usuarios tocados
+CAMPOS = {'rol', 'estado', 'nombre'}
+CLAVE = 'usuarios_modificados'
+
+
+class UsuarioActual:
+    """Instantánea ligera del usuario de la sesión.
+
+    Expone lo que necesitan Flask-Login y `rol_requerido`. Para leer o
+    modificar el resto de columnas se usa `registro()`, que carga la fila
+    completa una sola vez por petición.
+    """
+
+    __slots__ = ('id', 'rol', 'estado', 'nombre', '_registro')
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, id, rol, estado, nombre):
+        self.id = id
+        self.rol = rol
+        self.estado = estado
+        self.nombre = nombre
+        self._registro = None
+
+    @property
+    def is_active(self):
+        return self.estado == 'activo'
+
+    def get_id(self):
+        return str(self.id)
+
+    def registro(self):
+        """Fila `Usuario` completa, cargada bajo demanda."""
+        if self._registro is None:
+            self._registro = db.session.get(Usuario, self.id)
+        return self._registro
+
+
+def init_app(app):
+    """Configura la caché de usuarios con el mismo backend que el catálogo."""
+    ttl = app.config.get('USUARIOS_TTL', 30)
+    if app.config.get('CATALOGO_BACKEND', 'memoria') == 'archivo':
+        directorio = app.config.get('USUARIOS_DIR') or os.path.join(app.instance_path, 'usuarios')
+        backend = ArchivoBackend(ttl, directorio)
+    else:
+        backend = MemoriaBackend(ttl)
+    app.extensions['cache_usuarios'] = backend
+
+
+def _backend():
+    return current_app.extensions['cache_usuarios']
+
+
+def cargar(user_id):
+    """Devuelve el usuario activo de la sesión, o None si no existe o está inactivo."""
+    clave = f'usuario-{int(user_id)}'
+    datos = _backend().obtener(clave)
+    if datos is None:
+        fila = (
+            db.session.query(Usuario.id, Usuario.rol, Usuario.estado, Usuario.nombre)
+            .filter(Usuario.id == int(user_id))
+            .first()
+        )
+        if fila is None:
+            return None
+        datos = tuple(fila)
+        _backend().guardar(clave, datos)
+
+    usuario = UsuarioActual(*datos)
+    return usuario if usuario.is_active else None
+
+
+def invalidar(user_id):
+    """Descarta la instantánea de un usuario tras modificar su fila."""
+    _backend().invalidar(f'usuario-{int(user_id)}')
+
+
+# --- Invalidación automática al confirmar ---
+
+@event.listens_for(Session, 'after_flush')
+def _despues_de_flush(session, contexto):
+    for objeto in list(session.dirty) + list(session.deleted):
+        if not isinstance(objeto, Usuario):
+            continue
+        modificados = {a.key for a in inspect(objeto).attrs if a.history.has_changes()}
+        if objeto in session.deleted or modificados & CAMPOS:
+            session.info.setdefault(CLAVE, set()).add(objeto.id)
+
+
+@cambios.al_confirmar
+def _despues_de_commit(session, tablas):
+    ids = session.info.pop(CLAVE, ())
+    if ids and has_app_context() and 'cache_usuarios' in current_app.extensions:
+        for user_id in ids:
+            invalidar(user_id)
+
+
+@cambios.al_deshacer
+def _despues_de_rollback(session):
+    session.info.pop(CLAVE, None)
@@ -0,0 +1,103 @@
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+# Tablas escritas por cada transacción.
+#
+# Las cachés (catálogo, reportes), las alertas y la réplica necesitan saber
+# qué tablas tocó una transacción. Los eventos de sesión se registran una
+# sola vez aquí: acumulan en `session.info` las tablas escritas por el ORM
+# o por INSERT/UPDATE/DELETE en bloque, avisan a los oyentes de
+# `al_confirmar` al hacer commit y a los de `al_deshacer` al deshacer la
+# transacción. Deshacer un savepoint no cuenta: lo que hizo el resto de la
+# transacción sigue pendiente.
+#
+# Las tablas se anotan en un dict {tabla: columnas}. Si la transacción solo
+# actualizó filas, `columnas` es el conjunto de columnas asignadas; si
+# insertó o borró filas, o no se puede saber qué columnas cambió, es None.
+# Así el catálogo distingue una venta (solo `stock`) de una edición.
+
+CLAVE = 'tablas_escritas'
+
+_al_confirmar = []
+_al_deshacer = []
+
+
+def al_confirmar(funcion):
+    """Registra `funcion(session, tablas)` para cada commit.
+
+    `tablas` es el dict {tabla: columnas o None} descrito arriba; puede estar vacío.
+    """
+    _al_confirmar.append(funcion)
+    return funcion
+
+
+def al_deshacer(funcion):
+    """Registra `funcion(session)` para cada rollback de la transacción completa."""
+    _al_deshacer.append(funcion)
+    return funcion
+
+
+def pendientes(session):
+    """Tablas escritas en la transacción en curso, todavía sin confirmar."""
+    return session.info.get(CLAVE, set())
+
+
+def marcar(session, tablas, columnas=None):
+    """Anota `tablas` como escritas; `columnas` si solo se actualizaron esas."""
+    for tabla in tablas:
+        if not tabla:
+            continue
+        escritas = session.info.setdefault(CLAVE, {})
+        if columnas is None or (tabla in escritas and escritas[tabla] is None):
+            escritas[tabla] = None
+        else:
+            escritas[tabla] = escritas.get(tabla, set()) | set(columnas)
+
+
+def _columnas_actualizadas(estado):
+    """Columnas que asigna un UPDATE en bloque, o None si no se pueden saber."""
+    # `_values` guarda lo pasado a .values(); no hay un equivalente público
+    valores = getattr(estado.statement, '_values', None)
+    if valores:
+        return {getattr(c, 'key', c) for c in valores}
+    # UPDATE por clave primaria: update(Modelo) con una lista de dicts
+    if isinstance(estado.parameters, list) and estado.parameters:
+        claves = {c.key for c in estado.statement.table.primary_key}
+        return set().union(*estado.parameters) - claves
+    return None
+
+
+@event.listens_for(Session, 'after_flush')
+def _despues_de_flush(session, contexto):
+    for objeto in list(session.new) + list(session.deleted):
+        marcar(session, {getattr(objeto, '__tablename__', None)})
+    for objeto in session.dirty:
+        # Todavía con el historial previo al flush
+        modificados = {a.key for a in inspect(objeto).attrs if a.history.has_changes()}
+        if modificados:
+            marcar(session, {getattr(objeto, '__tablename__', None)}, modificados)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _al_ejecutar(estado):
+    if estado.is_insert or estado.is_update or estado.is_delete:
+        tabla = getattr(estado.statement, 'table', None)
+        if tabla is not None:
+            columnas = _columnas_actualizadas(estado) if estado.is_update else None
+            marcar(estado.session, {tabla.name}, columnas)
+
+
+@event.listens_for(Session, 'after_commit')
+def _despues_de_commit(session):
+    tablas = session.info.pop(CLAVE, {})
+    for funcion in _al_confirmar:
+        funcion(session, tablas)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _despues_de_rollback(session):
+    if session.in_nested_transaction():
+        return
+    session.info.pop(CLAVE, None)
+    for funcion in _al_deshacer:
+        funcion(session)
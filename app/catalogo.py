@@ -0,0 +1,231 @@
+import os
+import threading
+import time
+import uuid
+from collections import namedtuple
+
+from flask import current_app, has_app_context
+
+from app import cambios, db
+from app.models import Categoria, Producto
+
+# Caché del catálogo (categorías y productos) compartida por todas las
+# peticiones del proceso. Guarda instantáneas inmutables, no instancias ORM,
+# así que pueden usarse fuera de la sesión que las cargó.
+#
+# Se invalida por escritura: al confirmar una transacción que cambió
+# productos o categorías (por ORM o en bloque, ver app/cambios.py) se
+# descarta la entrada correspondiente.
+#
+# El stock no forma parte de la instantánea: cambia con cada venta y
+# compra, y descartar el catálogo entero por eso lo vaciaba todo el tiempo
+# (y con el backend en memoria los demás workers lo mostraban atrasado hasta
+# el TTL). `productos()` lo lee en cada llamada con `stock(ids)`, que solo
+# consulta los ids de la instantánea, y una transacción que solo actualizó
+# `stock` no invalida nada.
+
+CategoriaSnapshot = namedtuple('CategoriaSnapshot', 'id nombre')
+ProductoSnapshot = namedtuple(
+    'ProductoSnapshot', 'id nombre precio stock stock_minimo categoria_id categoria'
+)
+
+TABLAS = {
+    Categoria.__tablename__: 'categorias',
+    Producto.__tablename__: 'productos',
+}
+# Columnas que se leen en vivo: actualizarlas no invalida la caché
+VIVAS = {'stock'}
+# Ids por consulta al leer el stock, por debajo del límite de parámetros de SQLite
+IDS_POR_CONSULTA = 500
+
+
+class MemoriaBackend:
+    """Entradas en memoria del proceso, con vencimiento por TTL."""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._datos = {}
+        self._candado = threading.Lock()
+
+    def obtener(self, clave):
+        with self._candado:
+            entrada = self._datos.get(clave)
+            if entrada is None or time.monotonic() > entrada[0]:
+                return None
+            return entrada[1]
+
+    def guardar(self, clave, valor):
+        with self._candado:
+            self._datos[clave] = (time.monotonic() + self.ttl, valor)
+
+    def invalidar(self, clave):
+        with self._candado:
+            self._datos.pop(clave, None)
+
+
+class ArchivoBackend(MemoriaBackend):
+    """Memoria local más un archivo de versión por clave en un directorio común.
+
+    Cada invalidación reescribe el archivo con una versión nueva; los demás
+    procesos (por ejemplo otros workers de gunicorn) la comparan al leer y
+    descartan su copia si cambió. Hace de sustituto local de un bus de
+    invalidaciones tipo Redis.
+    """
+
+    def __init__(self, ttl, directorio):
+        super().__init__(ttl)
+        self.directorio = directorio
+        self._versiones = {}
+        os.makedirs(directorio, exist_ok=True)
+
+    def _ruta(self, clave):
+        return os.path.join(self.directorio, f'{clave}.version')
+
+    def _version(self, clave):
+        try:
+            with open(self._ruta(clave)) as archivo:
+                return archivo.read()
+        except FileNotFoundError:
+            return ''
+
+    def obtener(self, clave):
+        version = self._version(clave)
+        if version != self._versiones.get(clave):
+            super().invalidar(clave)
+            self._versiones[clave] = version
+            return None
+        return super().obtener(clave)
+
+    def invalidar(self, clave):
+        temporal = f'{self._ruta(clave)}.{os.getpid()}.tmp'
+        with open(temporal, 'w') as archivo:
+            archivo.write(uuid.uuid4().hex)
+        os.replace(temporal, self._ruta(clave))
+        super().invalidar(clave)
+
+
+class Catalogo:
+    """Fachada de la caché con contadores de aciertos y fallos por clave."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.aciertos = {}
+        self.fallos = {}
+
+    def obtener(self, clave, cargar):
+        valor = self.backend.obtener(clave)
+        if valor is not None:
+            self.aciertos[clave] = self.aciertos.get(clave, 0) + 1
+            return valor
+        self.fallos[clave] = self.fallos.get(clave, 0) + 1
+        valor = cargar()
+        self.backend.guardar(clave, valor)
+        return valor
+
+    def invalidar(self, *claves):
+        for clave in claves or TABLAS.values():
+            self.backend.invalidar(clave)
+
+    def estadisticas(self):
+        return {
+            clave: {
+                'aciertos': self.aciertos.get(clave, 0),
+                'fallos': self.fallos.get(clave, 0),
+            }
+            for clave in TABLAS.values()
+        }
+
+
+def init_app(app):
+    """Configura la caché según CATALOGO_BACKEND ('memoria' o 'archivo')."""
+    ttl = app.config.get('CATALOGO_TTL', 300)
+    if app.config.get('CATALOGO_BACKEND', 'memoria') == 'archivo':
+        directorio = app.config.get('CATALOGO_DIR') or os.path.join(app.instance_path, 'catalogo')
+        backend = ArchivoBackend(ttl, directorio)
+    else:
+        backend = MemoriaBackend(ttl)
+    app.extensions['catalogo'] = Catalogo(backend)
+
+
+def _catalogo():
+    return current_app.extensions['catalogo']
+
+
+def _cargar_categorias():
+    return tuple(
+        CategoriaSnapshot(id_, nombre)
+        for id_, nombre in db.session.query(Categoria.id, Categoria.nombre).order_by(Categoria.nombre)
+    )
+
+
+def _cargar_productos():
+    filas = (
+        db.session.query(
+            Producto.id, Producto.nombre, Producto.precio,
+            Producto.stock_minimo, Producto.categoria_id, Categoria.nombre
+        )
+        .join(Categoria, Producto.categoria_id == Categoria.id)
+        .order_by(Producto.id)
+    )
+    return tuple(
+        ProductoSnapshot(id_, nombre, precio, None, minimo, categoria_id,
+                         CategoriaSnapshot(categoria_id, categoria))
+        for id_, nombre, precio, minimo, categoria_id, categoria in filas
+    )
+
+
+def categorias():
+    """Todas las categorías ordenadas por nombre."""
+    return _catalogo().obtener('categorias', _cargar_categorias)
+
+
+def stock(ids):
+    """Stock actual de los productos `ids` como {id: stock}.
+
+    Consulta solo esos ids, de a IDS_POR_CONSULTA por sentencia. Los que ya
+    no existen no aparecen en el resultado.
+    """
+    ids = list(ids)
+    actual = {}
+    for i in range(0, len(ids), IDS_POR_CONSULTA):
+        tanda = ids[i:i + IDS_POR_CONSULTA]
+        actual.update(db.session.query(Producto.id, Producto.stock).filter(Producto.id.in_(tanda)))
+    return actual
+
+
+def productos(ids=None, con_stock=True):
+    """Productos con su categoría y el stock actual, ordenados por id.
+
+    `ids` limita el resultado a esos productos; con `con_stock=False` se
+    devuelve la instantánea sin consultar la base (el stock queda en None).
+    """
+    instantanea = _catalogo().obtener('productos', _cargar_productos)
+    if ids is not None:
+        ids = set(ids)
+        instantanea = tuple(p for p in instantanea if p.id in ids)
+    if not con_stock:
+        return instantanea
+    actual = stock(p.id for p in instantanea)
+    # Los productos borrados por otro worker desaparecen aunque la caché no lo sepa
+    return tuple(p._replace(stock=actual[p.id]) for p in instantanea if p.id in actual)
+
+
+def invalidar(*claves):
+    """Descarta entradas de la caché; sin argumentos, todas."""
+    _catalogo().invalidar(*claves)
+
+
+def estadisticas():
+    return _catalogo().estadisticas()
+
+
+# --- Invalidación automática al confirmar ---
+
+@cambios.al_confirmar
+def _despues_de_commit(session, tablas):
+    claves = {
+        TABLAS[t] for t, columnas in tablas.items()
+        if t in TABLAS and (columnas is None or columnas - VIVAS)
+    }
+    if claves and has_app_context() and 'catalogo' in current_app.extensions:
+        invalidar(*claves)
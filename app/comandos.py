@@ -0,0 +1,232 @@
+import time
+from datetime import datetime
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from app import (
+    archivo_ventas, arranque, busqueda, db, esquema, importacion, movimientos, replica, reposicion,
+    resumenes, sintetico
+)
+
+
+@click.command('actualizar-esquema')
+@with_appcontext
+def actualizar_esquema():
+    """Crea las tablas, columnas e índices que falten en la base."""
+    cambios = esquema.actualizar()
+    for cambio in cambios:
+        click.echo(f'+ {cambio}')
+    click.echo('Esquema al día.' if not cambios else f'{len(cambios)} cambios aplicados.')
+
+
+@click.command('reconstruir-resumenes')
+@with_appcontext
+def reconstruir_resumenes():
+    """Recalcula las tablas de resumen de ventas desde cero."""
+    resumenes.reconstruir()
+    click.echo('Resúmenes de ventas reconstruidos.')
+
+
+@click.command('reindexar-productos')
+@with_appcontext
+def reindexar_productos():
+    """Crea y llena el índice de búsqueda de productos."""
+    total = busqueda.crear_indice()
+    click.echo(f'Productos indexados: {total}')
+
+
+@click.command('iniciar-movimientos')
+@with_appcontext
+def iniciar_movimientos():
+    """Registra el stock actual como saldo inicial de los productos sin movimientos."""
+    total = movimientos.iniciar()
+    db.session.commit()
+    click.echo(f'Saldos iniciales registrados: {total}')
+
+
+@click.command('corte-stock')
+@click.option('--fecha', help='Inicio del corte (YYYY-MM-DD); por defecto, hoy.')
+@with_appcontext
+def corte_stock(fecha):
+    """Guarda un corte del stock para acelerar las consultas históricas."""
+    try:
+        filas = movimientos.crear_corte(datetime.strptime(fecha, '%Y-%m-%d') if fecha else None)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--fecha')
+    db.session.commit()
+    click.echo(f'Corte de stock guardado: {filas} productos.')
+
+
+@click.command('verificar-stock')
+@with_appcontext
+def verificar_stock():
+    """Compara el stock de cada producto con el saldo del libro de movimientos."""
+    diferencias = movimientos.inconsistencias()
+    for id_, nombre, stock, saldo in diferencias:
+        click.echo(f'! {id_} {nombre}: stock {stock}, movimientos {saldo}')
+    if diferencias:
+        raise click.ClickException(f'{len(diferencias)} productos no coinciden con el libro.')
+    click.echo('El stock coincide con el libro de movimientos.')
+
+
+@click.command('actualizar-reposicion')
+@click.option('--completo', is_flag=True, help='Descarta lo acumulado y relee toda la ventana.')
+@with_appcontext
+def actualizar_reposicion(completo):
+    """Suma las ventas nuevas a la demanda por producto y muestra cuántos reponer."""
+    try:
+        inicio = time.perf_counter()
+        leidas = reposicion.actualizar(completo=completo)
+        sugerencias = [s for s in reposicion.calcular() if s.sugerido > 0]
+    except ImportError:
+        raise click.ClickException('El pronóstico de reposición requiere numpy (pip install numpy).')
+    click.echo(f'{leidas} filas de demanda leídas; {len(sugerencias)} productos para reponer '
+               f'({time.perf_counter() - inicio:.2f}s).')
+
+
+@click.command('archivar-ventas')
+@click.option('--meses', type=click.IntRange(min=1), default=None,
+              help='Meses recientes (incluido el actual) que quedan en las tablas; por defecto ARCHIVO_MESES o 12.')
+@with_appcontext
+def archivar_ventas(meses):
+    """Pasa las ventas de los meses cerrados más viejos a archivos comprimidos."""
+    meses = meses or current_app.config.get('ARCHIVO_MESES', 12)
+    pendientes = archivo_ventas.meses_pendientes(meses)
+    for mes in pendientes:
+        inicio = time.perf_counter()
+        try:
+            archivado, anterior = archivo_ventas.archivar_mes(mes)
+            db.session.commit()
+        except archivo_ventas.ArchivoError as e:
+            db.session.rollback()
+            raise click.ClickException(str(e))
+        archivo_ventas.descartar(anterior)
+        click.echo(f'{mes}: {archivado.ventas} ventas, {archivado.lineas} líneas -> '
+                   f'{archivado.archivo} ({time.perf_counter() - inicio:.1f}s)')
+    click.echo('Nada para archivar.' if not pendientes else f'{len(pendientes)} meses archivados.')
+
+
+@click.command('verificar-archivo')
+@with_appcontext
+def verificar_archivo():
+    """Comprueba los archivos de ventas contra sus totales y los resúmenes diarios."""
+    problemas = archivo_ventas.verificar()
+    for problema in problemas:
+        click.echo(f'! {problema}')
+    if problemas:
+        raise click.ClickException(f'{len(problemas)} meses archivados con problemas.')
+    click.echo('Los meses archivados están completos.')
+
+
+@click.command('importar-catalogo')
+@click.argument('archivo', type=click.File('r', encoding='utf-8-sig'))
+@click.option('--formato', type=click.Choice(['csv', 'json', 'jsonl']),
+              help='Por defecto, según la extensión del archivo (csv si no se reconoce).')
+@click.option('--lote', type=click.IntRange(min=1), default=importacion.LOTE, show_default=True,
+              help='Filas por transacción.')
+@with_appcontext
+def importar_catalogo(archivo, formato, lote):
+    """Crea o actualiza productos y categorías desde un CSV o JSON ('-' lee la entrada estándar)."""
+    def progreso(r):
+        click.echo(f'{r.leidas} filas: {r.creados} nuevos, {r.actualizados} actualizados '
+                   f'({r.por_segundo:.0f} filas/s)', err=True)
+
+    try:
+        resultado = importacion.importar(archivo, formato or importacion.formato_de(archivo.name),
+                                         lote=lote, progreso=progreso)
+    except importacion.ImportacionError as e:
+        raise click.ClickException(str(e))
+    for error in resultado.errores:
+        click.echo(f'! {error}')
+    if resultado.cantidad_errores > len(resultado.errores):
+        click.echo(f'! ... y {resultado.cantidad_errores - len(resultado.errores)} errores más')
+    click.echo(f'{resultado.leidas} filas en {resultado.segundos:.1f}s: {resultado.creados} productos nuevos, '
+               f'{resultado.actualizados} actualizados, {resultado.sin_cambios} sin cambios, '
+               f'{resultado.categorias_creadas} categorías nuevas, {resultado.cantidad_errores} con errores.')
+
+
+@click.command('exportar-catalogo')
+@click.argument('archivo', type=click.File('w', encoding='utf-8', lazy=True))
+@click.option('--formato', type=click.Choice(['csv', 'json', 'jsonl']),
+              help='Por defecto, según la extensión del archivo (csv si no se reconoce).')
+@with_appcontext
+def exportar_catalogo(archivo, formato):
+    """Escribe el catálogo en el formato que lee importar-catalogo ('-' escribe en la salida estándar)."""
+    inicio = time.perf_counter()
+    cantidad = importacion.exportar(archivo, formato or importacion.formato_de(archivo.name),
+                                    progreso=lambda n, s: click.echo(f'{n} productos ({n / s:.0f}/s)', err=True))
+    click.echo(f'{cantidad} productos exportados en {time.perf_counter() - inicio:.1f}s.', err=True)
+
+
+@click.command('calentar')
+@click.option('--pdf', 'pdf_', is_flag=True, default=None, help='Importar también xhtml2pdf.')
+@with_appcontext
+def calentar(pdf_):
+    """Compila las plantillas, abre el pool de conexiones y carga el catálogo.
+
+    Sirve para medir el calentamiento; para calentar cada worker de
+    gunicorn antes de recibir tráfico usar CALENTAR_AL_INICIAR=1.
+    """
+    total = 0.0
+    for paso, cantidad, segundos in arranque.calentar(current_app._get_current_object(), pdf_):
+        click.echo(f'{paso}: {cantidad} ({segundos * 1000:.0f} ms)')
+        total += segundos
+    click.echo(f'Aplicación caliente en {total:.2f}s.')
+
+
+@click.command('generar-datos')
+@click.option('--usuarios', default=5, show_default=True)
+@click.option('--productos', default=1000, show_default=True)
+@click.option('--ventas', default=10000, show_default=True)
+@click.option('--max-detalles', default=5, show_default=True, help='Líneas por venta, como máximo.')
+@click.option('--compras', default=1000, show_default=True)
+@click.option('--dias', default=365, show_default=True, help='Antigüedad de las ventas más viejas.')
+@click.option('--semilla', default=1, show_default=True)
+@with_appcontext
+def generar_datos(usuarios, productos, ventas, max_detalles, compras, dias, semilla):
+    """Agrega datos sintéticos de ferretería para pruebas de carga."""
+    inicio = time.perf_counter()
+    creados = sintetico.generar(usuarios=usuarios, productos=productos, ventas=ventas,
+                                max_detalles=max_detalles, compras=compras, dias=dias,
+                                semilla=semilla)
+    click.echo(f'Creados {creados} en {time.perf_counter() - inicio:.1f}s.')
+    resumenes.reconstruir()
+    click.echo(f'Productos indexados: {busqueda.crear_indice()}')
+
+
+@click.command('sincronizar-replica')
+@with_appcontext
+def sincronizar_replica():
+    """Copia la base primaria SQLite sobre la réplica SQLite (entorno local)."""
+    if not replica.disponible():
+        raise click.ClickException('No hay REPLICA_DATABASE_URI configurada.')
+    primaria, copia = db.engines[None], db.engines[replica.BIND]
+    if primaria.dialect.name != 'sqlite' or copia.dialect.name != 'sqlite':
+        raise click.ClickException('Solo se sincronizan réplicas SQLite; en MySQL usar la replicación del servidor.')
+    origen, destino = primaria.raw_connection(), copia.raw_connection()
+    try:
+        origen.driver_connection.backup(destino.driver_connection)
+    finally:
+        origen.close()
+        destino.close()
+    click.echo('Réplica sincronizada.')
+
+
+def registrar_comandos(app):
+    """Registra los comandos de mantenimiento en la CLI de Flask."""
+    app.cli.add_command(actualizar_esquema)
+    app.cli.add_command(reconstruir_resumenes)
+    app.cli.add_command(reindexar_productos)
+    app.cli.add_command(iniciar_movimientos)
+    app.cli.add_command(corte_stock)
+    app.cli.add_command(verificar_stock)
+    app.cli.add_command(archivar_ventas)
+    app.cli.add_command(verificar_archivo)
+    app.cli.add_command(importar_catalogo)
+    app.cli.add_command(exportar_catalogo)
+    app.cli.add_command(generar_datos)
+    app.cli.add_command(calentar)
+    app.cli.add_command(actualizar_reposicion)
+    app.cli.add_command(sincronizar_replica)
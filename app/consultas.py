@@ -0,0 +1,106 @@
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import String, and_, func, true
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.sql.functions import FunctionElement
+
+from app.models import DetalleVenta, Venta
+
+
+class mes(FunctionElement):
+    """Agrupa una fecha por mes como texto 'YYYY-MM' en cualquier dialecto."""
+
+    type = String()
+    name = 'mes'
+    inherit_cache = True
+
+
+class dia(FunctionElement):
+    """Agrupa una fecha por día como texto 'YYYY-MM-DD' en cualquier dialecto."""
+
+    type = String()
+    name = 'dia'
+    inherit_cache = True
+
+
+@compiles(mes)
+def _mes_generico(elemento, compiler, **kw):
+    return compiler.process(func.to_char(*elemento.clauses, 'YYYY-MM'), **kw)
+
+
+@compiles(mes, 'sqlite')
+def _mes_sqlite(elemento, compiler, **kw):
+    return compiler.process(func.strftime('%Y-%m', *elemento.clauses), **kw)
+
+
+@compiles(mes, 'mysql')
+def _mes_mysql(elemento, compiler, **kw):
+    return compiler.process(func.date_format(*elemento.clauses, '%Y-%m'), **kw)
+
+
+@compiles(dia)
+def _dia_generico(elemento, compiler, **kw):
+    return compiler.process(func.to_char(*elemento.clauses, 'YYYY-MM-DD'), **kw)
+
+
+@compiles(dia, 'sqlite')
+def _dia_sqlite(elemento, compiler, **kw):
+    return compiler.process(func.strftime('%Y-%m-%d', *elemento.clauses), **kw)
+
+
+@compiles(dia, 'mysql')
+def _dia_mysql(elemento, compiler, **kw):
+    return compiler.process(func.date_format(*elemento.clauses, '%Y-%m-%d'), **kw)
+
+
+def en_rango(columna, inicio=None, fin=None):
+    """Filtro semiabierto `inicio <= columna < fin` que puede usar índices.
+
+    Cualquiera de los extremos puede omitirse.
+    """
+    condiciones = []
+    if inicio is not None:
+        condiciones.append(columna >= inicio)
+    if fin is not None:
+        condiciones.append(columna < fin)
+    return and_(true(), *condiciones)
+
+
+def rango_dias(fecha_inicio, fecha_fin):
+    """Convierte dos fechas 'YYYY-MM-DD' inclusivas en un rango semiabierto.
+
+    El fin se desplaza al día siguiente para incluir todas las ventas del
+    último día seleccionado.
+    """
+    inicio = datetime.strptime(fecha_inicio, '%Y-%m-%d')
+    fin = datetime.strptime(fecha_fin, '%Y-%m-%d') + timedelta(days=1)
+    return inicio, fin
+
+
+def inicio_de_mes(referencia, meses_atras=0):
+    """Primer día del mes situado `meses_atras` meses antes de `referencia`."""
+    indice = referencia.year * 12 + referencia.month - 1 - meses_atras
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+def como_fecha_hora(dia_):
+    """Medianoche del día dado, para comparar contra columnas DateTime."""
+    return datetime(dia_.year, dia_.month, dia_.day)
+
+
+def venta_completa(venta_id):
+    """Consulta de una venta con su vendedor, sus detalles y los productos.
+
+    Resuelve todo en dos viajes a la base: la venta con el vendedor por JOIN
+    y los detalles con sus productos en un SELECT ... IN. Las plantillas
+    pueden recorrer `venta.detalles` y `d.producto` sin cargas perezosas.
+    """
+    return (
+        Venta.query
+        .options(
+            joinedload(Venta.vendedor),
+            selectinload(Venta.detalles).joinedload(DetalleVenta.producto),
+        )
+        .filter(Venta.id == venta_id)
+    )
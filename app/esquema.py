@@ -0,0 +1,67 @@
+from sqlalchemy import DateTime, func, inspect, text, update
+from sqlalchemy.schema import CreateColumn
+
+from app import busqueda, db
+
+# Actualización incremental del esquema para bases creadas con versiones
+# anteriores de los modelos: crea tablas nuevas y agrega las columnas e
+# índices que falten sin tocar los datos existentes. También crea y llena
+# el índice de búsqueda de productos si el motor lo admite y no existe.
+
+
+def actualizar():
+    """Crea tablas, columnas e índices faltantes. Devuelve la lista de cambios."""
+    cambios = []
+    inspector = inspect(db.engine)
+    existentes = set(inspector.get_table_names())
+
+    for tabla in db.metadata.sorted_tables:
+        if tabla.name not in existentes:
+            tabla.create(bind=db.engine)
+            cambios.append(f'tabla {tabla.name}')
+            continue
+
+        columnas = {c['name'] for c in inspector.get_columns(tabla.name)}
+        with db.engine.begin() as conexion:
+            for columna in tabla.columns:
+                if columna.name not in columnas:
+                    ddl = CreateColumn(columna).compile(dialect=db.engine.dialect)
+                    conexion.execute(text(f'ALTER TABLE {tabla.name} ADD COLUMN {ddl}'))
+                    cambios.append(f'columna {tabla.name}.{columna.name}')
+
+        indices = {i['name'] for i in inspector.get_indexes(tabla.name)}
+        for indice in tabla.indexes:
+            if indice.name not in indices:
+                indice.create(bind=db.engine)
+                cambios.append(f'índice {indice.name}')
+
+    tabla = busqueda.tabla_indice()
+    if tabla and tabla not in existentes:
+        total = busqueda.crear_indice()
+        if inspect(db.engine).has_table(tabla):
+            cambios.append(f'índice de búsqueda {tabla} ({total} productos)')
+
+    cambios.extend(_normalizar_fechas())
+    return cambios
+
+
+def _normalizar_fechas():
+    """En SQLite, quita los microsegundos de las fechas guardadas como
+    'YYYY-MM-DD HH:MM:SS.ffffff' para que todas tengan el formato de
+    CURRENT_TIMESTAMP que usan las columnas (ver FechaHora en models.py)."""
+    if db.engine.dialect.name != 'sqlite':
+        return []
+    cambios = []
+    with db.engine.begin() as conexion:
+        for tabla in db.metadata.sorted_tables:
+            for columna in tabla.columns:
+                if not isinstance(columna.type, DateTime):
+                    continue
+                filas = conexion.execute(
+                    update(tabla)
+                    .where(func.length(columna) > 19)
+                    .values({columna.name: func.substr(columna, 1, 19)})
+                ).rowcount
+                if filas:
+                    cambios.append(f'{filas} fechas normalizadas en {tabla.name}.{columna.name}')
+    return cambios
@@ -0,0 +1,95 @@
+import csv
+import io
+import tempfile
+
+from app import archivo_ventas, db
+from app.consultas import en_rango
+from app.models import DetalleVenta, Producto, Usuario, Venta
+
+COLUMNAS = [
+    'venta_id', 'fecha', 'vendedor', 'total_venta',
+    'producto_id', 'producto', 'cantidad', 'precio_unitario', 'subtotal',
+]
+FILAS_POR_LOTE = 1000
+
+
+def filas_ventas(inicio, fin):
+    """Recorre las líneas de venta del rango sin cargarlas todas en memoria.
+
+    Primero salen las líneas de los meses archivados que toque el rango,
+    leídas de sus archivos. Para las tablas se seleccionan columnas sueltas
+    en lugar de entidades y el resultado se lee con un cursor del lado del
+    servidor en lotes de FILAS_POR_LOTE.
+    """
+    for l in archivo_ventas.lineas_en_rango(inicio, fin):
+        if l.detalle_id is None:
+            continue
+        yield [
+            l.venta_id, l.fecha.strftime('%Y-%m-%d %H:%M:%S'), l.vendedor, l.total_venta,
+            l.producto_id, l.producto, l.cantidad,
+            l.subtotal / l.cantidad if l.cantidad else l.subtotal, l.subtotal,
+        ]
+
+    consulta = (
+        db.session.query(
+            Venta.id, Venta.fecha, Usuario.nombre, Venta.total,
+            Producto.id, Producto.nombre, DetalleVenta.cantidad, DetalleVenta.subtotal
+        )
+        .join(DetalleVenta, DetalleVenta.venta_id == Venta.id)
+        .join(Producto, DetalleVenta.producto_id == Producto.id)
+        .join(Usuario, Venta.usuario_id == Usuario.id)
+        .filter(en_rango(Venta.fecha, inicio, fin))
+        .order_by(Venta.fecha, Venta.id, DetalleVenta.id)
+        .execution_options(stream_results=True)
+        .yield_per(FILAS_POR_LOTE)
+    )
+    for venta_id, fecha, vendedor, total, producto_id, producto, cantidad, subtotal in consulta:
+        yield [
+            venta_id, fecha.strftime('%Y-%m-%d %H:%M:%S'), vendedor, total,
+            producto_id, producto, cantidad, subtotal / cantidad if cantidad else subtotal, subtotal,
+        ]
+
+
+def csv_en_trozos(filas):
+    """Genera el CSV en trozos de texto de FILAS_POR_LOTE filas."""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(COLUMNAS)
+    for i, fila in enumerate(filas, start=1):
+        escritor.writerow(fila)
+        if i % FILAS_POR_LOTE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def xlsx_en_archivo(filas):
+    """Escribe las filas en un XLSX temporal y devuelve el archivo abierto.
+
+    openpyxl es opcional; en modo write_only vuelca cada fila al disco, así
+    que la memoria no crece con el rango. Lanza ImportError si no está
+    instalado.
+    """
+    from openpyxl import Workbook
+
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet('Ventas')
+    hoja.append(COLUMNAS)
+    for fila in filas:
+        hoja.append([float(v) if hasattr(v, 'as_tuple') else v for v in fila])
+
+    archivo = tempfile.TemporaryFile()
+    libro.save(archivo)
+    archivo.seek(0)
+    return archivo
+
+
+def trozos_de_archivo(archivo, tamano=64 * 1024):
+    """Lee un archivo en bloques y lo cierra al terminar."""
+    with archivo:
+        while True:
+            bloque = archivo.read(tamano)
+            if not bloque:
+                break
+            yield bloque
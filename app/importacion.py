@@ -0,0 +1,380 @@
+import csv
+import json
+import time
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import func, insert, select, update
+
+from app import alertas, busqueda, db, movimientos
+from app.models import Categoria, Producto
+
+# Importación y exportación masiva del catálogo (productos y categorías).
+#
+# Los archivos se leen de a trozos (CSV, arreglo JSON o JSON Lines), así
+# la memoria no depende del tamaño del catálogo. Las categorías se
+# resuelven con un mapa nombre → id en memoria y las que faltan se crean
+# en bloque. Cada lote de productos se escribe con un INSERT y un UPDATE
+# masivos (executemany) en su propia transacción, junto con los
+# movimientos de stock y el índice de búsqueda.
+#
+# Un producto se actualiza si la fila trae su `id`, o si ya existe uno con
+# el mismo nombre en la misma categoría (sin distinguir mayúsculas ni
+# acentos); si no, se crea. Los ids nuevos se asignan en Python, como en
+# el generador de datos, así que conviene importar sin otras altas de
+# productos en curso.
+
+COLUMNAS = ['id', 'nombre', 'categoria', 'precio', 'stock', 'stock_minimo']
+OBLIGATORIAS = {'nombre', 'categoria', 'precio'}
+LOTE = 1000
+TROZO = 64 * 1024
+MAX_ERRORES = 100
+LARGO_NOMBRE = 100
+
+
+class ImportacionError(Exception):
+    """El archivo no se puede leer como catálogo."""
+
+
+class Resultado:
+    """Contadores de una importación, actualizados después de cada lote."""
+
+    def __init__(self):
+        self.leidas = 0
+        self.creados = 0
+        self.actualizados = 0
+        self.sin_cambios = 0
+        self.categorias_creadas = 0
+        self.errores = []
+        self.cantidad_errores = 0
+        self.inicio = time.perf_counter()
+
+    @property
+    def segundos(self):
+        return time.perf_counter() - self.inicio
+
+    @property
+    def por_segundo(self):
+        return self.leidas / self.segundos if self.segundos else 0.0
+
+    def error(self, numero, mensaje):
+        self.cantidad_errores += 1
+        if len(self.errores) < MAX_ERRORES:
+            self.errores.append(f'Fila {numero}: {mensaje}')
+
+
+# --- Lectura ---
+
+def formato_de(nombre_archivo):
+    """'csv', 'json' o 'jsonl' según la extensión del archivo."""
+    nombre = nombre_archivo.lower()
+    if nombre.endswith('.jsonl') or nombre.endswith('.ndjson'):
+        return 'jsonl'
+    if nombre.endswith('.json'):
+        return 'json'
+    return 'csv'
+
+
+def leer_csv(texto):
+    """Filas de un CSV con encabezado; al menos nombre, categoria y precio."""
+    lector = csv.DictReader(texto)
+    faltantes = OBLIGATORIAS - set(lector.fieldnames or [])
+    if faltantes:
+        raise ImportacionError(f"Faltan columnas en el CSV: {', '.join(sorted(faltantes))}")
+    yield from lector
+
+
+def leer_json(texto):
+    """Objetos de un arreglo JSON o de JSON Lines, decodificados de a trozos.
+
+    También acepta un objeto {"productos": [...]}, aunque ese caso se lee
+    entero en memoria.
+    """
+    decodificador = json.JSONDecoder()
+    buffer, pos, agotado = '', 0, False
+    arreglo = None
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+            pos += 1
+        if pos == len(buffer):
+            if agotado:
+                return
+            buffer, pos = texto.read(TROZO), 0
+            agotado = not buffer
+            continue
+
+        if arreglo is None:
+            arreglo = buffer[pos] == '['
+            if arreglo:
+                pos += 1
+                continue
+        if arreglo and buffer[pos] == ']':
+            return
+
+        try:
+            objeto, pos = decodificador.raw_decode(buffer, pos)
+        except json.JSONDecodeError as e:
+            if agotado:
+                raise ImportacionError(f'JSON inválido: {e.msg}.')
+            # El objeto sigue en el próximo trozo
+            trozo = texto.read(TROZO)
+            agotado = not trozo
+            buffer, pos = buffer[pos:] + trozo, 0
+            continue
+
+        if not arreglo and isinstance(objeto, dict) and isinstance(objeto.get('productos'), list):
+            yield from objeto['productos']
+        else:
+            yield objeto
+
+
+def leer(texto, formato):
+    return leer_csv(texto) if formato == 'csv' else leer_json(texto)
+
+
+def _entero(valor, campo):
+    if valor is None or valor == '':
+        return None
+    try:
+        numero = int(valor)
+    except (TypeError, ValueError):
+        raise ValueError(f'{campo} debe ser un número entero')
+    if numero < 0:
+        raise ValueError(f'{campo} no puede ser negativo')
+    return numero
+
+
+def _validar(datos):
+    """Convierte una fila leída en un dict con tipos; lanza ValueError si no sirve."""
+    if not isinstance(datos, dict):
+        raise ValueError('se esperaba un objeto con los campos del producto')
+    nombre = str(datos.get('nombre') or '').strip()
+    categoria = str(datos.get('categoria') or '').strip()
+    if not nombre or not categoria:
+        raise ValueError('nombre y categoria son obligatorios')
+    if len(nombre) > LARGO_NOMBRE or len(categoria) > LARGO_NOMBRE:
+        raise ValueError(f'nombre y categoria admiten hasta {LARGO_NOMBRE} caracteres')
+    try:
+        precio = Decimal(str(datos.get('precio'))).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise ValueError('precio debe ser un número')
+    if precio < 0:
+        raise ValueError('precio no puede ser negativo')
+    return {
+        'id': _entero(datos.get('id'), 'id'),
+        'nombre': nombre,
+        'categoria': categoria,
+        'precio': precio,
+        'stock': _entero(datos.get('stock'), 'stock'),
+        'stock_minimo': _entero(datos.get('stock_minimo'), 'stock_minimo'),
+    }
+
+
+# --- Escritura ---
+
+class Importador:
+    """Aplica lotes de filas validadas sobre el catálogo."""
+
+    def __init__(self, usuario_id=None):
+        self.usuario_id = usuario_id
+        self.categorias = {
+            busqueda.normalizar(nombre): id_
+            for id_, nombre in db.session.query(Categoria.id, Categoria.nombre)
+        }
+        self.productos = {}
+        self.por_clave = {}
+        for id_, nombre, categoria_id, precio, stock, minimo in db.session.query(
+            Producto.id, Producto.nombre, Producto.categoria_id, Producto.precio,
+            Producto.stock, Producto.stock_minimo
+        ):
+            self._recordar(id_, nombre, categoria_id, precio, stock, minimo)
+        self.siguiente_id = (db.session.query(func.max(Producto.id)).scalar() or 0) + 1
+
+    def _recordar(self, id_, nombre, categoria_id, precio, stock, minimo):
+        self.productos[id_] = (nombre, categoria_id, precio, stock, minimo)
+        self.por_clave[(categoria_id, busqueda.normalizar(nombre))] = id_
+
+    def _resolver_categorias(self, filas):
+        """Completa categoria_id en cada fila, creando las categorías nuevas."""
+        nuevas = {}
+        for fila in filas:
+            clave = busqueda.normalizar(fila['categoria'])
+            if clave not in self.categorias:
+                nuevas.setdefault(clave, fila['categoria'])
+        if nuevas:
+            db.session.execute(insert(Categoria), [{'nombre': n} for n in nuevas.values()])
+            creadas = db.session.execute(
+                select(Categoria.id, Categoria.nombre).where(Categoria.nombre.in_(nuevas.values()))
+            )
+            for id_, nombre in creadas:
+                self.categorias[busqueda.normalizar(nombre)] = id_
+        for fila in filas:
+            fila['categoria_id'] = self.categorias[busqueda.normalizar(fila['categoria'])]
+        return len(nuevas)
+
+    def aplicar(self, filas, resultado):
+        """Escribe un lote de filas (dicts de `_validar` con su número de fila). No hace commit."""
+        resultado.categorias_creadas += self._resolver_categorias(filas)
+
+        altas, cambios, movimientos_ = {}, {}, []
+        alertas_ = []
+        reindexar = []
+        for fila in filas:
+            id_ = fila['id']
+            if id_ is None:
+                id_ = self.por_clave.get((fila['categoria_id'], busqueda.normalizar(fila['nombre'])))
+            elif id_ not in self.productos and id_ not in altas:
+                resultado.error(fila['numero'], f'no existe el producto {id_}')
+                continue
+
+            if id_ is None or id_ in altas:
+                # Alta (o una fila repetida de un alta de este mismo lote)
+                if id_ is None:
+                    id_ = self.siguiente_id
+                    self.siguiente_id += 1
+                    resultado.creados += 1
+                altas[id_] = {
+                    'id': id_, 'nombre': fila['nombre'], 'categoria_id': fila['categoria_id'],
+                    'precio': fila['precio'], 'stock': fila['stock'] or 0,
+                    'stock_minimo': fila['stock_minimo'] or 0,
+                }
+                self.por_clave[(fila['categoria_id'], busqueda.normalizar(fila['nombre']))] = id_
+                continue
+
+            # Si el producto ya cambió en este lote, se parte de ese cambio
+            actual = self.productos[id_]
+            if id_ in cambios:
+                c = cambios[id_]
+                actual = (c['nombre'], c['categoria_id'], c['precio'], c['stock'], c['stock_minimo'])
+            nuevo = (
+                fila['nombre'], fila['categoria_id'], fila['precio'],
+                actual[3] if fila['stock'] is None else fila['stock'],
+                actual[4] if fila['stock_minimo'] is None else fila['stock_minimo'],
+            )
+            if nuevo == actual:
+                resultado.sin_cambios += 1
+                continue
+            if id_ not in cambios:
+                resultado.actualizados += 1
+            cambios[id_] = dict(zip(('nombre', 'categoria_id', 'precio', 'stock', 'stock_minimo'), nuevo),
+                                id=id_, _antes=self.productos[id_])
+
+        if altas:
+            db.session.execute(insert(Producto), list(altas.values()))
+            for alta in altas.values():
+                movimientos_.append({'producto_id': alta['id'], 'tipo': 'inicial',
+                                     'cantidad': alta['stock'], 'usuario_id': self.usuario_id})
+                reindexar.append((alta['id'], alta['nombre']))
+                self._recordar(alta['id'], alta['nombre'], alta['categoria_id'], alta['precio'],
+                               alta['stock'], alta['stock_minimo'])
+
+        if cambios:
+            db.session.execute(
+                update(Producto),
+                [{k: v for k, v in c.items() if k != '_antes'} for c in cambios.values()],
+            )
+            for id_, c in cambios.items():
+                nombre, categoria_id, precio, stock, minimo = c['_antes']
+                movimientos_.append({'producto_id': id_, 'tipo': 'ajuste',
+                                     'cantidad': c['stock'] - stock, 'usuario_id': self.usuario_id})
+                alertas_.append((id_, c['nombre'], stock, minimo, c['stock'], c['stock_minimo']))
+                if c['nombre'] != nombre:
+                    reindexar.append((id_, c['nombre']))
+                clave = (categoria_id, busqueda.normalizar(nombre))
+                if self.por_clave.get(clave) == id_:
+                    del self.por_clave[clave]
+                self._recordar(id_, c['nombre'], c['categoria_id'], c['precio'],
+                               c['stock'], c['stock_minimo'])
+
+        movimientos.registrar(movimientos_)
+        alertas.detectar(db.session, alertas_)
+        busqueda.indexar_lote(reindexar)
+
+
+def importar(texto, formato='csv', usuario_id=None, lote=LOTE, progreso=None):
+    """Importa un catálogo desde un archivo de texto abierto.
+
+    Valida y acumula filas hasta completar `lote`, las aplica y hace
+    commit; después llama a `progreso(resultado)`. Las filas con errores se
+    informan en el resultado sin detener la importación. Devuelve el
+    Resultado final.
+    """
+    resultado = Resultado()
+    importador = Importador(usuario_id)
+    pendientes = []
+
+    def vaciar():
+        try:
+            importador.aplicar(pendientes, resultado)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        pendientes.clear()
+        if progreso:
+            progreso(resultado)
+
+    for numero, datos in enumerate(leer(texto, formato), start=1):
+        resultado.leidas += 1
+        try:
+            fila = _validar(datos)
+        except ValueError as e:
+            resultado.error(numero, str(e))
+            continue
+        fila['numero'] = numero
+        pendientes.append(fila)
+        if len(pendientes) >= lote:
+            vaciar()
+    if pendientes:
+        vaciar()
+    return resultado
+
+
+# --- Exportación ---
+
+def filas_catalogo(lote=LOTE):
+    """Productos con el nombre de su categoría, por id, leídos de a `lote`."""
+    consulta = (
+        db.session.query(
+            Producto.id, Producto.nombre, Categoria.nombre, Producto.precio,
+            Producto.stock, Producto.stock_minimo
+        )
+        .join(Categoria, Producto.categoria_id == Categoria.id)
+        .order_by(Producto.id)
+        .execution_options(stream_results=True)
+        .yield_per(lote)
+    )
+    for fila in consulta:
+        yield dict(zip(COLUMNAS, fila))
+
+
+def exportar(salida, formato='csv', lote=LOTE, progreso=None):
+    """Escribe el catálogo en `salida` (texto) en el mismo formato que lee `importar`.
+
+    Llama a `progreso(cantidad, segundos)` cada `lote` productos. Devuelve
+    la cantidad exportada.
+    """
+    inicio = time.perf_counter()
+    escritor = None
+    if formato == 'csv':
+        escritor = csv.DictWriter(salida, fieldnames=COLUMNAS)
+        escritor.writeheader()
+    elif formato == 'json':
+        salida.write('[')
+
+    cantidad = 0
+    for cantidad, fila in enumerate(filas_catalogo(lote), start=1):
+        if escritor:
+            escritor.writerow(fila)
+        else:
+            fila['precio'] = float(fila['precio'])
+            separador = ',\n' if formato == 'json' and cantidad > 1 else ''
+            salida.write(separador + json.dumps(fila, ensure_ascii=False))
+            if formato == 'jsonl':
+                salida.write('\n')
+        if progreso and cantidad % lote == 0:
+            progreso(cantidad, time.perf_counter() - inicio)
+
+    if formato == 'json':
+        salida.write(']\n')
+    return cantidad
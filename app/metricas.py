@@ -0,0 +1,222 @@
+import threading
+import time
+
+from flask import (
+    before_render_template, current_app, g, has_request_context, request, template_rendered
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Métricas por endpoint: cantidad de consultas SQL, tiempo en la base,
+# consulta más lenta, tiempo de renderizado y duración total.
+#
+# Las consultas se miden con los eventos del motor de SQLAlchemy y se
+# acumulan en `g` durante la petición; al terminar se suman al registro del
+# endpoint. Con METRICAS_EXPLAIN_MS se registra en el log el plan de las
+# consultas que superan ese tiempo.
+
+LARGO_SQL = 300
+
+
+class Registro:
+    """Acumulados por endpoint, compartidos por los hilos del proceso."""
+
+    def __init__(self):
+        self._datos = {}
+        self._candado = threading.Lock()
+
+    def sumar(self, endpoint, consultas, tiempo_db, render, duracion, lenta):
+        with self._candado:
+            datos = self._datos.setdefault(endpoint, {
+                'peticiones': 0,
+                'consultas': 0,
+                'max_consultas': 0,
+                'tiempo_db': 0.0,
+                'tiempo_render': 0.0,
+                'duracion': 0.0,
+                'consulta_lenta': {'segundos': 0.0, 'sql': None},
+            })
+            datos['peticiones'] += 1
+            datos['consultas'] += consultas
+            datos['max_consultas'] = max(datos['max_consultas'], consultas)
+            datos['tiempo_db'] += tiempo_db
+            datos['tiempo_render'] += render
+            datos['duracion'] += duracion
+            if lenta[0] > datos['consulta_lenta']['segundos']:
+                datos['consulta_lenta'] = {'segundos': lenta[0], 'sql': lenta[1]}
+
+    def resumen(self):
+        """Copia de los acumulados con promedios por petición."""
+        with self._candado:
+            resumen = {}
+            for endpoint, datos in sorted(self._datos.items()):
+                n = datos['peticiones']
+                resumen[endpoint] = dict(
+                    datos,
+                    consulta_lenta=dict(datos['consulta_lenta']),
+                    consultas_promedio=round(datos['consultas'] / n, 2),
+                    ms_db_promedio=round(datos['tiempo_db'] / n * 1000, 2),
+                    ms_render_promedio=round(datos['tiempo_render'] / n * 1000, 2),
+                    ms_promedio=round(datos['duracion'] / n * 1000, 2),
+                )
+            return resumen
+
+    def reiniciar(self):
+        with self._candado:
+            self._datos.clear()
+
+
+def init_app(app):
+    """Activa la medición salvo que METRICAS sea False."""
+    app.extensions['metricas'] = Registro()
+    if not app.config.get('METRICAS', True):
+        return
+
+    app.before_request(_inicio_peticion)
+    app.after_request(_fin_peticion)
+    before_render_template.connect(_inicio_render, app)
+    template_rendered.connect(_fin_render, app)
+
+
+def _registro():
+    return current_app.extensions['metricas']
+
+
+def resumen():
+    return _registro().resumen()
+
+
+def reiniciar():
+    _registro().reiniciar()
+
+
+def _medicion():
+    """Medición de la petición en curso, o None fuera de una petición medida."""
+    if not has_request_context():
+        return None
+    return g.get('_metricas')
+
+
+# --- Hooks de Flask ---
+
+def _inicio_peticion():
+    g._metricas = {
+        'inicio': time.perf_counter(),
+        'consultas': 0,
+        'tiempo_db': 0.0,
+        'render': 0.0,
+        'render_inicio': None,
+        'lenta': (0.0, None),
+    }
+
+
+def _fin_peticion(respuesta):
+    medicion = g.pop('_metricas', None)
+    if medicion is None:
+        return respuesta
+    duracion = time.perf_counter() - medicion['inicio']
+    _registro().sumar(
+        request.endpoint or 'sin_ruta', medicion['consultas'], medicion['tiempo_db'],
+        medicion['render'], duracion, medicion['lenta']
+    )
+    respuesta.headers['Server-Timing'] = (
+        f"db;dur={medicion['tiempo_db'] * 1000:.1f};desc=\"{medicion['consultas']} consultas\", "
+        f"render;dur={medicion['render'] * 1000:.1f}, "
+        f"total;dur={duracion * 1000:.1f}"
+    )
+    return respuesta
+
+
+def _inicio_render(sender, template, context, **extra):
+    medicion = _medicion()
+    if medicion is not None:
+        medicion['render_inicio'] = time.perf_counter()
+
+
+def _fin_render(sender, template, context, **extra):
+    medicion = _medicion()
+    if medicion is not None and medicion['render_inicio'] is not None:
+        medicion['render'] += time.perf_counter() - medicion['render_inicio']
+        medicion['render_inicio'] = None
+
+
+# --- Eventos del motor ---
+
+# El inicio se guarda en el contexto de ejecución de la sentencia: si falla,
+# se descarta con ella y no queda nada pendiente en la conexión.
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _antes_de_consulta(conexion, cursor, sentencia, parametros, contexto, varias):
+    if _medicion() is not None and contexto is not None:
+        contexto._metricas_inicio = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _despues_de_consulta(conexion, cursor, sentencia, parametros, contexto, varias):
+    medicion = _medicion()
+    inicio = getattr(contexto, '_metricas_inicio', None)
+    if medicion is None or inicio is None:
+        return
+    segundos = time.perf_counter() - inicio
+    medicion['consultas'] += 1
+    medicion['tiempo_db'] += segundos
+    if segundos > medicion['lenta'][0]:
+        medicion['lenta'] = (segundos, ' '.join(sentencia.split())[:LARGO_SQL])
+
+    umbral = current_app.config.get('METRICAS_EXPLAIN_MS')
+    if umbral is not None and segundos * 1000 >= umbral and not varias:
+        _explicar(conexion, sentencia, parametros, segundos)
+
+
+def _explicar(conexion, sentencia, parametros, segundos):
+    """Registra en el log el plan de ejecución de una consulta lenta."""
+    if not sentencia.lstrip().upper().startswith('SELECT'):
+        return
+    prefijo = 'EXPLAIN QUERY PLAN ' if conexion.dialect.name == 'sqlite' else 'EXPLAIN '
+    cursor = conexion.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(prefijo + sentencia, parametros)
+        plan = '\n'.join('  ' + ' | '.join(str(c) for c in fila) for fila in cursor.fetchall())
+    except Exception as e:
+        plan = f'  (no se pudo obtener el plan: {e})'
+    finally:
+        cursor.close()
+    current_app.logger.warning(
+        f"Consulta lenta ({segundos * 1000:.1f} ms) en {request.endpoint}:\n"
+        f"  {' '.join(sentencia.split())[:LARGO_SQL]}\n{plan}"
+    )
+
+
+# --- Formato Prometheus ---
+
+_SERIES = (
+    ('inventario_peticiones_total', 'counter', 'Peticiones atendidas.', 'peticiones'),
+    ('inventario_consultas_sql_total', 'counter', 'Consultas SQL ejecutadas.', 'consultas'),
+    ('inventario_tiempo_db_segundos_total', 'counter', 'Tiempo total en la base de datos.', 'tiempo_db'),
+    ('inventario_tiempo_render_segundos_total', 'counter', 'Tiempo total renderizando plantillas.',
+     'tiempo_render'),
+    ('inventario_duracion_segundos_total', 'counter', 'Duración total de las peticiones.', 'duracion'),
+    ('inventario_max_consultas_sql', 'gauge', 'Máximo de consultas SQL en una petición.', 'max_consultas'),
+)
+
+
+def _etiqueta(valor):
+    return valor.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def prometheus():
+    """Métricas en el formato de texto de Prometheus."""
+    datos = resumen()
+    lineas = []
+    for nombre, tipo, ayuda, clave in _SERIES:
+        lineas.append(f'# HELP {nombre} {ayuda}')
+        lineas.append(f'# TYPE {nombre} {tipo}')
+        for endpoint, valores in datos.items():
+            lineas.append(f'{nombre}{{endpoint="{_etiqueta(endpoint)}"}} {valores[clave]}')
+
+    nombre = 'inventario_consulta_mas_lenta_segundos'
+    lineas.append(f'# HELP {nombre} Consulta SQL más lenta observada.')
+    lineas.append(f'# TYPE {nombre} gauge')
+    for endpoint, valores in datos.items():
+        lineas.append(f'{nombre}{{endpoint="{_etiqueta(endpoint)}"}} {valores["consulta_lenta"]["segundos"]}')
+    return '\n'.join(lineas) + '\n'
@@ -1,5 +1,19 @@
 from . import db
 from flask_login import UserMixin
+from sqlalchemy.dialects import sqlite
+
+# SQLite guarda las fechas como texto y las compara como texto.
+# CURRENT_TIMESTAMP escribe 'YYYY-MM-DD HH:MM:SS', pero SQLAlchemy guarda y
+# compara los datetime de Python con microsegundos ('... .ffffff'), así que
+# una venta no resultaba igual al cursor que apunta a ella y las ventas de
+# las 00:00:00 quedaban fuera de los rangos por día. Todas las columnas de
+# fecha y hora usan el formato de CURRENT_TIMESTAMP.
+FechaHora = db.DateTime().with_variant(
+    sqlite.DATETIME(
+        storage_format='%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d'
+    ),
+    'sqlite',
+)
 
 
 class Usuario(db.Model, UserMixin):
@@ -15,7 +29,7 @@ class Usuario(db.Model, UserMixin):
     telefono = db.Column(db.String(20))
     direccion = db.Column(db.String(100))
     estado = db.Column(db.String(20), default="activo")
-    fecha_registro = db.Column(db.DateTime, default=db.func.current_timestamp())
+    fecha_registro = db.Column(FechaHora, default=db.func.current_timestamp())
     username = db.Column(db.String(50), unique=True, nullable=False)
 
     ventas = db.relationship(
@@ -47,6 +61,9 @@ class Producto(db.Model):
     precio = db.Column(db.Numeric(10, 2), nullable=False)
     stock = db.Column(db.Integer, nullable=False)
     stock_minimo = db.Column(db.Integer, nullable=False)
+    # Unidades que faltan para llegar al mínimo; la calcula el motor y está
+    # indexada para que las alertas no recorran toda la tabla.
+    deficit = db.Column(db.Integer, db.Computed("stock_minimo - stock"), index=True)
     categoria_id = db.Column(db.Integer, db.ForeignKey("categorias.id"), nullable=False)
 
     categoria = db.relationship("Categoria", back_populates="productos")
@@ -62,14 +79,22 @@ class Venta(db.Model):
     """Modelo de venta."""
 
     __tablename__ = "ventas"
+    __table_args__ = (
+        db.Index("ix_ventas_fecha_id", "fecha", "id"),
+        db.Index("ix_ventas_usuario_fecha_id", "usuario_id", "fecha", "id"),
+        db.Index("ux_ventas_clave_idempotencia", "clave_idempotencia", unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
-    fecha = db.Column(db.DateTime, default=db.func.current_timestamp())
+    fecha = db.Column(FechaHora, default=db.func.current_timestamp())
     total = db.Column(db.Numeric(10, 2), nullable=False)
     usuario_id = db.Column(db.Integer, db.ForeignKey("usuarios.id"), nullable=False)
+    # Clave generada por la terminal para que reintentar un envío no duplique la venta
+    clave_idempotencia = db.Column(db.String(64), nullable=True)
 
     vendedor = db.relationship("Usuario", back_populates="ventas")
     detalles = db.relationship(
-        "DetalleVenta", back_populates="venta", cascade="all, delete-orphan"
+        "DetalleVenta", back_populates="venta", cascade="all, delete-orphan",
+        order_by="DetalleVenta.id"
     )
 
 
@@ -96,8 +121,96 @@ class Compra(db.Model):
     cantidad = db.Column(db.Integer, nullable=False)
     precio_unitario = db.Column(db.Numeric(10, 2), nullable=False)
     total = db.Column(db.Numeric(10, 2), nullable=False)
-    fecha = db.Column(db.DateTime, default=db.func.current_timestamp())
+    fecha = db.Column(FechaHora, default=db.func.current_timestamp())
     usuario_id = db.Column(db.Integer, db.ForeignKey("usuarios.id"), nullable=False)
 
     producto = db.relationship("Producto", back_populates="compras")
     usuario = db.relationship("Usuario", back_populates="compras")
+
+
+class ResumenVentaUsuario(db.Model):
+    """Ventas acumuladas por día y vendedor."""
+
+    __tablename__ = "resumen_ventas_usuario"
+    fecha = db.Column(db.Date, primary_key=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey("usuarios.id"), primary_key=True)
+    cantidad_ventas = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+
+
+class ResumenVentaProducto(db.Model):
+    """Unidades e importe vendidos por día y producto."""
+
+    __tablename__ = "resumen_ventas_producto"
+    fecha = db.Column(db.Date, primary_key=True)
+    producto_id = db.Column(db.Integer, db.ForeignKey("productos.id", ondelete="CASCADE"), primary_key=True)
+    cantidad = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+
+
+class ResumenVentaCategoria(db.Model):
+    """Importe vendido por día y categoría."""
+
+    __tablename__ = "resumen_ventas_categoria"
+    fecha = db.Column(db.Date, primary_key=True)
+    categoria_id = db.Column(db.Integer, db.ForeignKey("categorias.id", ondelete="CASCADE"), primary_key=True)
+    total = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+
+
+class MovimientoStock(db.Model):
+    """Movimiento de stock de un producto. Solo se agregan filas, nunca se modifican."""
+
+    __tablename__ = "movimientos_stock"
+    __table_args__ = (
+        db.Index("ix_movimientos_producto_fecha", "producto_id", "fecha"),
+        db.Index("ix_movimientos_fecha", "fecha"),
+    )
+    id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), primary_key=True)
+    fecha = db.Column(FechaHora, nullable=False, default=db.func.current_timestamp())
+    producto_id = db.Column(db.Integer, db.ForeignKey("productos.id", ondelete="CASCADE"), nullable=False)
+    # 'inicial', 'venta', 'compra' o 'ajuste'
+    tipo = db.Column(db.String(20), nullable=False)
+    # Positiva si entra mercadería, negativa si sale
+    cantidad = db.Column(db.Integer, nullable=False)
+    # Venta que originó el movimiento, si corresponde
+    venta_id = db.Column(db.Integer, db.ForeignKey("ventas.id", ondelete="SET NULL"), nullable=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey("usuarios.id", ondelete="SET NULL"), nullable=True)
+
+
+class CorteStock(db.Model):
+    """Stock de cada producto al inicio de `fecha`, calculado desde los movimientos."""
+
+    __tablename__ = "cortes_stock"
+    fecha = db.Column(FechaHora, primary_key=True)
+    producto_id = db.Column(db.Integer, db.ForeignKey("productos.id", ondelete="CASCADE"), primary_key=True)
+    stock = db.Column(db.Integer, nullable=False)
+
+
+class MesArchivado(db.Model):
+    """Mes de ventas pasado de las tablas a un archivo comprimido."""
+
+    __tablename__ = "meses_archivados"
+    # 'YYYY-MM'
+    mes = db.Column(db.String(7), primary_key=True)
+    archivo = db.Column(db.String(255), nullable=False)
+    sha256 = db.Column(db.String(64), nullable=False)
+    ventas = db.Column(db.Integer, nullable=False)
+    lineas = db.Column(db.Integer, nullable=False)
+    unidades = db.Column(db.Integer, nullable=False)
+    total = db.Column(db.Numeric(14, 2), nullable=False)
+    fecha = db.Column(FechaHora, nullable=False, default=db.func.current_timestamp())
+
+
+class EventoStock(db.Model):
+    """Producto que cruzó su umbral de stock bajo, para los avisos en vivo."""
+
+    __tablename__ = "eventos_stock"
+    id = db.Column(db.Integer, primary_key=True)
+    fecha = db.Column(FechaHora, nullable=False, default=db.func.current_timestamp())
+    # 'stock_bajo' o 'stock_normal'
+    tipo = db.Column(db.String(20), nullable=False)
+    # Sin clave foránea; al eliminar un producto se borran con alertas.olvidar
+    producto_id = db.Column(db.Integer, nullable=False)
+    nombre = db.Column(db.String(100), nullable=False)
+    stock = db.Column(db.Integer, nullable=False)
+    stock_minimo = db.Column(db.Integer, nullable=False)
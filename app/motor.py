@@ -0,0 +1,89 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# Perfiles del motor de base de datos según el dialecto de la URI.
+#
+# - MySQL y otros servidores: tamaño del pool, desborde, reciclado de
+#   conexiones antes del wait_timeout del servidor y pre-ping para descartar
+#   conexiones caídas.
+# - SQLite: PRAGMAs aplicados a cada conexión nueva (WAL, synchronous,
+#   mmap y busy timeout) para que las lecturas no esperen a las ventas.
+#
+# Todos los valores se pueden cambiar en la configuración de la app.
+
+POR_DEFECTO = {
+    'DB_POOL_SIZE': 10,
+    'DB_MAX_OVERFLOW': 20,
+    'DB_POOL_TIMEOUT': 30,
+    # Menor que el wait_timeout de MySQL (28800 por defecto, a menudo 300 en hosting)
+    'DB_POOL_RECYCLE': 280,
+    'DB_POOL_PRE_PING': True,
+    'SQLITE_JOURNAL_MODE': 'WAL',
+    'SQLITE_SYNCHRONOUS': 'NORMAL',
+    'SQLITE_MMAP_MB': 256,
+    'SQLITE_BUSY_TIMEOUT_MS': 5000,
+}
+
+
+def _valor(config, clave):
+    return config.get(clave, POR_DEFECTO[clave])
+
+
+def es_sqlite(uri):
+    return make_url(uri).get_backend_name() == 'sqlite'
+
+
+def opciones(uri, config):
+    """Opciones de create_engine para la URI dada según la configuración."""
+    if es_sqlite(uri):
+        return {}
+    return {
+        'pool_size': _valor(config, 'DB_POOL_SIZE'),
+        'max_overflow': _valor(config, 'DB_MAX_OVERFLOW'),
+        'pool_timeout': _valor(config, 'DB_POOL_TIMEOUT'),
+        'pool_recycle': _valor(config, 'DB_POOL_RECYCLE'),
+        'pool_pre_ping': _valor(config, 'DB_POOL_PRE_PING'),
+    }
+
+
+def pragmas_sqlite(config):
+    """PRAGMAs que se ejecutan al abrir cada conexión SQLite."""
+    pragmas = []
+    modo = _valor(config, 'SQLITE_JOURNAL_MODE')
+    if modo:
+        pragmas.append(f'PRAGMA journal_mode={modo}')
+    sincronizacion = _valor(config, 'SQLITE_SYNCHRONOUS')
+    if sincronizacion:
+        pragmas.append(f'PRAGMA synchronous={sincronizacion}')
+    mmap = _valor(config, 'SQLITE_MMAP_MB')
+    if mmap is not None:
+        pragmas.append(f'PRAGMA mmap_size={int(mmap) * 1024 * 1024}')
+    espera = _valor(config, 'SQLITE_BUSY_TIMEOUT_MS')
+    if espera is not None:
+        pragmas.append(f'PRAGMA busy_timeout={int(espera)}')
+    return pragmas
+
+
+def configurar(engine, config):
+    """Registra los PRAGMAs de SQLite en el evento connect del motor."""
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = pragmas_sqlite(config)
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _al_conectar(conexion_dbapi, registro):
+        cursor = conexion_dbapi.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+def init_app(app, db):
+    """Aplica los perfiles a todos los motores (incluidos los binds) de la app."""
+    with app.app_context():
+        for engine in db.engines.values():
+            configurar(engine, app.config)
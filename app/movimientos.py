@@ -0,0 +1,151 @@
+from datetime import datetime, time
+
+from sqlalchemy import func, insert, literal, select, union_all
+
+from app import db
+from app.models import CorteStock, MovimientoStock, Producto
+
+# Libro de movimientos de stock.
+#
+# Cada cambio de `Producto.stock` agrega una fila a movimientos_stock en la
+# misma transacción. Los cortes (cortes_stock) guardan el stock de cada
+# producto al inicio de una fecha, así una consulta histórica parte del
+# último corte y solo suma los movimientos posteriores.
+
+TIPOS = ('inicial', 'venta', 'compra', 'ajuste')
+
+
+def registrar(filas):
+    """Agrega movimientos en bloque; ignora los de cantidad cero.
+
+    Cada fila es un dict con producto_id, tipo y cantidad, y opcionalmente
+    venta_id y usuario_id. No hace commit.
+    """
+    filas = [
+        {
+            'producto_id': f['producto_id'],
+            'tipo': f['tipo'],
+            'cantidad': f['cantidad'],
+            'venta_id': f.get('venta_id'),
+            'usuario_id': f.get('usuario_id'),
+        }
+        for f in filas
+        if f['cantidad']
+    ]
+    if filas:
+        db.session.execute(insert(MovimientoStock), filas)
+    return len(filas)
+
+
+def iniciar(usuario_id=None):
+    """Registra el stock actual como saldo inicial de los productos sin movimientos.
+
+    Sirve para empezar a usar el libro sobre una base existente. No hace commit.
+    """
+    sin_movimientos = ~(
+        select(MovimientoStock.id)
+        .where(MovimientoStock.producto_id == Producto.id)
+        .exists()
+    )
+    origen = select(
+        Producto.id, literal('inicial'), Producto.stock, literal(usuario_id)
+    ).where(sin_movimientos, Producto.stock != 0)
+    resultado = db.session.execute(
+        insert(MovimientoStock).from_select(
+            ['producto_id', 'tipo', 'cantidad', 'usuario_id'], origen
+        )
+    )
+    return resultado.rowcount
+
+
+def _ahora():
+    """Fecha y hora actuales según el motor, la misma base que usan los movimientos."""
+    return db.session.scalar(select(func.current_timestamp()))
+
+
+def _ultimo_corte(hasta=None):
+    """Fecha del último corte en o antes de `hasta` (o el último de todos)."""
+    consulta = select(func.max(CorteStock.fecha))
+    if hasta is not None:
+        consulta = consulta.where(CorteStock.fecha <= hasta)
+    return db.session.scalar(consulta)
+
+
+def _saldos(momento=None):
+    """Consulta (producto_id, stock) con el saldo de cada producto antes de `momento`.
+
+    Parte del último corte anterior y suma los movimientos desde ese corte.
+    Sin `momento` calcula el saldo actual.
+    """
+    corte = _ultimo_corte(momento)
+    partes = []
+    movimientos = select(MovimientoStock.producto_id, MovimientoStock.cantidad)
+    if corte is not None:
+        partes.append(
+            select(CorteStock.producto_id, CorteStock.stock.label('cantidad'))
+            .where(CorteStock.fecha == corte)
+        )
+        movimientos = movimientos.where(MovimientoStock.fecha >= corte)
+    if momento is not None:
+        movimientos = movimientos.where(MovimientoStock.fecha < momento)
+    partes.append(movimientos)
+
+    unidos = union_all(*partes).subquery()
+    return (
+        select(unidos.c.producto_id, func.sum(unidos.c.cantidad).label('stock'))
+        .group_by(unidos.c.producto_id)
+    )
+
+
+def stock_en(momento, producto_ids=None):
+    """Stock de cada producto justo antes de `momento`, como dict {id: stock}."""
+    saldos = _saldos(momento).subquery()
+    consulta = select(saldos.c.producto_id, saldos.c.stock)
+    if producto_ids is not None:
+        consulta = consulta.where(saldos.c.producto_id.in_(producto_ids))
+    return {id_: int(stock) for id_, stock in db.session.execute(consulta)}
+
+
+def crear_corte(fecha=None):
+    """Guarda el stock de todos los productos al inicio de `fecha`.
+
+    Por defecto usa el inicio del día actual del motor. Se calcula con un
+    único INSERT ... SELECT a partir del corte anterior. Si ya existe un corte
+    en esa fecha no hace nada. Devuelve la cantidad de filas del corte.
+    No hace commit.
+    """
+    ahora = _ahora()
+    if fecha is None:
+        fecha = datetime.combine(ahora.date(), time())
+    if fecha > ahora:
+        raise ValueError('No se puede crear un corte en el futuro.')
+
+    existentes = db.session.scalar(
+        select(func.count()).select_from(CorteStock).where(CorteStock.fecha == fecha)
+    )
+    if existentes:
+        return existentes
+
+    saldos = _saldos(fecha).subquery()
+    resultado = db.session.execute(
+        insert(CorteStock).from_select(
+            ['fecha', 'producto_id', 'stock'],
+            select(literal(fecha, CorteStock.fecha.type), saldos.c.producto_id, saldos.c.stock)
+        )
+    )
+    return resultado.rowcount
+
+
+def inconsistencias():
+    """Productos cuyo stock no coincide con el saldo del libro de movimientos.
+
+    Devuelve filas (id, nombre, stock, saldo) calculadas con una sola consulta.
+    """
+    saldos = _saldos().subquery()
+    saldo = func.coalesce(saldos.c.stock, 0)
+    return db.session.execute(
+        select(Producto.id, Producto.nombre, Producto.stock, saldo.label('saldo'))
+        .outerjoin(saldos, saldos.c.producto_id == Producto.id)
+        .where(Producto.stock != saldo)
+        .order_by(Producto.id)
+    ).all()
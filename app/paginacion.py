@@ -0,0 +1,83 @@
+import base64
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import joinedload
+
+from app.models import Venta
+
+POR_PAGINA = 50
+
+
+class Pagina:
+    """Resultado de una consulta paginada por cursor."""
+
+    def __init__(self, items, siguiente=None, anterior=None):
+        self.items = items
+        self.siguiente = siguiente
+        self.anterior = anterior
+
+
+def codificar_cursor(venta):
+    """Codifica la posición (fecha, id) de una venta en un cursor opaco."""
+    valor = f"{venta.fecha.isoformat()}|{venta.id}"
+    return base64.urlsafe_b64encode(valor.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    """Devuelve la tupla (fecha, id) de un cursor, o None si no es válido."""
+    if not cursor:
+        return None
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        valor = base64.urlsafe_b64decode(cursor + relleno).decode()
+        fecha, id_venta = valor.split('|')
+        return datetime.fromisoformat(fecha), int(id_venta)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def paginar_ventas(query, despues=None, antes=None, por_pagina=POR_PAGINA):
+    """Pagina ventas de la más reciente a la más antigua usando (fecha, id).
+
+    `despues` avanza hacia ventas más antiguas y `antes` retrocede hacia las
+    más recientes. Las condiciones se expresan como comparaciones simples para
+    que el motor pueda recorrer el índice compuesto sin ordenar en memoria.
+    """
+    query = query.options(joinedload(Venta.vendedor))
+    pos_despues = decodificar_cursor(despues)
+    pos_antes = decodificar_cursor(antes) if pos_despues is None else None
+
+    if pos_antes is not None:
+        fecha, id_venta = pos_antes
+        query = query.filter(or_(
+            Venta.fecha > fecha,
+            and_(Venta.fecha == fecha, Venta.id > id_venta)
+        )).order_by(Venta.fecha.asc(), Venta.id.asc())
+    else:
+        if pos_despues is not None:
+            fecha, id_venta = pos_despues
+            query = query.filter(or_(
+                Venta.fecha < fecha,
+                and_(Venta.fecha == fecha, Venta.id < id_venta)
+            ))
+        query = query.order_by(Venta.fecha.desc(), Venta.id.desc())
+
+    filas = query.limit(por_pagina + 1).all()
+    hay_mas = len(filas) > por_pagina
+    filas = filas[:por_pagina]
+
+    if pos_antes is not None:
+        filas.reverse()
+        hay_siguiente, hay_anterior = True, hay_mas
+    else:
+        hay_siguiente, hay_anterior = hay_mas, pos_despues is not None
+
+    if not filas:
+        return Pagina([])
+
+    return Pagina(
+        filas,
+        siguiente=codificar_cursor(filas[-1]) if hay_siguiente else None,
+        anterior=codificar_cursor(filas[0]) if hay_anterior else None,
+    )
@@ -0,0 +1,233 @@
+import hashlib
+import hmac
+import importlib
+import json
+import os
+import threading
+import time
+from contextlib import suppress
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError
+
+from flask import current_app, jsonify, redirect, request, send_file, url_for
+
+# Los PDF se generan fuera del hilo de la petición y se guardan en una caché
+# en disco direccionada por contenido: la clave es un HMAC del tipo de
+# documento y sus parámetros, así que cada factura se renderiza una sola vez.
+# Junto a cada documento, un archivo <clave>.json guarda el estado del
+# trabajo y el nombre de descarga: la consulta de estado puede caer en
+# cualquier worker, no solo en el que encoló la generación.
+#
+# xhtml2pdf (con reportlab, html5lib, pyhanko...) se importa recién al
+# generar el primer documento: cargarlo con el módulo duplicaba el tiempo de
+# arranque de cada worker y de cada comando `flask`.
+
+MAX_TRABAJOS = 1000
+
+_ejecutor = None
+_trabajos = {}
+_candado = threading.Lock()
+
+
+class PDFError(Exception):
+    """Fallo de xhtml2pdf al generar un documento."""
+
+
+def _generar(html, ruta):
+    """Convierte el HTML en PDF y lo escribe de forma atómica en `ruta`."""
+    from xhtml2pdf import pisa
+
+    temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporal, 'wb') as destino:
+        estado = pisa.CreatePDF(html, dest=destino)
+    if estado.err:
+        os.remove(temporal)
+        raise PDFError(f"xhtml2pdf devolvió {estado.err} errores")
+    os.replace(temporal, ruta)
+    return ruta
+
+
+def _obtener_ejecutor(app):
+    global _ejecutor
+    with _candado:
+        if _ejecutor is None:
+            trabajadores = app.config.get('PDF_TRABAJADORES', 2)
+            if app.config.get('PDF_EJECUTOR', 'hilos') == 'procesos':
+                _ejecutor = ProcessPoolExecutor(max_workers=trabajadores)
+            else:
+                _ejecutor = ThreadPoolExecutor(max_workers=trabajadores, thread_name_prefix='pdf')
+    return _ejecutor
+
+
+def _directorio(app):
+    directorio = app.config.get('PDF_CACHE_DIR') or os.path.join(app.instance_path, 'pdf_cache')
+    os.makedirs(directorio, exist_ok=True)
+    return directorio
+
+
+def clave(tipo, parametros):
+    """Clave estable y no adivinable para un documento y sus parámetros."""
+    contenido = json.dumps([tipo, parametros], sort_keys=True, default=str)
+    secreto = current_app.config['SECRET_KEY'].encode()
+    return hmac.new(secreto, contenido.encode(), hashlib.sha256).hexdigest()
+
+
+def ruta_cache(clave_pdf):
+    return os.path.join(_directorio(current_app), f'{clave_pdf}.pdf')
+
+
+def _ruta_marca(app, clave_pdf):
+    return os.path.join(_directorio(app), f'{clave_pdf}.json')
+
+
+def _marcar(app, clave_pdf, estado_, nombre):
+    """Escribe de forma atómica el estado del trabajo junto a la caché."""
+    ruta = _ruta_marca(app, clave_pdf)
+    temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporal, 'w') as archivo:
+        json.dump({'estado': estado_, 'nombre': nombre, 'momento': time.time()}, archivo)
+    os.replace(temporal, ruta)
+
+
+def _leer_marca(clave_pdf):
+    try:
+        with open(_ruta_marca(current_app, clave_pdf)) as archivo:
+            return json.load(archivo)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def depurar_cache(app=None):
+    """Elimina PDF más viejos que PDF_CACHE_MAX_DIAS y, si la caché supera
+    PDF_CACHE_MAX_MB, los menos usados recientemente hasta volver al límite."""
+    app = app or current_app
+    directorio = _directorio(app)
+    max_edad = app.config.get('PDF_CACHE_MAX_DIAS', 30) * 86400
+    max_bytes = app.config.get('PDF_CACHE_MAX_MB', 200) * 1024 * 1024
+    ahora = time.time()
+
+    def eliminar(ruta):
+        for archivo in (ruta, ruta[:-len('.pdf')] + '.json'):
+            with suppress(FileNotFoundError):
+                os.remove(archivo)
+
+    archivos = []
+    for entrada in os.scandir(directorio):
+        if entrada.name.endswith('.json'):
+            # Marcas de trabajos con error o que nunca terminaron
+            with suppress(FileNotFoundError):
+                if ahora - entrada.stat().st_mtime > max_edad:
+                    os.remove(entrada.path)
+            continue
+        if not entrada.name.endswith('.pdf'):
+            continue
+        info = entrada.stat()
+        if ahora - info.st_mtime > max_edad:
+            eliminar(entrada.path)
+        else:
+            archivos.append((info.st_mtime, info.st_size, entrada.path))
+
+    ocupado = sum(a[1] for a in archivos)
+    for _, tamano, ruta in sorted(archivos):
+        if ocupado <= max_bytes:
+            break
+        eliminar(ruta)
+        ocupado -= tamano
+
+
+def encolar(clave_pdf, nombre, html):
+    """Encola la generación de un PDF y devuelve su futuro.
+
+    Si ya hay un trabajo en curso para la misma clave se reutiliza.
+    """
+    app = current_app._get_current_object()
+    with _candado:
+        trabajo = _trabajos.get(clave_pdf)
+        if trabajo and not trabajo['futuro'].done():
+            return trabajo['futuro']
+
+    def terminar(futuro):
+        _marcar(app, clave_pdf, 'error' if futuro.exception() else 'listo', nombre)
+        depurar_cache(app)
+
+    _marcar(app, clave_pdf, 'pendiente', nombre)
+    futuro = _obtener_ejecutor(app).submit(_generar, html, ruta_cache(clave_pdf))
+    futuro.add_done_callback(terminar)
+    with _candado:
+        if len(_trabajos) >= MAX_TRABAJOS:
+            for terminado in [c for c, t in _trabajos.items() if t['futuro'].done()]:
+                del _trabajos[terminado]
+        _trabajos[clave_pdf] = {'futuro': futuro}
+    return futuro
+
+
+def estado(clave_pdf):
+    """Devuelve 'listo', 'pendiente', 'error' o None si la clave no se conoce.
+
+    Un trabajo pendiente por más de PDF_PENDIENTE_MAX_SEGUNDOS cuenta como
+    error: el worker que lo generaba pudo haberse reiniciado.
+    """
+    if os.path.exists(ruta_cache(clave_pdf)):
+        return 'listo'
+    marca = _leer_marca(clave_pdf)
+    if marca is None or marca['estado'] == 'listo':
+        # Nunca se pidió, o el documento ya salió de la caché
+        return None
+    if marca['estado'] == 'pendiente':
+        limite = current_app.config.get('PDF_PENDIENTE_MAX_SEGUNDOS', 300)
+        return 'pendiente' if time.time() - marca['momento'] <= limite else 'error'
+    return 'error'
+
+
+def nombre_descarga(clave_pdf):
+    marca = _leer_marca(clave_pdf)
+    return marca['nombre'] if marca else 'documento.pdf'
+
+
+def enviar(clave_pdf, nombre=None):
+    """Envía un PDF de la caché y renueva su fecha para la política LRU."""
+    ruta = ruta_cache(clave_pdf)
+    os.utime(ruta)
+    return send_file(ruta, mimetype='application/pdf', as_attachment=True,
+                     download_name=nombre or nombre_descarga(clave_pdf))
+
+
+def _pendiente(clave_pdf):
+    """Respuesta para un documento que todavía se está generando."""
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify(
+            trabajo=clave_pdf,
+            estado=url_for('main.estado_pdf', clave_pdf=clave_pdf)
+        ), 202
+    return redirect(url_for('main.estado_pdf', clave_pdf=clave_pdf))
+
+
+def servir(tipo, parametros, nombre, renderizar_html):
+    """Sirve un PDF desde la caché o lo genera en segundo plano.
+
+    `renderizar_html` solo se invoca si el documento no está en caché. Si
+    la generación termina dentro de PDF_ESPERA_SEGUNDOS se descarga
+    directamente; si no, se responde con el identificador del trabajo para
+    consultar su estado.
+    """
+    clave_pdf = clave(tipo, parametros)
+    if os.path.exists(ruta_cache(clave_pdf)):
+        return enviar(clave_pdf, nombre)
+    if clave_pdf not in _trabajos and estado(clave_pdf) == 'pendiente':
+        # Lo está generando otro worker
+        return _pendiente(clave_pdf)
+
+    futuro = encolar(clave_pdf, nombre, renderizar_html())
+    try:
+        futuro.result(timeout=current_app.config.get('PDF_ESPERA_SEGUNDOS', 5))
+    except TimeoutError:
+        return _pendiente(clave_pdf)
+    except Exception as e:
+        current_app.logger.error(f"Error al generar PDF {tipo}: {e}")
+        return "Error al generar el PDF", 500
+
+    return enviar(clave_pdf, nombre)
+
+
+def precargar():
+    """Importa xhtml2pdf por adelantado, para que la primera factura no lo espere."""
+    importlib.import_module('xhtml2pdf.pisa')
@@ -0,0 +1,80 @@
+import time
+from functools import wraps
+
+from flask import current_app, g, has_request_context, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Select, TextClause
+
+from app import cambios
+
+# Enrutamiento de lecturas a una réplica.
+#
+# Si la configuración define REPLICA_DATABASE_URI, las rutas marcadas con
+# `@usar_replica` envían sus SELECT a esa base. Todo lo demás (escrituras,
+# SELECT ... FOR UPDATE, conexiones pedidas sin sentencia) va a la
+# primaria. Una petición que escribe se queda en la primaria hasta el final
+# y, durante REPLICA_PEGAJOSA_SEGUNDOS, también las siguientes peticiones
+# del mismo usuario, para que vea sus propios cambios aunque la réplica
+# tenga demora.
+
+BIND = 'replica'
+
+
+class SesionEnrutada(Session):
+    """Sesión que manda las lecturas de las rutas marcadas a la réplica."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._leer_de_replica(clause):
+            return self._db.engines[BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _leer_de_replica(self, clause):
+        if not has_request_context() or not g.get('usar_replica'):
+            return False
+        if self._flushing or cambios.pendientes(self) or self.info.get('escribio'):
+            return False
+        if isinstance(clause, Select):
+            return clause._for_update_arg is None
+        if isinstance(clause, TextClause):
+            return clause.text.lstrip().upper().startswith('SELECT')
+        return False
+
+
+def configurar(config):
+    """Agrega el bind de la réplica a SQLALCHEMY_BINDS si hay una configurada."""
+    from app import motor
+
+    uri = config.get('REPLICA_DATABASE_URI')
+    if uri:
+        config.setdefault('SQLALCHEMY_BINDS', {})[BIND] = {
+            'url': uri, **motor.opciones(uri, config)
+        }
+
+
+def disponible():
+    return BIND in current_app.config.get('SQLALCHEMY_BINDS', {})
+
+
+def usar_replica(f):
+    """Marca una ruta de solo lectura para que consulte la réplica."""
+    @wraps(f)
+    def decorada(*args, **kwargs):
+        pegada = session.get('primaria_hasta', 0) > time.time()
+        g.usar_replica = disponible() and not pegada
+        return f(*args, **kwargs)
+    return decorada
+
+
+def init_app(app, db):
+    @app.after_request
+    def _recordar_escritura(respuesta):
+        if db.session().info.pop('escribio', False) and disponible():
+            session['primaria_hasta'] = time.time() + app.config.get('REPLICA_PEGAJOSA_SEGUNDOS', 5)
+        return respuesta
+
+
+@cambios.al_confirmar
+def _despues_de_commit(sesion, tablas):
+    # Marca que dura hasta el final de la petición, después del commit
+    if tablas:
+        sesion.info['escribio'] = True
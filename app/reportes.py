@@ -0,0 +1,107 @@
+from sqlalchemy import func
+
+from app import db
+from app.consultas import como_fecha_hora, en_rango, mes
+from app.models import (
+    Categoria, DetalleVenta, Producto, ResumenVentaCategoria,
+    ResumenVentaProducto, ResumenVentaUsuario, Usuario, Venta
+)
+
+# Cada reporte puede calcularse desde los resúmenes diarios (lo normal) o
+# desde las tablas base con `base=True`; la segunda forma sirve para
+# verificar que ambos caminos devuelven los mismos números.
+
+
+def _rango_base(inicio, fin):
+    return en_rango(
+        Venta.fecha,
+        como_fecha_hora(inicio) if inicio else None,
+        como_fecha_hora(fin) if fin else None
+    )
+
+
+def ventas_por_mes(inicio=None, fin=None, base=False):
+    """Total vendido por mes 'YYYY-MM' entre las fechas `inicio` y `fin`."""
+    if base:
+        consulta = db.session.query(
+            mes(Venta.fecha).label('mes'), func.sum(Venta.total)
+        ).filter(_rango_base(inicio, fin))
+    else:
+        consulta = db.session.query(
+            mes(ResumenVentaUsuario.fecha).label('mes'), func.sum(ResumenVentaUsuario.total)
+        ).filter(en_rango(ResumenVentaUsuario.fecha, inicio, fin))
+
+    filas = consulta.group_by('mes').order_by('mes').all()
+    return [(r[0], float(r[1])) for r in filas]
+
+
+def top_productos(inicio=None, fin=None, limite=5, base=False):
+    """Productos con más unidades vendidas en el rango."""
+    if base:
+        cantidad = func.sum(DetalleVenta.cantidad)
+        consulta = (
+            db.session.query(Producto.nombre, cantidad)
+            .join(DetalleVenta, DetalleVenta.producto_id == Producto.id)
+            .join(Venta, DetalleVenta.venta_id == Venta.id)
+            .filter(_rango_base(inicio, fin))
+        )
+    else:
+        cantidad = func.sum(ResumenVentaProducto.cantidad)
+        consulta = (
+            db.session.query(Producto.nombre, cantidad)
+            .join(ResumenVentaProducto, ResumenVentaProducto.producto_id == Producto.id)
+            .filter(en_rango(ResumenVentaProducto.fecha, inicio, fin))
+        )
+
+    filas = (
+        consulta.group_by(Producto.id)
+        .order_by(cantidad.desc(), Producto.id)
+        .limit(limite)
+        .all()
+    )
+    return [(r[0], int(r[1])) for r in filas]
+
+
+def ventas_por_categoria(inicio=None, fin=None, base=False):
+    """Importe vendido por categoría en el rango."""
+    if base:
+        consulta = (
+            db.session.query(Categoria.nombre, func.coalesce(func.sum(DetalleVenta.subtotal), 0))
+            .join(Producto, Categoria.id == Producto.categoria_id)
+            .join(DetalleVenta, Producto.id == DetalleVenta.producto_id)
+            .join(Venta, DetalleVenta.venta_id == Venta.id)
+            .filter(_rango_base(inicio, fin))
+        )
+    else:
+        consulta = (
+            db.session.query(Categoria.nombre, func.coalesce(func.sum(ResumenVentaCategoria.total), 0))
+            .join(ResumenVentaCategoria, ResumenVentaCategoria.categoria_id == Categoria.id)
+            .filter(en_rango(ResumenVentaCategoria.fecha, inicio, fin))
+        )
+
+    filas = consulta.group_by(Categoria.id).order_by(Categoria.nombre).all()
+    return [(r[0], float(r[1])) for r in filas]
+
+
+def ventas_por_usuario(base=False):
+    """Cantidad de ventas y monto total por vendedor."""
+    if base:
+        consulta = (
+            db.session.query(
+                Usuario.nombre,
+                func.count(Venta.id).label('cantidad_ventas'),
+                func.sum(Venta.total).label('total_ventas')
+            )
+            .join(Venta, Venta.usuario_id == Usuario.id)
+        )
+    else:
+        consulta = (
+            db.session.query(
+                Usuario.nombre,
+                func.sum(ResumenVentaUsuario.cantidad_ventas).label('cantidad_ventas'),
+                func.sum(ResumenVentaUsuario.total).label('total_ventas')
+            )
+            .join(ResumenVentaUsuario, ResumenVentaUsuario.usuario_id == Usuario.id)
+        )
+
+    return consulta.group_by(Usuario.id).order_by(Usuario.nombre).all()
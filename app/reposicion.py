@@ -0,0 +1,287 @@
+import math
+import os
+import tempfile
+from collections import namedtuple
+from datetime import date, timedelta
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from app import catalogo, db
+from app.consultas import como_fecha_hora, dia
+from app.models import Compra, DetalleVenta, MovimientoStock, Venta
+
+# Pronóstico de demanda y punto de reposición por producto.
+#
+# Guarda una matriz productos × días con las unidades vendidas en los
+# últimos REPOSICION_DIAS días (hoy incluido) en un archivo .npz de la
+# carpeta instance. Cada actualización lee solo las ventas que el libro de
+# movimientos registró desde la anterior, agrupadas por producto y día,
+# desplaza la ventana si cambió la fecha y suma las cantidades. La marca es
+# la hora de la base al empezar la lectura y se relee con un margen de
+# REPOSICION_SOLAPE_SEGUNDOS: una venta confirmada tarde tiene una hora de
+# registro anterior a la marca y con un tope por id se perdía. Las ventas
+# del margen que ya se sumaron se guardan para no contarlas dos veces. Con la
+# matriz se calculan para todo el catálogo a la vez: demanda diaria
+# pronosticada (media móvil o suavizado exponencial), stock de seguridad,
+# punto de reposición y cantidad sugerida a comprar.
+#
+# NumPy es opcional: las funciones lanzan ImportError si no está instalado.
+
+POR_DEFECTO = {
+    'REPOSICION_DIAS': 56,
+    # 'suavizado' (exponencial) o 'media' (media móvil de REPOSICION_MEDIA_DIAS)
+    'REPOSICION_METODO': 'suavizado',
+    'REPOSICION_MEDIA_DIAS': 14,
+    'REPOSICION_ALFA': 0.2,
+    # Días entre hacer el pedido y recibirlo
+    'REPOSICION_DEMORA_DIAS': 7,
+    # Días de demanda que debe cubrir cada compra
+    'REPOSICION_COBERTURA_DIAS': 14,
+    # Factor z del nivel de servicio (1.65 ≈ 95 % de los ciclos sin quiebre)
+    'REPOSICION_Z': 1.65,
+    'REPOSICION_LOTE': 5000,
+    # Margen con que se relee el libro; cubre transacciones de venta largas
+    'REPOSICION_SOLAPE_SEGUNDOS': 300,
+}
+
+Sugerencia = namedtuple(
+    'Sugerencia',
+    'producto pronostico_diario stock_seguridad punto_reorden sugerido dias_cobertura precio_compra'
+)
+
+
+def _valor(clave):
+    return current_app.config.get(clave, POR_DEFECTO[clave])
+
+
+def parametros():
+    """Ventana, demora y cobertura en días, para mostrar en el reporte."""
+    return {
+        'dias': _valor('REPOSICION_DIAS'),
+        'demora': _valor('REPOSICION_DEMORA_DIAS'),
+        'cobertura': _valor('REPOSICION_COBERTURA_DIAS'),
+    }
+
+
+def _ruta():
+    return current_app.config.get('REPOSICION_ARCHIVO') or os.path.join(
+        current_app.instance_path, 'reposicion', 'demanda.npz'
+    )
+
+
+def _estado_vacio(np, hoy):
+    return {
+        'ids': np.zeros(0, dtype=np.int64),
+        'matriz': np.zeros((0, _valor('REPOSICION_DIAS'))),
+        'hasta': hoy.toordinal(),
+        'leido_hasta': None,
+        'recientes': {},
+    }
+
+
+def _cargar(np, hoy):
+    """Estado guardado, o uno vacío si no existe, es de un formato anterior o
+    cambió el largo de la ventana."""
+    try:
+        with np.load(_ruta()) as datos:
+            estado = {
+                'ids': datos['ids'],
+                'matriz': datos['matriz'],
+                'hasta': int(datos['hasta']),
+                'leido_hasta': datos['leido_hasta'].item(),
+                'recientes': dict(zip(datos['recientes'].tolist(), datos['recientes_fecha'].tolist())),
+            }
+    except (FileNotFoundError, KeyError):
+        return _estado_vacio(np, hoy)
+    if estado['matriz'].shape[1] != _valor('REPOSICION_DIAS'):
+        return _estado_vacio(np, hoy)
+    return estado
+
+
+def _guardar(np, estado):
+    """Escribe el estado en un temporal y lo reemplaza de una vez: quien lee
+    el archivo nunca ve uno a medio escribir."""
+    ruta = _ruta()
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta), suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as archivo:
+            np.savez(archivo, ids=estado['ids'], matriz=estado['matriz'], hasta=estado['hasta'],
+                     leido_hasta=np.datetime64(estado['leido_hasta'], 's'),
+                     recientes=np.array(list(estado['recientes']), dtype=np.int64),
+                     recientes_fecha=np.array(list(estado['recientes'].values()), dtype='datetime64[s]'))
+        os.replace(temporal, ruta)
+    except BaseException:
+        os.unlink(temporal)
+        raise
+
+
+def _desplazar(np, matriz, dias):
+    """Corre la ventana `dias` días hacia adelante, con ceros en los días nuevos."""
+    if dias <= 0:
+        return matriz
+    nueva = np.zeros_like(matriz)
+    if dias < matriz.shape[1]:
+        nueva[:, :-dias] = matriz[:, dias:]
+    return nueva
+
+
+def _ventas_nuevas(desde, inicio):
+    """Unidades por (venta, producto, día) de las ventas del libro registradas desde `desde`.
+
+    Cada fila trae también la hora en que el libro registró la venta. Sin
+    `desde` se lee la ventana entera, incluidas las ventas anteriores al
+    libro (con hora None).
+    """
+    registro = (
+        select(MovimientoStock.venta_id, func.max(MovimientoStock.fecha).label('fecha'))
+        .where(MovimientoStock.tipo == 'venta',
+               MovimientoStock.fecha >= (desde or como_fecha_hora(inicio)))
+        .group_by(MovimientoStock.venta_id)
+        .subquery()
+    )
+    dia_venta = dia(Venta.fecha)
+    consulta = (
+        select(Venta.id, registro.c.fecha, DetalleVenta.producto_id, dia_venta,
+               func.sum(DetalleVenta.cantidad))
+        .join(Venta, DetalleVenta.venta_id == Venta.id)
+        .join(registro, registro.c.venta_id == Venta.id, isouter=desde is None)
+        .where(Venta.fecha >= como_fecha_hora(inicio))
+        .group_by(Venta.id, registro.c.fecha, DetalleVenta.producto_id, dia_venta)
+    )
+    return db.session.execute(consulta.execution_options(yield_per=_valor('REPOSICION_LOTE')))
+
+
+def actualizar(completo=False, hoy=None):
+    """Suma a la matriz de demanda las ventas registradas desde la última vez.
+
+    Con `completo=True` descarta el estado y vuelve a leer la ventana
+    entera. Devuelve la cantidad de filas (venta, producto, día) leídas.
+    """
+    import numpy as np
+
+    hoy = hoy or date.today()
+    estado = _estado_vacio(np, hoy) if completo else _cargar(np, hoy)
+    dias = estado['matriz'].shape[1]
+    estado['matriz'] = _desplazar(np, estado['matriz'], hoy.toordinal() - estado['hasta'])
+    estado['hasta'] = hoy.toordinal()
+    inicio = hoy - timedelta(days=dias - 1)
+
+    # Hora de la base antes de leer: lo que se registre durante la lectura
+    # queda después de la marca y entra en la próxima actualización
+    ahora = db.session.scalar(select(func.current_timestamp()))
+    solape = timedelta(seconds=_valor('REPOSICION_SOLAPE_SEGUNDOS'))
+    desde = estado['leido_hasta'] and estado['leido_hasta'] - solape
+    ya_sumadas = estado['recientes']
+    registradas = {}
+    posicion = {int(id_): i for i, id_ in enumerate(estado['ids'])}
+    nuevos = []
+    leidas = 0
+
+    for tanda in _ventas_nuevas(desde, inicio).partitions():
+        tanda = [fila for fila in tanda if fila[0] not in ya_sumadas]
+        filas = np.empty(len(tanda), dtype=np.int64)
+        columnas = np.empty(len(tanda), dtype=np.int64)
+        cantidades = np.empty(len(tanda))
+        for i, (venta_id, registrada, producto_id, dia_venta, cantidad) in enumerate(tanda):
+            if registrada is not None:
+                registradas[venta_id] = registrada
+            if producto_id not in posicion:
+                posicion[producto_id] = len(posicion)
+                nuevos.append(producto_id)
+            filas[i] = posicion[producto_id]
+            columnas[i] = date.fromisoformat(dia_venta).toordinal()
+            cantidades[i] = cantidad
+        if nuevos:
+            estado['ids'] = np.concatenate([estado['ids'], np.array(nuevos, dtype=np.int64)])
+            estado['matriz'] = np.vstack([estado['matriz'], np.zeros((len(nuevos), dias))])
+            nuevos = []
+        # Ventas con fecha futura (terminales con el reloj adelantado) cuentan como de hoy
+        columnas = np.minimum(columnas, estado['hasta']) - inicio.toordinal()
+        np.add.at(estado['matriz'], (filas, columnas), cantidades)
+        leidas += len(tanda)
+
+    # Las del margen de la próxima lectura ya están sumadas
+    corte = ahora - solape
+    estado['recientes'] = {
+        venta_id: registrada for venta_id, registrada in {**ya_sumadas, **registradas}.items()
+        if registrada >= corte
+    }
+    estado['leido_hasta'] = ahora
+    _guardar(np, estado)
+    return leidas
+
+
+def _precios_compra():
+    """Precio unitario de la última compra de cada producto."""
+    ultimas = (
+        db.session.query(func.max(Compra.id).label('id'))
+        .group_by(Compra.producto_id)
+        .subquery()
+    )
+    filas = db.session.query(Compra.producto_id, Compra.precio_unitario).join(
+        ultimas, Compra.id == ultimas.c.id
+    )
+    return {producto_id: precio for producto_id, precio in filas}
+
+
+def calcular(hoy=None):
+    """Pronóstico y reposición de todo el catálogo en una sola pasada.
+
+    Devuelve una Sugerencia por producto, ordenadas por días de cobertura
+    (los que se agotan antes primero).
+    """
+    import numpy as np
+
+    hoy = hoy or date.today()
+    estado = _cargar(np, hoy)
+    matriz = _desplazar(np, estado['matriz'], hoy.toordinal() - estado['hasta'])
+    productos = catalogo.productos()
+
+    # Filas de la matriz alineadas con el catálogo; sin ventas, todo en cero
+    posicion = {int(id_): i for i, id_ in enumerate(estado['ids'])}
+    demanda = np.zeros((len(productos), matriz.shape[1]))
+    en_matriz = [i for i, p in enumerate(productos) if p.id in posicion]
+    demanda[en_matriz] = matriz[[posicion[productos[i].id] for i in en_matriz]]
+
+    # El día de hoy todavía no terminó: solo se usan días completos
+    historia = demanda[:, :-1]
+    if _valor('REPOSICION_METODO') == 'media':
+        pronostico = historia[:, -_valor('REPOSICION_MEDIA_DIAS'):].mean(axis=1)
+    else:
+        alfa = _valor('REPOSICION_ALFA')
+        pesos = alfa * (1 - alfa) ** np.arange(historia.shape[1])[::-1]
+        pronostico = historia @ (pesos / pesos.sum())
+    desvio = historia.std(axis=1, ddof=1)
+
+    demora = _valor('REPOSICION_DEMORA_DIAS')
+    cobertura = _valor('REPOSICION_COBERTURA_DIAS')
+    stock = np.array([p.stock for p in productos], dtype=float)
+    minimo = np.array([p.stock_minimo for p in productos], dtype=float)
+
+    seguridad = _valor('REPOSICION_Z') * desvio * math.sqrt(demora)
+    # El mínimo cargado a mano sigue valiendo como piso
+    punto_reorden = np.maximum(pronostico * demora + seguridad, minimo)
+    objetivo = punto_reorden + pronostico * cobertura
+    sugerido = np.where(stock <= punto_reorden, np.ceil(np.maximum(objetivo - stock, 0)), 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dias_cobertura = np.where(pronostico > 0, stock / pronostico, np.inf)
+
+    precios = _precios_compra()
+    orden = np.lexsort((-sugerido, dias_cobertura))
+    return [
+        Sugerencia(
+            productos[i], round(float(pronostico[i]), 2), round(float(seguridad[i]), 1),
+            round(float(punto_reorden[i]), 1), int(sugerido[i]),
+            None if math.isinf(dias_cobertura[i]) else round(float(dias_cobertura[i]), 1),
+            precios.get(productos[i].id),
+        )
+        for i in orden
+    ]
+
+
+def sugerencias(hoy=None):
+    """Productos a comprar: actualiza la matriz y devuelve los que tienen cantidad sugerida."""
+    actualizar(hoy=hoy)
+    return [s for s in calcular(hoy) if s.sugerido > 0]
@@ -0,0 +1,158 @@
+from sqlalchemy import delete, func, insert, select, true, update
+from sqlalchemy.dialects import mysql, sqlite
+
+from app import archivo_ventas, db
+from app.models import (
+    DetalleVenta, Producto, ResumenVentaCategoria, ResumenVentaProducto,
+    ResumenVentaUsuario, Venta
+)
+
+TABLAS_RESUMEN = (ResumenVentaUsuario, ResumenVentaProducto, ResumenVentaCategoria)
+
+
+def _incrementar(modelo, claves, incrementos):
+    """Suma `incrementos` a la fila de `modelo` identificada por `claves`.
+
+    Usa el upsert nativo del dialecto; en otros motores intenta primero el
+    UPDATE y crea la fila si todavía no existe.
+    """
+    valores = {**claves, **incrementos}
+    tabla = modelo.__table__
+    dialecto = db.session.get_bind().dialect.name
+
+    if dialecto == 'sqlite':
+        stmt = sqlite.insert(tabla).values(valores)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(claves),
+            set_={c: tabla.c[c] + stmt.excluded[c] for c in incrementos}
+        )
+    elif dialecto == 'mysql':
+        stmt = mysql.insert(tabla).values(valores)
+        stmt = stmt.on_duplicate_key_update(
+            {c: tabla.c[c] + stmt.inserted[c] for c in incrementos}
+        )
+    else:
+        resultado = db.session.execute(
+            update(tabla)
+            .where(*(tabla.c[c] == v for c, v in claves.items()))
+            .values({c: tabla.c[c] + v for c, v in incrementos.items()})
+        )
+        if resultado.rowcount:
+            return
+        stmt = insert(tabla).values(valores)
+
+    db.session.execute(stmt)
+
+
+def acumular_venta(venta, detalles, productos):
+    """Suma una venta recién registrada a los resúmenes diarios.
+
+    `detalles` son los dicts insertados en detalle_venta y `productos` el
+    mapa {id: Producto} ya cargado por el servicio de ventas. Se ejecuta en
+    la misma transacción que la venta.
+    """
+    dia = venta.fecha.date()
+
+    _incrementar(
+        ResumenVentaUsuario,
+        {'fecha': dia, 'usuario_id': venta.usuario_id},
+        {'cantidad_ventas': 1, 'total': venta.total}
+    )
+
+    por_categoria = {}
+    for d in detalles:
+        _incrementar(
+            ResumenVentaProducto,
+            {'fecha': dia, 'producto_id': d['producto_id']},
+            {'cantidad': d['cantidad'], 'total': d['subtotal']}
+        )
+        categoria_id = productos[d['producto_id']].categoria_id
+        por_categoria[categoria_id] = por_categoria.get(categoria_id, 0) + d['subtotal']
+
+    for categoria_id, total in por_categoria.items():
+        _incrementar(
+            ResumenVentaCategoria,
+            {'fecha': dia, 'categoria_id': categoria_id},
+            {'total': total}
+        )
+
+
+def quitar_producto(producto_id, categoria_id):
+    """Descuenta de los resúmenes lo vendido de un producto que se va a eliminar.
+
+    Sus líneas quedan en detalle_venta, pero los reportes calculados desde
+    las tablas base ya no las cuentan porque se unen con productos. Los
+    totales por vendedor no cambian: la venta sigue existiendo. No hace commit.
+    """
+    del_producto = (
+        select(ResumenVentaProducto.total)
+        .where(ResumenVentaProducto.producto_id == producto_id,
+               ResumenVentaProducto.fecha == ResumenVentaCategoria.fecha)
+        .scalar_subquery()
+    )
+    dias = select(ResumenVentaProducto.fecha).where(ResumenVentaProducto.producto_id == producto_id)
+    de_la_categoria = (ResumenVentaCategoria.categoria_id == categoria_id,
+                       ResumenVentaCategoria.fecha.in_(dias))
+    sin_sincronizar = {'synchronize_session': False}
+
+    # Días en que solo se vendió este producto de la categoría: la fila sobra
+    db.session.execute(
+        delete(ResumenVentaCategoria).where(*de_la_categoria, ResumenVentaCategoria.total == del_producto),
+        execution_options=sin_sincronizar,
+    )
+    db.session.execute(
+        update(ResumenVentaCategoria).where(*de_la_categoria)
+        .values(total=ResumenVentaCategoria.total - del_producto),
+        execution_options=sin_sincronizar,
+    )
+    db.session.execute(
+        delete(ResumenVentaProducto).where(ResumenVentaProducto.producto_id == producto_id),
+        execution_options=sin_sincronizar,
+    )
+
+
+def reconstruir():
+    """Vacía y recalcula los resúmenes a partir de ventas y detalles.
+
+    Los días de meses archivados no se tocan: sus ventas ya no están en
+    las tablas y los resúmenes son lo único que queda de ellas.
+    """
+    db.metadata.create_all(
+        bind=db.engine, tables=[m.__table__ for m in TABLAS_RESUMEN]
+    )
+    desde = archivo_ventas.hasta()
+    for modelo in TABLAS_RESUMEN:
+        db.session.execute(delete(modelo).where(modelo.fecha >= desde.date() if desde else true()))
+
+    dia = func.date(Venta.fecha)
+    vigentes = Venta.fecha >= desde if desde else true()
+
+    db.session.execute(
+        insert(ResumenVentaUsuario).from_select(
+            ['fecha', 'usuario_id', 'cantidad_ventas', 'total'],
+            select(dia, Venta.usuario_id, func.count(Venta.id), func.sum(Venta.total))
+            .where(vigentes)
+            .group_by(dia, Venta.usuario_id)
+        )
+    )
+    db.session.execute(
+        insert(ResumenVentaProducto).from_select(
+            ['fecha', 'producto_id', 'cantidad', 'total'],
+            select(dia, DetalleVenta.producto_id,
+                   func.sum(DetalleVenta.cantidad), func.sum(DetalleVenta.subtotal))
+            .join(Venta, DetalleVenta.venta_id == Venta.id)
+            .where(vigentes)
+            .group_by(dia, DetalleVenta.producto_id)
+        )
+    )
+    db.session.execute(
+        insert(ResumenVentaCategoria).from_select(
+            ['fecha', 'categoria_id', 'total'],
+            select(dia, Producto.categoria_id, func.sum(DetalleVenta.subtotal))
+            .join(Venta, DetalleVenta.venta_id == Venta.id)
+            .join(Producto, DetalleVenta.producto_id == Producto.id)
+            .where(vigentes)
+            .group_by(dia, Producto.categoria_id)
+        )
+    )
+    db.session.commit()
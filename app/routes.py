@@ -1,26 +1,37 @@
-from datetime import datetime, timedelta
-from io import BytesIO
+import hmac
+import json
+import time
+from datetime import date, datetime
 
 from flask import (
-    Blueprint, flash, make_response, redirect, render_template,
-    request, url_for, current_app
+    Blueprint, Response, abort, flash, jsonify, redirect, render_template,
+    request, stream_with_context, url_for, current_app
 )
 from flask_login import (
     current_user, login_required, login_user, logout_user
 )
-from sqlalchemy import extract, func
+from markupsafe import Markup
+from sqlalchemy import func
 from werkzeug.security import check_password_hash, generate_password_hash
-from xhtml2pdf import pisa
 
-from app import db
+from app import (
+    db, alertas, archivo_ventas, busqueda, cache_reportes, cache_usuarios, catalogo, exportacion, metricas,
+    movimientos, pdf, reportes, reposicion, resumenes, servicio_compras, servicio_ventas
+)
+from app.consultas import en_rango, inicio_de_mes, rango_dias, venta_completa
 from app.models import (
-    Categoria, Compra, DetalleVenta, Producto, Usuario, Venta
+    Producto, ResumenVentaUsuario, Usuario, Venta
 )
+from app.paginacion import paginar_ventas
+from app.replica import usar_replica
 
 from functools import wraps
 
 main = Blueprint('main', __name__)
 
+# Columnas de /productos/datos, en el orden de cada fila
+CAMPOS_PRODUCTOS = ['id', 'nombre', 'categoria', 'precio', 'stock', 'stock_minimo']
+
 # --- Decorador para roles ---
 def rol_requerido(*roles):
     def decorator(f):
@@ -112,20 +123,75 @@ def registrar_usuario():
 
     return render_template('registrar_usuario.html')
 
+@main.route('/admin/catalogo')
+@login_required
+@rol_requerido('admin')
+def estadisticas_catalogo():
+    """Aciertos y fallos de la caché del catálogo (solo admin)."""
+    return jsonify(catalogo.estadisticas())
+
+@main.route('/admin/reportes/cache')
+@login_required
+@rol_requerido('admin')
+def estadisticas_cache_reportes():
+    """Sello de datos y aciertos de la caché de reportes (solo admin)."""
+    return jsonify(cache_reportes.estadisticas())
+
+@main.route('/admin/metricas')
+@login_required
+@rol_requerido('admin')
+def metricas_peticiones():
+    """Consultas SQL y tiempos por endpoint desde que arrancó el proceso (solo admin)."""
+    return jsonify(metricas.resumen())
+
+@main.route('/admin/metricas/prometheus')
+def metricas_prometheus():
+    """Las mismas métricas en formato Prometheus.
+
+    Acepta la sesión de un admin o, para el scraper, el encabezado
+    `Authorization: Bearer <METRICAS_TOKEN>`.
+    """
+    token = current_app.config.get('METRICAS_TOKEN')
+    autorizado = token and hmac.compare_digest(
+        request.headers.get('Authorization', ''), f'Bearer {token}'
+    )
+    if not autorizado and not (current_user.is_authenticated and current_user.rol == 'admin'):
+        abort(403)
+    return Response(metricas.prometheus(), mimetype='text/plain; version=0.0.4')
+
 @main.route('/productos')
 @login_required
 @rol_requerido('admin')
 def productos():
-    """Lista todos los productos (solo admin)."""
-    lista = Producto.query.all()
-    return render_template('productos.html', productos=lista)
+    """Lista todos los productos (solo admin).
+
+    La página no trae las filas: la tabla las pide a `productos_datos` y
+    solo dibuja las que están a la vista.
+    """
+    return render_template('productos.html')
+
+@main.route('/productos/datos')
+@login_required
+@rol_requerido('admin')
+@usar_replica
+def productos_datos():
+    """Filas compactas del listado de productos, con ETag."""
+    respuesta = jsonify(
+        campos=CAMPOS_PRODUCTOS,
+        filas=[
+            [p.id, p.nombre, p.categoria.nombre, f'{p.precio:.2f}', p.stock, p.stock_minimo]
+            for p in catalogo.productos()
+        ],
+    )
+    respuesta.add_etag()
+    return respuesta.make_conditional(request)
 
 @main.route('/productos/agregar', methods=['GET', 'POST'])
 @login_required
 @rol_requerido('admin')
 def agregar_producto():
     """Permite al admin agregar un producto."""
-    categorias = Categoria.query.all()
+    categorias = catalogo.categorias()
 
     if request.method == 'POST':
         nombre = request.form['nombre']
@@ -146,6 +212,12 @@ def agregar_producto():
             stock_minimo=stock_minimo
         )
         db.session.add(nuevo)
+        db.session.flush()
+        busqueda.indexar(nuevo)
+        movimientos.registrar([{
+            'producto_id': nuevo.id, 'tipo': 'inicial',
+            'cantidad': nuevo.stock, 'usuario_id': current_user.id
+        }])
         db.session.commit()
         flash('Producto agregado correctamente')
         return redirect(url_for('main.productos'))
@@ -158,9 +230,14 @@ def agregar_producto():
 def editar_producto(id):
     """Permite al admin editar un producto existente."""
     producto = Producto.query.get_or_404(id)
-    categorias = Categoria.query.all()
+    categorias = catalogo.categorias()
 
     if request.method == 'POST':
+        # Relee la fila bloqueada para que el ajuste parta del stock vigente
+        # (en SQLite FOR UPDATE no bloquea: se toma el bloqueo de escritura)
+        servicio_ventas.iniciar_escritura()
+        db.session.refresh(producto, with_for_update=True)
+        stock_antes, minimo_antes = producto.stock, producto.stock_minimo
         producto.nombre = request.form['nombre']
         producto.categoria_id = request.form['categoria_id']
         try:
@@ -171,6 +248,15 @@ def editar_producto(id):
             flash('Datos inválidos.')
             return redirect(url_for('main.editar_producto', id=id))
 
+        busqueda.indexar(producto)
+        movimientos.registrar([{
+            'producto_id': producto.id, 'tipo': 'ajuste',
+            'cantidad': producto.stock - stock_antes, 'usuario_id': current_user.id
+        }])
+        alertas.detectar(db.session, [(
+            producto.id, producto.nombre, stock_antes, minimo_antes,
+            producto.stock, producto.stock_minimo
+        )])
         db.session.commit()
         flash('Producto actualizado')
         return redirect(url_for('main.productos'))
@@ -183,7 +269,18 @@ def editar_producto(id):
 def eliminar_producto(id):
     """Permite al admin eliminar un producto."""
     producto = Producto.query.get_or_404(id)
+    servicio_ventas.iniciar_escritura()
+    db.session.refresh(producto, with_for_update=True)
+    # El libro conserva la historia del producto y cierra con saldo cero;
+    # los resúmenes y los avisos se derivan de él y se borran
+    movimientos.registrar([{
+        'producto_id': id, 'tipo': 'ajuste', 'cantidad': -producto.stock,
+        'usuario_id': current_user.id,
+    }])
+    resumenes.quitar_producto(id, producto.categoria_id)
+    alertas.olvidar(id)
     db.session.delete(producto)
+    busqueda.eliminar(id)
     db.session.commit()
     flash('Producto eliminado')
     return redirect(url_for('main.productos'))
@@ -193,13 +290,10 @@ def eliminar_producto(id):
 @rol_requerido('admin', 'vendedor')
 def registrar_venta():
     """Permite registrar una venta (admin o vendedor)."""
-    productos = Producto.query.all()
-
     if request.method == 'POST':
         try:
             seleccionados = request.form.getlist('productos')
-            detalles = []
-            total = 0
+            cantidades = {}
 
             if not seleccionados:
                 flash("Debes seleccionar al menos un producto.")
@@ -218,88 +312,76 @@ def registrar_venta():
                     flash("Cantidad debe ser mayor a cero.")
                     return redirect(url_for('main.registrar_venta'))
 
-                producto = Producto.query.get(id_producto)
-                if not producto:
-                    flash("Producto no encontrado.")
-                    return redirect(url_for('main.registrar_venta'))
-
-                if producto.stock < cantidad:
-                    flash(f"No hay suficiente stock para {producto.nombre}")
-                    return redirect(url_for('main.registrar_venta'))
-
-                subtotal = float(producto.precio) * cantidad
-                total += subtotal
-                producto.stock -= cantidad
-
-                detalle = DetalleVenta(
-                    producto_id=id_producto,
-                    cantidad=cantidad,
-                    subtotal=subtotal
-                )
-                detalles.append(detalle)
-
-            venta = Venta(usuario_id=current_user.id, total=total)
-            db.session.add(venta)
-            db.session.flush()
-
-            for d in detalles:
-                d.venta_id = venta.id
-                db.session.add(d)
+                cantidades[id_producto] = cantidad
 
+            servicio_ventas.registrar_venta(current_user.id, cantidades)
             db.session.commit()
             flash("✅ Venta registrada correctamente.")
             return redirect(url_for('main.dashboard'))
 
+        except servicio_ventas.VentaError as e:
+            db.session.rollback()
+            flash(str(e))
+            return redirect(url_for('main.registrar_venta'))
         except Exception as e:
             db.session.rollback()
             current_app.logger.error(f"Error al registrar venta: {e}")
             flash("❌ Error interno al procesar la venta.")
             return redirect(url_for('main.registrar_venta'))
 
+    productos = catalogo.productos()
     return render_template('registrar_venta.html', productos=productos)
 
 @main.route('/ventas')
 @login_required
 @rol_requerido('admin')
+@usar_replica
 def ventas():
-    """Lista todas las ventas (solo admin)."""
-    ventas = Venta.query.order_by(Venta.fecha.desc()).all()
-    return render_template('ventas.html', ventas=ventas)
+    """Lista todas las ventas paginadas por cursor (solo admin)."""
+    pagina = paginar_ventas(
+        Venta.query,
+        despues=request.args.get('despues'),
+        antes=request.args.get('antes')
+    )
+    # Desde los resúmenes diarios: incluye los meses archivados
+    total_general = db.session.query(func.coalesce(func.sum(ResumenVentaUsuario.total), 0)).scalar()
+    return render_template('ventas.html', ventas=pagina.items, pagina=pagina,
+                           total_general=total_general)
 
 @main.route('/ventas/<int:id>')
 @login_required
 def detalle_venta(id):
     """Muestra el detalle de una venta específica."""
-    venta = Venta.query.get_or_404(id)
+    venta = venta_completa(id).first_or_404()
 
     # Si el usuario es vendedor y no es el dueño de la venta, se bloquea el acceso
     if current_user.rol == 'vendedor' and venta.usuario_id != current_user.id:
         flash("No tienes permiso para ver esta venta.")
         return redirect(url_for('main.dashboard'))
 
-    detalles = DetalleVenta.query.filter_by(venta_id=id).all()
-    vendedor = Usuario.query.get(venta.usuario_id)
-
-    return render_template('detalle_venta.html', venta=venta, detalles=detalles, vendedor=vendedor)
+    return render_template('detalle_venta.html', venta=venta, detalles=venta.detalles,
+                           vendedor=venta.vendedor)
 
 @main.route('/reportes/ventas')
 @login_required
 @rol_requerido('admin')
+@usar_replica
+@cache_reportes.condicional
 def reporte_ventas():
     """Reporte de ventas por mes (solo admin)."""
-    ventas_por_mes = db.session.query(
-        extract('month', Venta.fecha).label('mes'),
-        func.sum(Venta.total).label('total')
-    ).group_by('mes').order_by('mes').all()
+    def cargar():
+        ventas_por_mes = reportes.ventas_por_mes()
+        return {
+            'meses': [v[0] for v in ventas_por_mes],
+            'totales': [v[1] for v in ventas_por_mes],
+        }
 
-    meses = [f"Mes {int(v[0])}" for v in ventas_por_mes]
-    totales = [float(v[1]) for v in ventas_por_mes]
-
-    return render_template('reporte_ventas.html', meses=meses, totales=totales)
+    return render_template('reporte_ventas.html', **cache_reportes.datos('reporte_ventas', (), cargar))
 
 @main.route('/reportes/ventas_fecha', methods=['GET', 'POST'])
 @login_required
 @rol_requerido('admin')
+@usar_replica
 def ventas_por_fecha():
     """Reporte de ventas por rango de fechas (solo admin)."""
     ventas = []
@@ -311,10 +393,10 @@ def ventas_por_fecha():
         fecha_inicio = request.form['inicio']
         fecha_fin = request.form['fin']
 
-        inicio_dt = datetime.strptime(fecha_inicio, '%Y-%m-%d')
-        fin_dt = datetime.strptime(fecha_fin, '%Y-%m-%d')
+        inicio_dt, fin_dt = rango_dias(fecha_inicio, fecha_fin)
 
-        ventas = Venta.query.filter(Venta.fecha.between(inicio_dt, fin_dt)).order_by(Venta.fecha).all()
+        # Incluye las ventas de meses archivados que toque el rango
+        ventas = archivo_ventas.ventas_en_rango(inicio_dt, fin_dt)
         total = sum(float(v.total) for v in ventas)
 
     return render_template('ventas_fecha.html', ventas=ventas, total=total,
@@ -323,55 +405,84 @@ def ventas_por_fecha():
 @main.route('/reportes/ventas_fecha/pdf', methods=['POST'])
 @login_required
 @rol_requerido('admin')
+@usar_replica
 def exportar_ventas_pdf():
     """Exporta a PDF el reporte de ventas por fecha (solo admin)."""
     fecha_inicio = request.form['inicio']
     fecha_fin = request.form['fin']
 
-    inicio_dt = datetime.strptime(fecha_inicio, '%Y-%m-%d')
-    fin_dt = datetime.strptime(fecha_fin, '%Y-%m-%d')
-
-    ventas = Venta.query.filter(Venta.fecha.between(inicio_dt, fin_dt)).order_by(Venta.fecha).all()
-    total = sum(float(v.total) for v in ventas)
+    inicio_dt, fin_dt = rango_dias(fecha_inicio, fecha_fin)
+    en_fechas = en_rango(Venta.fecha, inicio_dt, fin_dt)
+    cantidad, ultima = db.session.query(func.count(Venta.id), func.max(Venta.id)) \
+        .filter(en_fechas).one()
 
-    html = render_template('ventas_pdf.html', ventas=ventas, total=total, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin)
-    result = BytesIO()
-    pisa_status = pisa.CreatePDF(html, dest=result)
+    def renderizar():
+        ventas = archivo_ventas.ventas_en_rango(inicio_dt, fin_dt)
+        total = sum(float(v.total) for v in ventas)
+        return render_template('ventas_pdf.html', ventas=ventas, total=total,
+                               fecha_inicio=fecha_inicio, fecha_fin=fecha_fin)
+
+    return pdf.servir(
+        'ventas_fecha',
+        {'inicio': fecha_inicio, 'fin': fecha_fin, 'ventas': cantidad, 'ultima': ultima,
+         'archivo': archivo_ventas.firma(inicio_dt, fin_dt)},
+        'reporte_ventas.pdf',
+        renderizar
+    )
 
-    if pisa_status.err:
-        return "Error al generar el PDF", 500
+@main.route('/reportes/ventas_fecha/exportar')
+@login_required
+@rol_requerido('admin')
+@usar_replica
+def exportar_ventas():
+    """Exporta en CSV o XLSX las líneas de venta de un rango de fechas (solo admin)."""
+    fecha_inicio = request.args.get('inicio', '')
+    fecha_fin = request.args.get('fin', '')
+    formato = request.args.get('formato', 'csv')
+
+    try:
+        inicio_dt, fin_dt = rango_dias(fecha_inicio, fecha_fin)
+    except ValueError:
+        flash('Fechas inválidas.')
+        return redirect(url_for('main.ventas_por_fecha'))
+
+    filas = exportacion.filas_ventas(inicio_dt, fin_dt)
+    nombre = f'ventas_{fecha_inicio}_{fecha_fin}'
+
+    if formato == 'xlsx':
+        try:
+            archivo = exportacion.xlsx_en_archivo(filas)
+        except ImportError:
+            flash('La exportación a Excel requiere instalar openpyxl.')
+            return redirect(url_for('main.ventas_por_fecha'))
+        return Response(
+            exportacion.trozos_de_archivo(archivo),
+            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            headers={'Content-Disposition': f'attachment; filename={nombre}.xlsx'}
+        )
 
-    response = make_response(result.getvalue())
-    response.headers['Content-Type'] = 'application/pdf'
-    response.headers['Content-Disposition'] = 'attachment; filename=reporte_ventas.pdf'
-    return response
+    return Response(
+        stream_with_context(exportacion.csv_en_trozos(filas)),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename={nombre}.csv'}
+    )
 
 @main.route('/compras/registrar', methods=['GET', 'POST'])
 @login_required
 @rol_requerido('admin')
 def registrar_compra():
     """Permite registrar una compra y actualizar el stock (solo admin)."""
-    productos = Producto.query.all()
+    productos = catalogo.productos()
 
     if request.method == 'POST':
         try:
-            producto_id = int(request.form['producto_id'])
-            cantidad = int(request.form['cantidad'])
-            precio_unitario = float(request.form['precio_unitario'])
-            total = cantidad * precio_unitario
-
-            compra = Compra(
-                producto_id=producto_id,
-                cantidad=cantidad,
-                precio_unitario=precio_unitario,
-                total=total,
-                usuario_id=current_user.id
-            )
-            db.session.add(compra)
-
-            # Actualizar stock del producto comprado
-            producto = Producto.query.get(producto_id)
-            producto.stock += cantidad
+            resultado = servicio_compras.registrar_compras(
+                current_user.id, [request.form.to_dict()]
+            )[0]
+            if not resultado['ok']:
+                db.session.rollback()
+                flash(resultado['error'])
+                return redirect(url_for('main.registrar_compra'))
 
             db.session.commit()
             flash('Compra registrada y stock actualizado')
@@ -384,6 +495,71 @@ def registrar_compra():
 
     return render_template('registrar_compra.html', productos=productos)
 
+@main.route('/compras/registrar_lote', methods=['GET', 'POST'])
+@login_required
+@rol_requerido('admin')
+def registrar_compra_lote():
+    """Registra una compra de varias líneas desde formulario, CSV o JSON (solo admin)."""
+    resultados = None
+
+    if request.method == 'POST':
+        archivo = request.files.get('archivo')
+        try:
+            if request.is_json:
+                lineas = servicio_compras.lineas_desde_json(request.get_json(silent=True))
+            elif archivo and archivo.filename:
+                contenido = archivo.read()
+                if archivo.filename.lower().endswith('.json'):
+                    lineas = servicio_compras.lineas_desde_json(contenido)
+                else:
+                    lineas = servicio_compras.lineas_desde_csv(contenido)
+            else:
+                lineas = servicio_compras.lineas_desde_formulario(request.form)
+            if not lineas:
+                raise servicio_compras.CompraError('No hay líneas de compra.')
+        except (servicio_compras.CompraError, UnicodeDecodeError) as e:
+            mensaje = str(e) if isinstance(e, servicio_compras.CompraError) else 'El archivo debe estar en UTF-8.'
+            if request.is_json:
+                return jsonify(error=mensaje), 400
+            flash(mensaje)
+            return redirect(url_for('main.registrar_compra_lote'))
+
+        try:
+            resultados = servicio_compras.registrar_compras(current_user.id, lineas)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Error al registrar compra en lote: {e}")
+            if request.is_json:
+                return jsonify(error='Error al registrar la compra.'), 500
+            flash('Error al registrar la compra.')
+            return redirect(url_for('main.registrar_compra_lote'))
+
+        registradas = sum(1 for r in resultados if r['ok'])
+        if request.is_json:
+            return jsonify(registradas=registradas, fallidas=len(resultados) - registradas,
+                           resultados=resultados)
+        flash(f'{registradas} líneas registradas, {len(resultados) - registradas} con errores.')
+
+    # Un GET con listas producto_id/cantidad/precio_unitario precarga las líneas
+    lineas = servicio_compras.lineas_desde_formulario(request.args) if request.method == 'GET' else None
+    return render_template('registrar_compra_lote.html', productos=catalogo.productos(),
+                           resultados=resultados, lineas=lineas)
+
+@main.route('/compras/sugeridas')
+@login_required
+@rol_requerido('admin')
+@usar_replica
+def compras_sugeridas():
+    """Compras sugeridas según el pronóstico de demanda de cada producto (solo admin)."""
+    try:
+        sugerencias = reposicion.sugerencias()
+    except ImportError:
+        flash('Las compras sugeridas requieren instalar numpy.')
+        return redirect(url_for('main.dashboard'))
+    return render_template('compras_sugeridas.html', sugerencias=sugerencias,
+                           **reposicion.parametros())
+
 @main.route('/usuarios')
 @login_required
 @rol_requerido('admin')
@@ -405,135 +581,231 @@ def cambiar_estado_usuario(id):
 
     usuario.estado = 'inactivo' if usuario.estado == 'activo' else 'activo'
     db.session.commit()
+    cache_usuarios.invalidar(usuario.id)
     flash(f"Usuario {'desactivado' if usuario.estado == 'inactivo' else 'activado'} correctamente.")
     return redirect(url_for('main.listar_usuarios'))
 
 @main.route('/reportes/ventas_por_usuario')
 @login_required
 @rol_requerido('admin')
+@usar_replica
+@cache_reportes.condicional
 def ventas_por_usuario():
     """Reporte de ventas agrupadas por usuario (solo admin)."""
-    resultados = db.session.query(
-        Usuario.nombre,
-        db.func.count(Venta.id).label('cantidad_ventas'),
-        db.func.sum(Venta.total).label('total_ventas')
-    ).join(Venta, Venta.usuario_id == Usuario.id) \
-     .group_by(Usuario.id) \
-     .all()
-
-    # Calcular totales generales en Python
-    total_ventas = sum(r.cantidad_ventas or 0 for r in resultados)
-    total_monto = sum(r.total_ventas or 0 for r in resultados)
-
-    return render_template(
-        'ventas_por_usuario.html',
-        resultados=resultados,
-        total_ventas=total_ventas,
-        total_monto=total_monto
-    )
+    def renderizar_tabla():
+        resultados = reportes.ventas_por_usuario()
+
+        # Calcular totales generales en Python
+        total_ventas = sum(r.cantidad_ventas or 0 for r in resultados)
+        total_monto = sum(r.total_ventas or 0 for r in resultados)
+
+        return Markup(render_template(
+            'ventas_por_usuario_tabla.html',
+            resultados=resultados,
+            total_ventas=total_ventas,
+            total_monto=total_monto
+        ))
+
+    tabla = cache_reportes.datos('ventas_por_usuario', (), renderizar_tabla)
+    return render_template('ventas_por_usuario.html', tabla=tabla)
 
 @main.route('/reportes/ventas_por_usuario/pdf')
 @login_required
 @rol_requerido('admin')
+@usar_replica
 def ventas_por_usuario_pdf():
     """Exporta a PDF el reporte de ventas por usuario (solo admin)."""
-    resultados = db.session.query(
-        Usuario.nombre,
-        db.func.count(Venta.id).label('cantidad_ventas'),
-        db.func.sum(Venta.total).label('total_ventas')
-    ).join(Venta, Venta.usuario_id == Usuario.id) \
-     .group_by(Usuario.id) \
-     .all()
-
+    cantidad, ultima = db.session.query(func.count(Venta.id), func.max(Venta.id)).one()
     fecha_actual = datetime.now()
 
-    html = render_template('ventas_por_usuario_pdf.html', resultados=resultados, fecha_actual=fecha_actual)
-    pdf = BytesIO()
-    pisa.CreatePDF(html, dest=pdf)
-    pdf.seek(0)
+    def renderizar():
+        resultados = reportes.ventas_por_usuario()
+        return render_template('ventas_por_usuario_pdf.html', resultados=resultados,
+                               fecha_actual=fecha_actual)
 
-    response = make_response(pdf.read())
-    response.headers['Content-Type'] = 'application/pdf'
-    response.headers['Content-Disposition'] = 'attachment; filename="ventas_por_usuario.pdf"'
-    return response
+    return pdf.servir(
+        'ventas_por_usuario',
+        {'ventas': cantidad, 'ultima': ultima, 'dia': fecha_actual.date()},
+        'ventas_por_usuario.pdf',
+        renderizar
+    )
 
 @main.route('/ventas/<int:id>/pdf')
 @login_required
 def factura_pdf(id):
-    """Genera la factura en PDF de una venta."""
-    venta = Venta.query.get_or_404(id)
-    detalles = DetalleVenta.query.filter_by(venta_id=id).all()
-    vendedor = Usuario.query.get(venta.usuario_id)
-    html = render_template('factura_pdf.html', venta=venta, detalles=detalles, vendedor=vendedor)
+    """Genera la factura en PDF de una venta (se genera una vez y se sirve desde caché)."""
+    if db.session.query(Venta.id).filter_by(id=id).first() is None:
+        abort(404)
 
-    pdf = BytesIO()
-    pisa.CreatePDF(html, dest=pdf)
-    pdf.seek(0)
+    def renderizar():
+        venta = venta_completa(id).one()
+        return render_template('factura_pdf.html', venta=venta, detalles=venta.detalles,
+                               vendedor=venta.vendedor)
 
-    return make_response(pdf.read(), {
-        'Content-Type': 'application/pdf',
-        'Content-Disposition': f'attachment; filename=factura_venta_{venta.id}.pdf'
-    })
+    return pdf.servir('factura', {'venta': id}, f'factura_venta_{id}.pdf', renderizar)
+
+@main.route('/pdf/<clave_pdf>')
+@login_required
+def estado_pdf(clave_pdf):
+    """Consulta el estado de un PDF en generación y lo descarga cuando está listo."""
+    estado = pdf.estado(clave_pdf)
+    if estado is None:
+        abort(404)
+
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify(trabajo=clave_pdf, estado=estado,
+                       descarga=url_for('main.estado_pdf', clave_pdf=clave_pdf) if estado == 'listo' else None)
+
+    if estado == 'listo':
+        return pdf.enviar(clave_pdf)
+    return render_template('pdf_estado.html', estado=estado), 202 if estado == 'pendiente' else 500
 
 @main.route('/productos/buscar', methods=['GET'])
 @login_required
 @rol_requerido('admin', 'vendedor')
+@usar_replica
 def buscar_productos():
     """Permite buscar productos por nombre y categoría (admin y vendedor)."""
     nombre = request.args.get('nombre', '').strip()
     categoria_id = request.args.get('categoria', '')
-
-    query = Producto.query
+    filtro_categoria = int(categoria_id) if categoria_id.isdigit() else None
 
     if nombre:
-        query = query.filter(Producto.nombre.ilike(f'%{nombre}%'))
+        productos = busqueda.buscar(nombre, filtro_categoria,
+                                    limite=current_app.config.get('BUSQUEDA_LIMITE', 100))
+    else:
+        query = Producto.query
+        if filtro_categoria:
+            query = query.filter_by(categoria_id=filtro_categoria)
+        productos = query.all()
 
-    if categoria_id and categoria_id.isdigit():
-        query = query.filter_by(categoria_id=int(categoria_id))
-
-    productos = query.all()
-    categorias = Categoria.query.all()
+    categorias = catalogo.categorias()
 
     return render_template('buscar_productos.html', productos=productos, categorias=categorias, nombre=nombre, categoria_id=categoria_id)
 
+@main.route('/productos/autocompletar')
+@login_required
+@rol_requerido('admin', 'vendedor')
+@usar_replica
+def autocompletar_productos():
+    """Sugerencias de productos en JSON para el buscador (admin y vendedor)."""
+    texto = request.args.get('q', '').strip()
+    limite = min(request.args.get('limite', 10, type=int) or 10, 50)
+    productos = busqueda.buscar(texto, limite=limite) if len(texto) >= 2 else []
+    return jsonify([
+        {'id': p.id, 'nombre': p.nombre, 'precio': float(p.precio), 'stock': p.stock}
+        for p in productos
+    ])
+
 @main.route('/mis_ventas')
 @login_required
 @rol_requerido('vendedor')
+@usar_replica
 def mis_ventas():
-    """Muestra las ventas realizadas por el usuario vendedor."""
-    ventas = Venta.query.filter_by(usuario_id=current_user.id).order_by(Venta.fecha.desc()).all()
-    return render_template('mis_ventas.html', ventas=ventas)
+    """Muestra las ventas realizadas por el usuario vendedor, paginadas por cursor."""
+    pagina = paginar_ventas(
+        Venta.query.filter_by(usuario_id=current_user.id),
+        despues=request.args.get('despues'),
+        antes=request.args.get('antes')
+    )
+    total_general = db.session.query(func.coalesce(func.sum(ResumenVentaUsuario.total), 0)) \
+        .filter(ResumenVentaUsuario.usuario_id == current_user.id).scalar()
+    return render_template('mis_ventas.html', ventas=pagina.items, pagina=pagina,
+                           total_general=total_general)
 
 @main.route('/stock/alertas')
 @login_required
 @rol_requerido('admin', 'vendedor')
 def alertas_stock():
     """Muestra productos con stock bajo (admin y vendedor)."""
-    margen = current_app.config.get('MARGEN_STOCK', 2)
-    productos = Producto.query.filter(
-        (Producto.stock <= (Producto.stock_minimo + margen))
-    ).all()
-    return render_template('alertas_stock.html', productos=productos)
+    productos = alertas.productos_bajos()
+    return render_template('alertas_stock.html', productos=productos,
+                           ultimo_evento=alertas.ultimo_id(),
+                           intervalo=current_app.config.get('ALERTAS_INTERVALO_SEGUNDOS', 10))
+
+@main.route('/stock/alertas/feed')
+@login_required
+@rol_requerido('admin', 'vendedor')
+def alertas_feed():
+    """Eventos de cruce de umbral posteriores a `desde`, en JSON (admin y vendedor)."""
+    desde = request.args.get('desde', 0, type=int)
+    eventos = alertas.eventos_desde(desde)
+    return jsonify(eventos=eventos, ultimo=eventos[-1]['id'] if eventos else desde)
+
+@main.route('/stock/alertas/stream')
+@login_required
+@rol_requerido('admin', 'vendedor')
+def alertas_stream():
+    """Envía los eventos de stock a medida que ocurren (Server-Sent Events).
+
+    Cada conexión ocupa un worker, así que se cierra a los
+    ALERTAS_STREAM_SEGUNDOS; EventSource reconecta solo y sigue desde el
+    último id recibido (cabecera Last-Event-ID). La página de alertas usa
+    /stock/alertas/feed en su lugar.
+    """
+    desde = request.headers.get('Last-Event-ID', type=int) or request.args.get('desde', 0, type=int)
+    limite = time.monotonic() + current_app.config.get('ALERTAS_STREAM_SEGUNDOS', 60)
+
+    def eventos():
+        ultimo = desde
+        silencio = time.monotonic()
+        while True:
+            for evento in alertas.eventos_desde(ultimo):
+                ultimo = evento['id']
+                silencio = time.monotonic()
+                yield f"id: {evento['id']}\ndata: {json.dumps(evento)}\n\n"
+            # No retener una conexión de la base mientras se espera
+            db.session.close()
+            if time.monotonic() >= limite:
+                return
+            if time.monotonic() - silencio >= 15:
+                silencio = time.monotonic()
+                yield ": ping\n\n"
+            time.sleep(min(2, max(0, limite - time.monotonic())))
+
+    return Response(stream_with_context(eventos()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@main.route('/stock/historico')
+@login_required
+@rol_requerido('admin')
+@usar_replica
+def stock_historico():
+    """Stock de cada producto al cierre de una fecha, según el libro de movimientos (solo admin)."""
+    fecha = request.args.get('fecha', '')
+    historico = None
+    if fecha:
+        try:
+            _, fin_dt = rango_dias(fecha, fecha)
+        except ValueError:
+            flash('Fecha inválida.')
+            return redirect(url_for('main.stock_historico'))
+        historico = movimientos.stock_en(fin_dt)
+
+    return render_template('stock_historico.html', fecha=fecha, historico=historico,
+                           productos=catalogo.productos())
 
 @main.route('/mi_perfil')
 @login_required
 def mi_perfil():
     """Muestra el perfil del usuario actual."""
-    return render_template('perfil.html', usuario=current_user)
+    return render_template('perfil.html', usuario=current_user.registro())
 
 @main.route('/perfil/editar', methods=['GET', 'POST'])
 @login_required
 def editar_perfil():
     """Permite al usuario editar su perfil."""
+    usuario = current_user.registro()
     if request.method == 'POST':
-        current_user.nombre = request.form['nombre']
-        current_user.telefono = request.form['telefono']
-        current_user.direccion = request.form['direccion']
+        usuario.nombre = request.form['nombre']
+        usuario.telefono = request.form['telefono']
+        usuario.direccion = request.form['direccion']
         db.session.commit()
+        cache_usuarios.invalidar(usuario.id)
         flash('Perfil actualizado correctamente.')
         return redirect(url_for('main.mi_perfil'))
 
-    return render_template('editar_perfil.html', usuario=current_user)
+    return render_template('editar_perfil.html', usuario=usuario)
 
 @main.route('/perfil/password', methods=['GET', 'POST'])
 @login_required
@@ -544,13 +816,16 @@ def password():
         nueva = request.form['nueva']
         confirmar = request.form['confirmar']
 
-        if not check_password_hash(current_user.password, actual):
+        usuario = current_user.registro()
+
+        if not check_password_hash(usuario.password, actual):
             flash('Contraseña actual incorrecta.')
         elif nueva != confirmar:
             flash('La nueva contraseña no coincide.')
         else:
-            current_user.password = generate_password_hash(nueva)
+            usuario.password = generate_password_hash(nueva)
             db.session.commit()
+            cache_usuarios.invalidar(usuario.id)
             flash('Contraseña actualizada exitosamente.')
             return redirect(url_for('main.mi_perfil'))
 
@@ -558,61 +833,33 @@ def password():
 
 @main.route('/reporte/general')
 @login_required
+@usar_replica
+@cache_reportes.condicional
 def reporte_general():
     """Genera un reporte general con estadísticas del sistema."""
-    hoy = datetime.now()
-    inicio_mes = datetime(hoy.year, hoy.month, 1)
-    seis_meses_atras = hoy - timedelta(days=180)
-
-    # 1. Top 5 productos más vendidos del mes actual
-    top_productos = (
-        db.session.query(Producto.nombre, func.sum(DetalleVenta.cantidad).label('total'))
-        .join(DetalleVenta)
-        .join(Venta)
-        .filter(Venta.fecha >= inicio_mes)
-        .group_by(Producto.id)
-        .order_by(func.sum(DetalleVenta.cantidad).desc())
-        .limit(5)
-        .all()
-    )
-
-    nombres_top = [r[0] for r in top_productos]
-    cantidades_top = [int(r[1]) for r in top_productos]
-
-    # 2. Total de ventas por mes (últimos 6 meses)
-    ventas_mensuales = (
-        db.session.query(func.date_format(Venta.fecha, "%Y-%m").label("mes"), func.sum(Venta.total))
-        .filter(Venta.fecha >= seis_meses_atras)
-        .group_by("mes")
-        .order_by("mes")
-        .all()
-    )
-    meses = [r[0] for r in ventas_mensuales]
-    totales = [float(r[1]) for r in ventas_mensuales]
-
-    # 3. Ventas por categoría del mes actual
-    ventas_categoria = (
-        db.session.query(
-            Categoria.nombre.label('categoria'),
-            func.coalesce(func.sum(DetalleVenta.subtotal), 0).label('total_categoria')
-        )
-        .join(Producto, Categoria.id == Producto.categoria_id)
-        .join(DetalleVenta, Producto.id == DetalleVenta.producto_id)
-        .join(Venta, DetalleVenta.venta_id == Venta.id)
-        .filter(Venta.fecha >= inicio_mes)
-        .group_by(Categoria.id)
-        .all()
-    )
-    # Extrae nombres de categorías y totales, asegurando que no haya None
-    categorias = [r.categoria for r in ventas_categoria]
-    totales_categoria = [float(r.total_categoria) for r in ventas_categoria]
-
-    return render_template(
-        'reporte_general.html',
-        nombres_top=nombres_top,
-        cantidades_top=cantidades_top,
-        meses=meses,
-        totales=totales,
-        categorias=categorias,
-        totales_categoria=totales_categoria
-    )
\ No newline at end of file
+    hoy = date.today()
+    inicio_mes = inicio_de_mes(hoy)
+    inicio_semestre = inicio_de_mes(hoy, meses_atras=5)
+    fin_mes = inicio_de_mes(hoy, meses_atras=-1)
+
+    def cargar():
+        # 1. Top 5 productos más vendidos del mes actual
+        top_productos = reportes.top_productos(inicio_mes, fin_mes, limite=5)
+
+        # 2. Total de ventas por mes (últimos 6 meses)
+        ventas_mensuales = reportes.ventas_por_mes(inicio_semestre, fin_mes)
+
+        # 3. Ventas por categoría del mes actual
+        ventas_categoria = reportes.ventas_por_categoria(inicio_mes, fin_mes)
+
+        return {
+            'nombres_top': [r[0] for r in top_productos],
+            'cantidades_top': [r[1] for r in top_productos],
+            'meses': [r[0] for r in ventas_mensuales],
+            'totales': [r[1] for r in ventas_mensuales],
+            'categorias': [r[0] for r in ventas_categoria],
+            'totales_categoria': [r[1] for r in ventas_categoria],
+        }
+
+    graficos = cache_reportes.datos('reporte_general', (inicio_mes,), cargar)
+    return render_template('reporte_general.html', **graficos)
\ No newline at end of file
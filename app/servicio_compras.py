@@ -0,0 +1,135 @@
+import csv
+import io
+import json
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import case, insert, update
+
+from app import alertas, db, movimientos, servicio_ventas
+from app.models import Compra, Producto
+
+
+class CompraError(Exception):
+    """Archivo o formulario de compra que no se puede interpretar."""
+
+
+def lineas_desde_formulario(form):
+    """Lee las listas producto_id/cantidad/precio_unitario de un formulario."""
+    columnas = zip(
+        form.getlist('producto_id'),
+        form.getlist('cantidad'),
+        form.getlist('precio_unitario'),
+    )
+    return [
+        {'producto_id': p, 'cantidad': c, 'precio_unitario': u}
+        for p, c, u in columnas
+        if p or c or u
+    ]
+
+
+def lineas_desde_csv(contenido):
+    """Lee un CSV con encabezado producto_id,cantidad,precio_unitario."""
+    if isinstance(contenido, bytes):
+        contenido = contenido.decode('utf-8-sig')
+    lector = csv.DictReader(io.StringIO(contenido))
+    faltantes = {'producto_id', 'cantidad', 'precio_unitario'} - set(lector.fieldnames or [])
+    if faltantes:
+        raise CompraError(f"Faltan columnas en el CSV: {', '.join(sorted(faltantes))}")
+    return list(lector)
+
+
+def lineas_desde_json(datos):
+    """Acepta una lista de líneas o un objeto {"lineas": [...]}."""
+    if isinstance(datos, (str, bytes)):
+        try:
+            datos = json.loads(datos)
+        except ValueError:
+            raise CompraError("El JSON de la compra no es válido.")
+    if isinstance(datos, dict):
+        datos = datos.get('lineas')
+    if not isinstance(datos, list) or not all(isinstance(d, dict) for d in datos):
+        raise CompraError("Se esperaba una lista de líneas de compra.")
+    return datos
+
+
+def _validar(linea):
+    """Convierte una línea cruda en (producto_id, cantidad, precio) o un error."""
+    try:
+        producto_id = int(str(linea.get('producto_id', '')).strip())
+        cantidad = int(str(linea.get('cantidad', '')).strip())
+        precio = Decimal(str(linea.get('precio_unitario', '')).strip())
+    except (ValueError, InvalidOperation):
+        return None, 'Datos inválidos.'
+    if cantidad <= 0:
+        return None, 'Cantidad debe ser mayor a cero.'
+    if precio < 0 or not precio.is_finite():
+        return None, 'Precio unitario inválido.'
+    return (producto_id, cantidad, precio.quantize(Decimal('0.01'))), None
+
+
+def registrar_compras(usuario_id, lineas):
+    """Registra en una sola transacción todas las líneas válidas de una compra.
+
+    Valida todas las líneas antes de escribir, carga los productos con una
+    única consulta IN, inserta las compras en bloque y suma el stock con un
+    solo UPDATE ... CASE. Devuelve un resultado por línea con `ok` y, si
+    falló, el `error`. No hace commit.
+    """
+    resultados = []
+    validas = []
+    for numero, linea in enumerate(lineas, start=1):
+        datos, error = _validar(linea)
+        resultados.append({
+            'linea': numero,
+            'producto_id': datos[0] if datos else linea.get('producto_id'),
+            'ok': error is None,
+            'error': error,
+        })
+        if datos:
+            validas.append((numero, datos))
+
+    ids = {producto_id for _, (producto_id, _, _) in validas}
+    if ids:
+        # Las alertas comparan contra este stock: en SQLite FOR UPDATE no bloquea
+        servicio_ventas.iniciar_escritura()
+    existentes = {
+        p.id: p for p in
+        db.session.query(Producto.id, Producto.nombre, Producto.stock, Producto.stock_minimo)
+        .filter(Producto.id.in_(ids))
+        .with_for_update()
+    } if ids else {}
+
+    filas = []
+    incrementos = {}
+    for numero, (producto_id, cantidad, precio) in validas:
+        if producto_id not in existentes:
+            resultados[numero - 1].update(ok=False, error='Producto no encontrado.')
+            continue
+        filas.append({
+            'producto_id': producto_id,
+            'cantidad': cantidad,
+            'precio_unitario': precio,
+            'total': precio * cantidad,
+            'usuario_id': usuario_id,
+        })
+        incrementos[producto_id] = incrementos.get(producto_id, 0) + cantidad
+
+    if filas:
+        db.session.execute(insert(Compra), filas)
+        movimientos.registrar([
+            {'producto_id': f['producto_id'], 'tipo': 'compra',
+             'cantidad': f['cantidad'], 'usuario_id': usuario_id}
+            for f in filas
+        ])
+        db.session.execute(
+            update(Producto)
+            .where(Producto.id.in_(incrementos))
+            .values(stock=Producto.stock + case(incrementos, value=Producto.id)),
+            execution_options={'synchronize_session': False}
+        )
+        alertas.detectar(db.session, [
+            (p.id, p.nombre, p.stock, p.stock_minimo, p.stock + incrementos[p.id], p.stock_minimo)
+            for p in (existentes[i] for i in incrementos)
+        ])
+
+    return resultados
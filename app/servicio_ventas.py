@@ -0,0 +1,166 @@
+from sqlalchemy import case, insert, update
+from sqlalchemy.exc import IntegrityError
+
+from app import alertas, db, movimientos, resumenes
+from app.models import DetalleVenta, Producto, Venta
+
+
+class VentaError(Exception):
+    """Error de validación o de stock al registrar una venta."""
+
+
+def iniciar_escritura():
+    """Abre la transacción tomando el bloqueo de escritura si el motor lo necesita.
+
+    SQLite no soporta bloqueos por fila, así que se usa BEGIN IMMEDIATE para
+    no leer stock que otra venta está por modificar. En otros motores no
+    hace nada: el bloqueo lo toma SELECT ... FOR UPDATE.
+    """
+    conexion = db.session.connection()
+    if conexion.dialect.name == 'sqlite':
+        dbapi = conexion.connection.dbapi_connection
+        if not dbapi.in_transaction:
+            dbapi.execute('BEGIN IMMEDIATE')
+
+
+def _bloquear_productos(ids):
+    """Carga los productos de la venta en una sola consulta, bloqueando sus filas."""
+    iniciar_escritura()
+    productos = (
+        Producto.query
+        .filter(Producto.id.in_(ids))
+        .with_for_update()
+        .populate_existing()
+        .all()
+    )
+    return {p.id: p for p in productos}
+
+
+def registrar_venta(usuario_id, cantidades, clave=None, fecha=None):
+    """Registra una venta a partir de un dict {producto_id: cantidad}.
+
+    Valida el stock sobre filas bloqueadas, descuenta todo el stock con un
+    único UPDATE condicional, inserta los detalles en bloque y actualiza los
+    resúmenes diarios y el libro de movimientos. `clave` es la clave de
+    idempotencia de la terminal y `fecha` la hora en que se hizo la venta si
+    se registró sin conexión; sin ella se usa la hora del servidor. No hace
+    commit: el llamador decide cuándo cerrar la transacción.
+    """
+    if not cantidades:
+        raise VentaError("Debes seleccionar al menos un producto.")
+    if any(cantidad <= 0 for cantidad in cantidades.values()):
+        raise VentaError("Cantidad debe ser mayor a cero.")
+
+    ids = sorted(cantidades)
+    productos = _bloquear_productos(ids)
+
+    if len(productos) != len(ids):
+        raise VentaError("Producto no encontrado.")
+
+    for id_producto in ids:
+        producto = productos[id_producto]
+        if producto.stock < cantidades[id_producto]:
+            raise VentaError(f"No hay suficiente stock para {producto.nombre}")
+
+    detalles = [
+        {
+            'producto_id': id_producto,
+            'cantidad': cantidades[id_producto],
+            'subtotal': productos[id_producto].precio * cantidades[id_producto],
+        }
+        for id_producto in ids
+    ]
+    total = sum(d['subtotal'] for d in detalles)
+
+    descuento = case(cantidades, value=Producto.id)
+    resultado = db.session.execute(
+        update(Producto)
+        .where(Producto.id.in_(ids), Producto.stock >= descuento)
+        .values(stock=Producto.stock - descuento),
+        execution_options={'synchronize_session': False}
+    )
+    if resultado.rowcount != len(ids):
+        raise VentaError("No hay suficiente stock para completar la venta.")
+
+    venta = Venta(usuario_id=usuario_id, total=total, clave_idempotencia=clave)
+    if fecha is not None:
+        venta.fecha = fecha
+    db.session.add(venta)
+    db.session.flush()
+
+    for d in detalles:
+        d['venta_id'] = venta.id
+    db.session.execute(insert(DetalleVenta), detalles)
+    resumenes.acumular_venta(venta, detalles, productos)
+    movimientos.registrar([
+        {
+            'producto_id': d['producto_id'],
+            'tipo': 'venta',
+            'cantidad': -d['cantidad'],
+            'venta_id': venta.id,
+            'usuario_id': usuario_id,
+        }
+        for d in detalles
+    ])
+    alertas.detectar(db.session, [
+        (p.id, p.nombre, p.stock, p.stock_minimo, p.stock - cantidades[p.id], p.stock_minimo)
+        for p in productos.values()
+    ])
+
+    for id_producto in ids:
+        db.session.expire(productos[id_producto], ['stock'])
+
+    return venta
+
+
+def buscar_por_clave(clave):
+    """Id de la venta registrada con esa clave de idempotencia, o None."""
+    return db.session.query(Venta.id).filter(Venta.clave_idempotencia == clave).scalar()
+
+
+def _ventas_por_clave(claves):
+    """{clave: id de venta} de las claves ya registradas."""
+    return dict(
+        db.session.query(Venta.clave_idempotencia, Venta.id)
+        .filter(Venta.clave_idempotencia.in_(claves))
+    )
+
+
+def registrar_tramo(usuario_id, ventas):
+    """Registra un tramo de ventas encoladas por una terminal.
+
+    `ventas` es una lista de dicts con `clave`, `cantidades` y opcionalmente
+    `fecha`. Las claves ya registradas se informan como duplicadas sin tocar
+    el stock. Cada venta corre en un SAVEPOINT dentro de la transacción del
+    tramo, así una venta sin stock no descarta a las demás. Devuelve un
+    resultado por venta con `estado` 'creada', 'duplicada' o 'error'.
+    No hace commit.
+    """
+    iniciar_escritura()
+    registradas = _ventas_por_clave([v['clave'] for v in ventas])
+
+    resultados = []
+    for datos in ventas:
+        clave = datos['clave']
+        if clave in registradas:
+            resultados.append({'clave': clave, 'estado': 'duplicada', 'venta_id': registradas[clave]})
+            continue
+        try:
+            with db.session.begin_nested():
+                venta = registrar_venta(usuario_id, datos['cantidades'], clave=clave,
+                                        fecha=datos.get('fecha'))
+        except VentaError as e:
+            resultados.append({'clave': clave, 'estado': 'error', 'error': str(e)})
+            continue
+        except IntegrityError:
+            # Otra petición registró la misma clave mientras tanto
+            venta_id = buscar_por_clave(clave)
+            if venta_id is None:
+                raise
+            registradas[clave] = venta_id
+            resultados.append({'clave': clave, 'estado': 'duplicada', 'venta_id': venta_id})
+            continue
+        registradas[clave] = venta.id
+        resultados.append({'clave': clave, 'estado': 'creada', 'venta_id': venta.id})
+
+    return resultados
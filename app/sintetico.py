@@ -0,0 +1,143 @@
+import random
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import func, insert
+from werkzeug.security import generate_password_hash
+
+from app import db, movimientos
+from app.models import Categoria, Compra, DetalleVenta, Producto, Usuario, Venta
+
+CATEGORIAS = [
+    'Herramientas', 'Tornillería', 'Pinturas', 'Electricidad', 'Fontanería',
+    'Jardinería', 'Ferretería general', 'Adhesivos', 'Cerrajería', 'Construcción',
+]
+ARTICULOS = [
+    'Martillo', 'Destornillador', 'Llave inglesa', 'Tornillo', 'Tuerca',
+    'Arandela', 'Pintura', 'Brocha', 'Rodillo', 'Cable', 'Enchufe',
+    'Bombilla', 'Tubería', 'Codo', 'Grifo', 'Manguera', 'Pala', 'Candado',
+    'Bisagra', 'Silicona', 'Cemento', 'Taladro', 'Sierra', 'Alicate',
+]
+VARIANTES = [
+    'pequeño', 'mediano', 'grande', 'reforzado', 'galvanizado', 'de acero',
+    'de latón', 'eléctrico', 'inoxidable', 'profesional', 'económico',
+]
+
+LOTE = 5000
+
+
+def _insertar_en_lotes(modelo, filas):
+    for i in range(0, len(filas), LOTE):
+        db.session.execute(insert(modelo), filas[i:i + LOTE])
+
+
+def _siguiente_id(modelo):
+    return (db.session.query(func.max(modelo.id)).scalar() or 0) + 1
+
+
+def generar(usuarios=5, productos=200, ventas=1000, max_detalles=5,
+            dias=365, semilla=1, fin=None, compras=200):
+    """Llena la base con datos sintéticos de una ferretería usando inserts en bloque.
+
+    Los ids se asignan en Python para no tener que releerlos tras cada lote.
+    Las ventas y compras se insertan por lotes a medida que se generan, así
+    la memoria no crece con la escala. Al final registra el stock de los
+    productos nuevos como saldo inicial del libro de movimientos.
+    Devuelve un dict con la cantidad de filas creadas por tabla.
+    """
+    azar = random.Random(semilla)
+    fin = fin or datetime.now().replace(microsecond=0)
+    clave = generate_password_hash('demo')
+
+    id_usuario = _siguiente_id(Usuario)
+    filas_usuarios = [
+        {
+            'id': id_usuario + i, 'nombre': f'Vendedor {id_usuario + i}',
+            'username': f'vendedor{id_usuario + i}', 'cedula': f'SIN-{id_usuario + i}',
+            'password': clave, 'rol': 'vendedor', 'estado': 'activo',
+        }
+        for i in range(usuarios)
+    ]
+    _insertar_en_lotes(Usuario, filas_usuarios)
+    ids_usuarios = [u['id'] for u in filas_usuarios] or [
+        u.id for u in Usuario.query.with_entities(Usuario.id)
+    ]
+
+    existentes = {c.nombre: c.id for c in Categoria.query}
+    nuevas = [n for n in CATEGORIAS if n not in existentes]
+    id_categoria = _siguiente_id(Categoria)
+    _insertar_en_lotes(Categoria, [
+        {'id': id_categoria + i, 'nombre': n} for i, n in enumerate(nuevas)
+    ])
+    ids_categorias = list(existentes.values()) + [id_categoria + i for i in range(len(nuevas))]
+
+    id_producto = _siguiente_id(Producto)
+    filas_productos = []
+    for i in range(productos):
+        filas_productos.append({
+            'id': id_producto + i,
+            'nombre': f'{azar.choice(ARTICULOS)} {azar.choice(VARIANTES)} #{id_producto + i}',
+            'precio': Decimal(azar.randint(50, 50000)) / 100,
+            'stock': azar.randint(0, 500),
+            'stock_minimo': azar.randint(1, 20),
+            'categoria_id': azar.choice(ids_categorias),
+        })
+    _insertar_en_lotes(Producto, filas_productos)
+    precios = {p['id']: p['precio'] for p in filas_productos}
+    ids_productos = list(precios)
+
+    id_venta = _siguiente_id(Venta)
+    id_detalle = _siguiente_id(DetalleVenta)
+    segundos = dias * 86400
+    filas_ventas, filas_detalles = [], []
+    total_detalles = 0
+
+    for i in range(ventas):
+        venta_id = id_venta + i
+        total = Decimal(0)
+        for producto_id in azar.sample(ids_productos, min(len(ids_productos), azar.randint(1, max_detalles))):
+            cantidad = azar.randint(1, 10)
+            subtotal = precios[producto_id] * cantidad
+            total += subtotal
+            filas_detalles.append({
+                'id': id_detalle + total_detalles, 'venta_id': venta_id,
+                'producto_id': producto_id, 'cantidad': cantidad, 'subtotal': subtotal,
+            })
+            total_detalles += 1
+        filas_ventas.append({
+            'id': venta_id,
+            'fecha': fin - timedelta(seconds=azar.randint(0, segundos)),
+            'total': total,
+            'usuario_id': azar.choice(ids_usuarios),
+        })
+        if len(filas_detalles) >= LOTE:
+            _insertar_en_lotes(Venta, filas_ventas)
+            _insertar_en_lotes(DetalleVenta, filas_detalles)
+            filas_ventas, filas_detalles = [], []
+
+    _insertar_en_lotes(Venta, filas_ventas)
+    _insertar_en_lotes(DetalleVenta, filas_detalles)
+
+    filas_compras = []
+    for _ in range(compras if ids_productos else 0):
+        producto_id = azar.choice(ids_productos)
+        cantidad = azar.randint(5, 200)
+        precio = (precios[producto_id] * Decimal('0.6')).quantize(Decimal('0.01'))
+        filas_compras.append({
+            'producto_id': producto_id, 'cantidad': cantidad,
+            'precio_unitario': precio, 'total': precio * cantidad,
+            'fecha': fin - timedelta(seconds=azar.randint(0, segundos)),
+            'usuario_id': azar.choice(ids_usuarios),
+        })
+        if len(filas_compras) >= LOTE:
+            _insertar_en_lotes(Compra, filas_compras)
+            filas_compras = []
+    _insertar_en_lotes(Compra, filas_compras)
+
+    movimientos.iniciar()
+    db.session.commit()
+
+    return {
+        'usuarios': usuarios, 'categorias': len(nuevas), 'productos': productos,
+        'ventas': ventas, 'detalles': total_detalles, 'compras': compras,
+    }
@@ -0,0 +1,81 @@
+"""Tiempo de arranque de la aplicación en intérpretes nuevos.
+
+Cada repetición lanza un proceso de Python aparte (las importaciones ya
+hechas no cuentan dos veces) y mide por separado: importar el paquete
+`app`, ejecutar create_app() y, con --calentar, el calentamiento de
+app/arranque.py. Con --pdf también se importa xhtml2pdf, que es lo que
+costaba cada arranque cuando se cargaba con el módulo de PDF.
+
+    python -m benchmarks.arranque
+    python -m benchmarks.arranque --repeticiones 20 --calentar --pdf
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# Se ejecuta en el proceso hijo; imprime los tiempos en segundos como JSON
+_HIJO = """
+import json, sys, time
+inicio = time.perf_counter()
+import app
+importado = time.perf_counter()
+aplicacion = app.create_app({'SQLALCHEMY_DATABASE_URI': sys.argv[1], 'METRICAS': False})
+creado = time.perf_counter()
+tiempos = {'importar': importado - inicio, 'create_app': creado - importado}
+if sys.argv[2] == '1':
+    from app import arranque
+    with aplicacion.app_context():
+        app.db.create_all()
+    for paso, _, segundos in arranque.calentar(aplicacion, pdf_=sys.argv[3] == '1'):
+        tiempos[paso] = segundos
+elif sys.argv[3] == '1':
+    antes = time.perf_counter()
+    app.pdf.precargar()
+    tiempos['pdf'] = time.perf_counter() - antes
+tiempos['total'] = time.perf_counter() - inicio
+print(json.dumps(tiempos))
+"""
+
+
+def _medir(url, calentar, pdf):
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    salida = subprocess.run(
+        [sys.executable, '-c', _HIJO, url, '1' if calentar else '0', '1' if pdf else '0'],
+        cwd=raiz, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(salida.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='URI de la base (por defecto SQLite temporal)')
+    parser.add_argument('--repeticiones', type=int, default=10)
+    parser.add_argument('--calentar', action='store_true', help='medir también el calentamiento')
+    parser.add_argument('--pdf', action='store_true', help='importar también xhtml2pdf')
+    parser.add_argument('--json', help='guardar las medianas en este archivo')
+    args = parser.parse_args(argv)
+
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    # La primera corrida llena la caché de bytecode de Python y no se cuenta
+    _medir(url, args.calentar, args.pdf)
+    corridas = [_medir(url, args.calentar, args.pdf) for _ in range(args.repeticiones)]
+
+    medianas = {}
+    print(f"{'paso':<12} {'p50 ms':>8} {'min ms':>8} {'max ms':>8}")
+    for paso in corridas[0]:
+        valores = [c[paso] * 1000 for c in corridas]
+        medianas[paso] = round(statistics.median(valores), 1)
+        print(f'{paso:<12} {medianas[paso]:>8.1f} {min(valores):>8.1f} {max(valores):>8.1f}')
+
+    if args.json:
+        with open(args.json, 'w') as archivo:
+            json.dump(medianas, archivo, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""Lecturas y ventas concurrentes con y sin el perfil de motor.
+
+Siembra la misma base dos veces y la somete a hilos que leen (historial de
+ventas y búsqueda de productos) mientras otros hilos registran ventas.
+Compara el perfil por defecto (en SQLite: WAL, synchronous=NORMAL, mmap y
+busy timeout) contra el motor sin ajustes, informando operaciones por
+segundo y p95 de cada tipo. Cada perfil se mide primero solo con lectores
+y luego con ventas concurrentes: si las lecturas no esperan a las
+escrituras, su p95 casi no debe crecer al sumar las ventas.
+
+    python -m benchmarks.concurrencia --lectores 8 --vendedores 2 --segundos 10
+    python -m benchmarks.concurrencia --url mysql+pymysql://u:p@localhost/bench
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import update
+from werkzeug.security import generate_password_hash
+
+from app import busqueda, create_app, db, resumenes, sintetico
+from app.models import Producto, Usuario
+
+FIN = datetime(2025, 6, 15, 12, 0, 0)
+
+SIN_AJUSTES = {
+    'SQLITE_JOURNAL_MODE': 'DELETE',
+    'SQLITE_SYNCHRONOUS': 'FULL',
+    'SQLITE_MMAP_MB': 0,
+    'SQLITE_BUSY_TIMEOUT_MS': 5000,
+    'DB_POOL_PRE_PING': False,
+}
+
+
+def _percentil(ordenados, p):
+    if not ordenados:
+        return 0.0
+    indice = max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+def _preparar(url, config, args):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': url, 'METRICAS': False, **config})
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        sintetico.generar(productos=args.productos, ventas=args.ventas, fin=FIN)
+        resumenes.reconstruir()
+        busqueda.crear_indice()
+        db.session.execute(update(Producto).values(stock=10 ** 6))
+        db.session.add(Usuario(nombre='Bench', username='bench', rol='admin',
+                               password=generate_password_hash('bench', method='pbkdf2:sha256:1000')))
+        db.session.commit()
+        ids = [id_ for (id_,) in db.session.query(Producto.id)]
+    return app, ids
+
+
+def _cliente(app):
+    cliente = app.test_client()
+    cliente.post('/login', data={'username': 'bench', 'password': 'bench'})
+    return cliente
+
+
+def _correr(app, ids, lectores, vendedores, segundos):
+    """Lanza los hilos y devuelve {tipo: (operaciones, errores, [ms])}."""
+    resultados = {'lectura': [0, 0, []], 'venta': [0, 0, []]}
+    candado = threading.Lock()
+    arranque = threading.Barrier(lectores + vendedores)
+    fin = None
+
+    def trabajar(tipo, semilla):
+        nonlocal fin
+        azar = random.Random(semilla)
+        cliente = _cliente(app)
+        if arranque.wait() == 0:
+            fin = time.perf_counter() + segundos
+        while fin is None:
+            time.sleep(0.001)
+        while time.perf_counter() < fin:
+            t = time.perf_counter()
+            if tipo == 'venta':
+                id_ = azar.choice(ids)
+                r = cliente.post('/ventas/registrar', data={'productos': id_, f'cantidad_{id_}': 1})
+                ok = r.status_code == 302 and '/dashboard' in r.headers.get('Location', '')
+            elif azar.random() < 0.5:
+                ok = cliente.get('/ventas').status_code == 200
+            else:
+                ok = cliente.get('/productos/buscar', query_string={'nombre': 'martillo'}).status_code == 200
+            ms = (time.perf_counter() - t) * 1000
+            with candado:
+                datos = resultados[tipo]
+                datos[0 if ok else 1] += 1
+                datos[2].append(ms)
+
+    hilos = [threading.Thread(target=trabajar, args=('lectura', i)) for i in range(lectores)]
+    hilos += [threading.Thread(target=trabajar, args=('venta', 100 + i)) for i in range(vendedores)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return resultados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='URI de la base (por defecto un SQLite temporal por perfil)')
+    parser.add_argument('--productos', type=int, default=2000)
+    parser.add_argument('--ventas', type=int, default=20000)
+    parser.add_argument('--lectores', type=int, default=6)
+    parser.add_argument('--vendedores', type=int, default=2)
+    parser.add_argument('--segundos', type=float, default=5.0)
+    args = parser.parse_args(argv)
+
+    print(f"{'perfil':<14}{'carga':<18}{'tipo':<10}{'ops/s':>10}{'errores':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for perfil, config in (('sin ajustes', SIN_AJUSTES), ('por defecto', {})):
+        url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+        app, ids = _preparar(url, config, args)
+        for carga, vendedores in (('solo lecturas', 0), ('lecturas + ventas', args.vendedores)):
+            resultados = _correr(app, ids, args.lectores, vendedores, args.segundos)
+            for tipo, (ops, errores, tiempos) in resultados.items():
+                if not ops and not errores:
+                    continue
+                tiempos.sort()
+                print(f"{perfil:<14}{carga:<18}{tipo:<10}{ops / args.segundos:>10.1f}{errores:>10}"
+                      f"{_percentil(tiempos, 50):>10.1f}{_percentil(tiempos, 95):>10.1f}")
+        with app.app_context():
+            db.engine.dispose()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""Tiempo de renderizado del listado de productos con muchas filas.
+
+Compara, sin tocar la base, el listado dibujado en el servidor (la
+plantilla anterior: una fila HTML por producto con `'%.2f'|format`)
+contra la página actual más el JSON compacto de /productos/datos que la
+tabla pide después. También mide cuánto tarda un proceso nuevo en cargar
+las plantillas con y sin la caché de bytecode en disco.
+
+    python -m benchmarks.plantillas
+    python -m benchmarks.plantillas --filas 50000 --repeticiones 10
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from decimal import Decimal
+from types import SimpleNamespace
+
+from flask import g, render_template
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+from app import create_app
+from app.catalogo import CategoriaSnapshot, ProductoSnapshot
+
+# Cuerpo de la tabla tal como se dibujaba antes en productos.html
+ANTERIOR = """{% extends 'adminlte.html' %}
+{% block content %}
+<table class="table table-bordered table-hover table-striped mb-0">
+  <tbody>
+    {% for p in productos %}
+    <tr>
+      <td class="text-center">{{ p.id }}</td>
+      <td>{{ p.nombre }}</td>
+      <td>{{ p.categoria.nombre }}</td>
+      <td>${{ '%.2f'|format(p.precio) }}</td>
+      <td class="text-center">
+        {% if p.stock == 0 %}
+          <span class="badge badge-danger" title="Sin stock">{{ p.stock }}</span>
+        {% elif p.stock <= p.stock_minimo %}
+          <span class="badge badge-warning" title="Stock bajo">{{ p.stock }}</span>
+        {% else %}
+          <span class="badge badge-success" title="Stock suficiente">{{ p.stock }}</span>
+        {% endif %}
+      </td>
+      <td class="text-center">{{ p.stock_minimo }}</td>
+      <td class="text-center">
+        <a href="{{ url_for('main.editar_producto', id=p.id) }}" class="btn btn-sm btn-outline-warning mr-1"
+           data-toggle="tooltip" title="Editar producto" aria-label="Editar {{ p.nombre }}">
+          <i class="fas fa-edit"></i>
+        </a>
+        <a href="{{ url_for('main.eliminar_producto', id=p.id) }}" class="btn btn-sm btn-outline-danger"
+           data-toggle="tooltip" title="Eliminar producto" aria-label="Eliminar {{ p.nombre }}"
+           onclick="return confirm('¿Deseas eliminar el producto {{ p.nombre }}?');">
+          <i class="fas fa-trash-alt"></i>
+        </a>
+      </td>
+    </tr>
+    {% endfor %}
+  </tbody>
+</table>
+{% endblock %}"""
+
+
+def _productos(cantidad):
+    categorias = [CategoriaSnapshot(i, f'Categoría {i}') for i in range(1, 21)]
+    return tuple(
+        ProductoSnapshot(i, f'Producto de prueba {i}', Decimal(i % 5000) / 4, i % 50, 10,
+                         categorias[i % 20].id, categorias[i % 20])
+        for i in range(1, cantidad + 1)
+    )
+
+
+def _medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos), len(resultado.encode())
+
+
+def _carga_en_frio(carpeta, cache):
+    """ms para cargar todas las plantillas en un entorno Jinja nuevo."""
+    entorno = Environment(loader=FileSystemLoader(carpeta), bytecode_cache=cache)
+    inicio = time.perf_counter()
+    for nombre in entorno.list_templates():
+        entorno.get_template(nombre)
+    return (time.perf_counter() - inicio) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--filas', type=int, default=10000)
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--json', help='guardar los resultados en este archivo')
+    args = parser.parse_args(argv)
+
+    directorio = tempfile.mkdtemp()
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(directorio, 'bench.db')}",
+        'JINJA_CACHE_DIR': os.path.join(directorio, 'jinja'),
+        'METRICAS': False,
+    })
+    productos = _productos(args.filas)
+    anterior = app.jinja_env.from_string(ANTERIOR)
+    resultados = {'filas': args.filas}
+
+    with app.test_request_context('/productos'):
+        # La barra superior muestra el nombre del usuario
+        g._login_user = SimpleNamespace(is_authenticated=True, nombre='Bench', rol='admin')
+
+        # Mismo contexto que render_template (current_user, get_flashed_messages...)
+        contexto = {'productos': productos}
+        app.update_template_context(contexto)
+
+        def datos():
+            return json.dumps({'filas': [
+                [p.id, p.nombre, p.categoria.nombre, f'{p.precio:.2f}', p.stock, p.stock_minimo]
+                for p in productos
+            ]})
+
+        casos = {
+            'servidor': lambda: anterior.render(contexto),
+            'pagina': lambda: render_template('productos.html'),
+            'datos_json': datos,
+        }
+        print(f"{'caso':<12} {'p50 ms':>9} {'bytes':>10}")
+        for nombre, funcion in casos.items():
+            ms, tamano = _medir(funcion, args.repeticiones)
+            resultados[nombre] = {'ms': round(ms, 2), 'bytes': tamano}
+            print(f'{nombre:<12} {ms:>9.2f} {tamano:>10}')
+
+    carpeta = app.jinja_loader.searchpath[0]
+    os.makedirs(os.path.join(directorio, 'frio'))
+    cache = FileSystemBytecodeCache(os.path.join(directorio, 'frio'))
+    sin_cache = statistics.median(_carga_en_frio(carpeta, None) for _ in range(args.repeticiones))
+    _carga_en_frio(carpeta, cache)
+    con_cache = statistics.median(_carga_en_frio(carpeta, cache) for _ in range(args.repeticiones))
+    resultados['carga_plantillas'] = {'sin_cache_ms': round(sin_cache, 2), 'con_cache_ms': round(con_cache, 2)}
+    print(f'carga de plantillas: {sin_cache:.1f} ms sin caché de bytecode, {con_cache:.1f} ms con caché')
+
+    if args.json:
+        with open(args.json, 'w') as archivo:
+            json.dump(resultados, archivo, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
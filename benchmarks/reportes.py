@@ -0,0 +1,100 @@
+"""Paridad y latencia de los reportes de ventas sobre datos sintéticos.
+
+Siembra una base (por defecto un SQLite temporal), reconstruye los
+resúmenes y compara cada reporte calculado desde los resúmenes contra el
+mismo reporte calculado desde las tablas base, midiendo ambos tiempos.
+
+    python -m benchmarks.reportes --ventas 50000
+    python -m benchmarks.reportes --url mysql+pymysql://u:p@localhost/bench --json mysql.json
+
+Con la misma semilla, los archivos --json generados en distintos motores
+deben ser idénticos.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from app import create_app, db, reportes, resumenes, sintetico
+from app.consultas import inicio_de_mes
+
+FIN = datetime(2025, 6, 15, 12, 0, 0)
+
+
+def _casos():
+    hoy = FIN.date()
+    mes_actual = (inicio_de_mes(hoy), inicio_de_mes(hoy, -1))
+    semestre = (inicio_de_mes(hoy, 5), inicio_de_mes(hoy, -1))
+    return {
+        'ventas_por_mes': lambda base: reportes.ventas_por_mes(base=base),
+        'ventas_por_mes_semestre': lambda base: reportes.ventas_por_mes(*semestre, base=base),
+        'top_productos_mes': lambda base: reportes.top_productos(*mes_actual, base=base),
+        'ventas_por_categoria_mes': lambda base: reportes.ventas_por_categoria(*mes_actual, base=base),
+        'ventas_por_usuario': lambda base: [
+            (r.nombre, int(r.cantidad_ventas), round(float(r.total_ventas), 2))
+            for r in reportes.ventas_por_usuario(base=base)
+        ],
+    }
+
+
+def _normalizar(filas):
+    return [[round(v, 2) if isinstance(v, float) else v for v in fila] for fila in filas]
+
+
+def _medir(funcion, repeticiones):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        resultado = funcion()
+    return resultado, (time.perf_counter() - inicio) * 1000 / repeticiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='URI de la base a sembrar (por defecto SQLite temporal)')
+    parser.add_argument('--ventas', type=int, default=20000)
+    parser.add_argument('--productos', type=int, default=2000)
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--presupuesto-ms', type=float, default=50.0,
+                        help='latencia máxima aceptada para cada reporte desde resúmenes')
+    parser.add_argument('--json', help='guarda los resultados para compararlos entre motores')
+    args = parser.parse_args(argv)
+
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    app = create_app({'SQLALCHEMY_DATABASE_URI': url})
+    fallos = []
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        t = time.perf_counter()
+        creados = sintetico.generar(productos=args.productos, ventas=args.ventas, fin=FIN)
+        print(f"Sembrado {creados} en {time.perf_counter() - t:.1f}s ({url})")
+        resumenes.reconstruir()
+
+        resultados = {}
+        print(f"{'reporte':<28}{'resumen ms':>12}{'base ms':>12}  paridad")
+        for nombre, funcion in _casos().items():
+            rapido, ms_resumen = _medir(lambda: funcion(False), args.repeticiones)
+            lento, ms_base = _medir(lambda: funcion(True), args.repeticiones)
+            iguales = _normalizar(rapido) == _normalizar(lento)
+            print(f"{nombre:<28}{ms_resumen:>12.2f}{ms_base:>12.2f}  {'ok' if iguales else 'DIFERENTE'}")
+            if not iguales:
+                fallos.append(f"{nombre}: los resúmenes no coinciden con las tablas base")
+            if ms_resumen > args.presupuesto_ms:
+                fallos.append(f"{nombre}: {ms_resumen:.1f} ms supera {args.presupuesto_ms} ms")
+            resultados[nombre] = _normalizar(rapido)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
+
+    for fallo in fallos:
+        print(f"FALLO {fallo}", file=sys.stderr)
+    return 1 if fallos else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,195 @@
+"""Latencia y rendimiento de las rutas más usadas sobre datos sintéticos.
+
+Siembra una base (por defecto un SQLite temporal), inicia sesión como admin
+con el cliente de pruebas de Flask y mide cada ruta: p50/p95/p99 en ms y
+peticiones por segundo. Cada corrida se agrega a un archivo JSONL junto con
+el commit actual; con --comparar se contrasta contra la corrida anterior
+con los mismos parámetros y se falla si algún p95 empeoró más de lo tolerado.
+
+    python -m benchmarks.rutas --productos 5000 --ventas 50000
+    python -m benchmarks.rutas --url mysql+pymysql://u:p@localhost/bench --comparar
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+from werkzeug.security import generate_password_hash
+
+from app import busqueda, create_app, db, resumenes, sintetico
+from app.models import Producto, Usuario, Venta
+
+FIN = datetime(2025, 6, 15, 12, 0, 0)
+RESULTADOS = os.path.join(os.path.dirname(__file__), 'resultados.jsonl')
+BUSQUEDAS = ['martillo', 'tornillo galvanizado', 'pintura', 'cable', 'llave inglesa', 'taladro']
+
+
+def _percentil(ordenados, p):
+    """Percentil por rango más cercano sobre una lista ya ordenada."""
+    indice = max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+def _medir(peticion, repeticiones):
+    tiempos = []
+    inicio = time.perf_counter()
+    for i in range(repeticiones):
+        t = time.perf_counter()
+        respuesta = peticion(i)
+        tiempos.append((time.perf_counter() - t) * 1000)
+        if respuesta.status_code >= 400:
+            raise RuntimeError(f'HTTP {respuesta.status_code}')
+    total = time.perf_counter() - inicio
+    tiempos.sort()
+    return {
+        'p50': round(_percentil(tiempos, 50), 2),
+        'p95': round(_percentil(tiempos, 95), 2),
+        'p99': round(_percentil(tiempos, 99), 2),
+        'rps': round(repeticiones / total, 1),
+    }
+
+
+def _casos(cliente, ids_productos, ids_ventas, azar):
+    """Peticiones a medir; cada una recibe el número de repetición."""
+    inicio = (FIN - timedelta(days=30)).strftime('%Y-%m-%d')
+    fin = FIN.strftime('%Y-%m-%d')
+
+    def vender(_):
+        id_ = azar.choice(ids_productos)
+        return cliente.post('/ventas/registrar', data={'productos': id_, f'cantidad_{id_}': 1})
+
+    return {
+        'registrar_venta (POST)': vender,
+        'registrar_venta (GET)': lambda _: cliente.get('/ventas/registrar'),
+        'ventas': lambda _: cliente.get('/ventas'),
+        'buscar_productos': lambda i: cliente.get(
+            '/productos/buscar', query_string={'nombre': BUSQUEDAS[i % len(BUSQUEDAS)]}
+        ),
+        'reporte_general': lambda _: cliente.get('/reporte/general'),
+        'exportar_ventas_pdf': lambda _: cliente.post(
+            '/reportes/ventas_fecha/pdf', data={'inicio': inicio, 'fin': fin}
+        ),
+        'ventas_por_usuario_pdf': lambda _: cliente.get('/reportes/ventas_por_usuario/pdf'),
+        'factura_pdf (sin caché)': lambda i: cliente.get(f'/ventas/{ids_ventas[i % len(ids_ventas)]}/pdf'),
+    }
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _anterior(archivo, parametros):
+    """Última corrida guardada con los mismos parámetros, o None."""
+    if not os.path.exists(archivo):
+        return None
+    ultima = None
+    with open(archivo, encoding='utf-8') as f:
+        for linea in f:
+            corrida = json.loads(linea)
+            if corrida['parametros'] == parametros:
+                ultima = corrida
+    return ultima
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='URI de la base a sembrar (por defecto SQLite temporal)')
+    parser.add_argument('--productos', type=int, default=2000)
+    parser.add_argument('--ventas', type=int, default=20000)
+    parser.add_argument('--compras', type=int, default=2000)
+    parser.add_argument('--repeticiones', type=int, default=50)
+    parser.add_argument('--solo', action='append', help='medir solo las rutas que contengan este texto')
+    parser.add_argument('--resultados', default=RESULTADOS, help='archivo JSONL donde se acumulan las corridas')
+    parser.add_argument('--comparar', action='store_true',
+                        help='falla si algún p95 empeoró respecto de la corrida anterior')
+    parser.add_argument('--tolerancia', type=float, default=20.0,
+                        help='aumento porcentual de p95 aceptado al comparar')
+    parser.add_argument('--minimo-ms', type=float, default=2.0,
+                        help='ignora aumentos de p95 menores a estos ms (ruido)')
+    args = parser.parse_args(argv)
+
+    directorio = tempfile.mkdtemp()
+    url = args.url or f"sqlite:///{os.path.join(directorio, 'bench.db')}"
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': url,
+        'PDF_CACHE_DIR': os.path.join(directorio, 'pdf'),
+        'PDF_ESPERA_SEGUNDOS': 60,
+        'METRICAS': False,
+    })
+    azar = random.Random(1)
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        t = time.perf_counter()
+        creados = sintetico.generar(productos=args.productos, ventas=args.ventas,
+                                    compras=args.compras, fin=FIN)
+        resumenes.reconstruir()
+        busqueda.crear_indice()
+        print(f"Sembrado {creados} en {time.perf_counter() - t:.1f}s ({url})")
+
+        # Stock holgado para que las ventas del benchmark nunca fallen
+        db.session.execute(update(Producto).values(stock=10 ** 6))
+        db.session.add(Usuario(nombre='Bench', username='bench', rol='admin',
+                               password=generate_password_hash('bench')))
+        db.session.commit()
+        ids_productos = [id_ for (id_,) in db.session.query(Producto.id)]
+        ids_ventas = [id_ for (id_,) in db.session.query(Venta.id).limit(args.repeticiones)]
+
+    cliente = app.test_client()
+    cliente.post('/login', data={'username': 'bench', 'password': 'bench'})
+
+    resultados = {}
+    print(f"{'ruta':<28}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}")
+    for nombre, peticion in _casos(cliente, ids_productos, ids_ventas, azar).items():
+        if args.solo and not any(s in nombre for s in args.solo):
+            continue
+        r = _medir(peticion, args.repeticiones)
+        resultados[nombre] = r
+        print(f"{nombre:<28}{r['p50']:>10.2f}{r['p95']:>10.2f}{r['p99']:>10.2f}{r['rps']:>10.1f}")
+
+    parametros = {
+        'motor': url.split(':', 1)[0], 'productos': args.productos, 'ventas': args.ventas,
+        'compras': args.compras, 'repeticiones': args.repeticiones,
+    }
+    anterior = _anterior(args.resultados, parametros)
+    corrida = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'commit': _commit(),
+        'parametros': parametros,
+        'rutas': resultados,
+    }
+    with open(args.resultados, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(corrida, ensure_ascii=False) + '\n')
+
+    fallos = []
+    if anterior:
+        print(f"\nComparado con {anterior['commit']} ({anterior['fecha']}):")
+        for nombre, r in resultados.items():
+            previo = anterior['rutas'].get(nombre)
+            if not previo:
+                continue
+            cambio = (r['p95'] - previo['p95']) / previo['p95'] * 100 if previo['p95'] else 0.0
+            print(f"  {nombre:<28}p95 {previo['p95']:>8.2f} -> {r['p95']:>8.2f} ms ({cambio:+.0f}%)")
+            if args.comparar and cambio > args.tolerancia and r['p95'] - previo['p95'] > args.minimo_ms:
+                fallos.append(f"{nombre}: p95 empeoró {cambio:.0f}% (tolerancia {args.tolerancia:.0f}%)")
+
+    for fallo in fallos:
+        print(f"FALLO {fallo}", file=sys.stderr)
+    return 1 if fallos else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
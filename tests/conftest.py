@@ -0,0 +1,71 @@
+import pytest
+from werkzeug.security import generate_password_hash
+
+from app import create_app, db
+from app.models import Categoria, Producto, Usuario
+
+# Las fixtures no dejan un contexto de app abierto: el cliente de pruebas lo
+# reutilizaría y `g` (el usuario de Flask-Login, el sello de reportes...)
+# pasaría de una petición a la siguiente. Los tests abren el suyo con
+# `with app.app_context():`, o piden la fixture `contexto` si no hacen
+# peticiones.
+
+
+@pytest.fixture
+def app(tmp_path):
+    """Aplicación sobre un SQLite en archivo temporal, con las tablas creadas."""
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'inventario.db'}",
+        'PDF_CACHE_DIR': str(tmp_path / 'pdf'),
+        'ARCHIVO_VENTAS_DIR': str(tmp_path / 'archivo'),
+        'JINJA_CACHE': False,
+        'METRICAS': False,
+    })
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+
+@pytest.fixture
+def contexto(app):
+    """Contexto de app abierto durante todo el test, para usar la base directamente."""
+    with app.app_context():
+        yield
+        db.session.remove()
+
+
+@pytest.fixture
+def admin(app):
+    """Id de un usuario admin con clave 'clave'."""
+    with app.app_context():
+        usuario = Usuario(nombre='Admin', username='admin', rol='admin',
+                          password=generate_password_hash('clave'))
+        db.session.add(usuario)
+        db.session.commit()
+        return usuario.id
+
+
+@pytest.fixture
+def producto(app):
+    """Id de un producto con 25 unidades en stock."""
+    with app.app_context():
+        categoria = Categoria(nombre='Herramientas')
+        db.session.add(categoria)
+        db.session.flush()
+        producto = Producto(nombre='Martillo', precio=10, stock=25, stock_minimo=2,
+                            categoria_id=categoria.id)
+        db.session.add(producto)
+        db.session.commit()
+        return producto.id
+
+
+@pytest.fixture
+def cliente(app, admin):
+    """Cliente de pruebas con la sesión de admin iniciada."""
+    cliente = app.test_client()
+    respuesta = cliente.post('/login', data={'username': 'admin', 'password': 'clave'})
+    assert respuesta.status_code == 302
+    return cliente
@@ -0,0 +1,37 @@
+from app import create_app, db, servicio_ventas
+
+
+def _vender(app, admin, producto, cantidad, confirmar=True):
+    with app.app_context():
+        servicio_ventas.registrar_venta(admin, {producto: cantidad})
+        if confirmar:
+            db.session.commit()
+        else:
+            db.session.rollback()
+
+
+def test_otro_worker_recibe_los_eventos(app, cliente, admin, producto):
+    # Segundo worker sobre la misma base
+    otro = create_app({k: app.config[k] for k in ('TESTING', 'SQLALCHEMY_DATABASE_URI', 'JINJA_CACHE', 'METRICAS')})
+
+    _vender(otro, admin, producto, 21, confirmar=False)
+    assert cliente.get('/stock/alertas/feed').get_json() == {'eventos': [], 'ultimo': 0}
+
+    _vender(otro, admin, producto, 21)
+    datos = cliente.get('/stock/alertas/feed').get_json()
+    assert [(e['tipo'], e['producto_id'], e['stock']) for e in datos['eventos']] == [
+        ('stock_bajo', producto, 4)
+    ]
+    assert cliente.get(f"/stock/alertas/feed?desde={datos['ultimo']}").get_json()['eventos'] == []
+
+
+def test_el_stream_se_cierra_solo(app, cliente, admin, producto):
+    _vender(app, admin, producto, 21)
+    app.config['ALERTAS_STREAM_SEGUNDOS'] = 0
+
+    respuesta = cliente.get('/stock/alertas/stream')
+    cuerpo = respuesta.get_data(as_text=True)
+    assert cuerpo.startswith('id: 1\n') and cuerpo.count('data: ') == 1
+
+    respuesta = cliente.get('/stock/alertas/stream', headers={'Last-Event-ID': '1'})
+    assert respuesta.get_data(as_text=True) == ''
@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, text
+
+from app import catalogo, db, movimientos, servicio_ventas
+from app.models import DetalleVenta, Producto, Venta
+
+
+def test_stock_no_sale_de_una_cache_atrasada(app, cliente, producto):
+    with app.app_context():
+        catalogo.productos()
+        # Otro worker cambia el precio y vende: esta caché del catálogo no se entera
+        with db.engine.begin() as conexion:
+            conexion.execute(text('UPDATE productos SET precio = 12, stock = 20 WHERE id = :id'),
+                             {'id': producto})
+        assert catalogo.productos()[0].precio == 10
+
+    datos = cliente.get(f'/api/v1/productos/stock?ids=999,{producto}').get_json()
+    assert datos['filas'] == [[producto, '12.00', 20]]
+
+    productos = cliente.get(f'/api/v1/productos?ids={producto}').get_json()['productos']
+    assert [(p['id'], p['stock'], p['categoria']) for p in productos] == [(producto, 20, 'Herramientas')]
+
+
+def _lote(cliente, *ventas):
+    return cliente.post('/api/v1/ventas/lote', json={'ventas': list(ventas)})
+
+
+def _venta(clave, producto, cantidad):
+    return {'clave': clave, 'lineas': [{'producto_id': producto, 'cantidad': cantidad}]}
+
+
+def _stock(app, producto):
+    with app.app_context():
+        return db.session.get(Producto, producto).stock
+
+
+def test_lote_con_claves_repetidas_descuenta_una_vez(app, cliente, producto):
+    datos = _lote(cliente, _venta('a', producto, 2), _venta('a', producto, 2)).get_json()
+    primera, repetida = datos['resultados']
+    assert (primera['estado'], repetida['estado']) == ('creada', 'duplicada')
+    assert repetida['venta_id'] == primera['venta_id']
+    assert _stock(app, producto) == 23
+
+    # La terminal reenvía el lote porque no recibió la respuesta
+    datos = _lote(cliente, _venta('a', producto, 2)).get_json()
+    assert datos['duplicada'] == 1 and datos['resultados'][0]['venta_id'] == primera['venta_id']
+    respuesta = cliente.post('/api/v1/ventas', json=_venta('a', producto, 2))
+    assert respuesta.status_code == 200 and respuesta.get_json()['id'] == primera['venta_id']
+    assert _stock(app, producto) == 23
+
+
+def test_una_venta_sin_stock_no_descarta_el_tramo(app, cliente, producto):
+    with app.app_context():
+        movimientos.iniciar()
+        db.session.commit()
+    datos = _lote(cliente, _venta('a', producto, 2), _venta('b', producto, 100),
+                  _venta('c', producto, 3)).get_json()
+    assert [r['estado'] for r in datos['resultados']] == ['creada', 'error', 'creada']
+    assert _stock(app, producto) == 20
+    with app.app_context():
+        assert db.session.query(Venta.clave_idempotencia).order_by(Venta.id).all() == [('a',), ('c',)]
+        assert db.session.query(func.sum(DetalleVenta.cantidad)).scalar() == 5
+        assert movimientos.inconsistencias() == []
+
+
+def test_clave_registrada_en_paralelo(app, cliente, producto, monkeypatch):
+    _lote(cliente, _venta('a', producto, 2))
+    original = servicio_ventas.buscar_por_clave
+    llamadas = []
+
+    def buscar_tarde(clave):
+        # La primera búsqueda no ve la venta que otra petición está confirmando
+        llamadas.append(clave)
+        return None if len(llamadas) == 1 else original(clave)
+
+    monkeypatch.setattr(servicio_ventas, 'buscar_por_clave', buscar_tarde)
+    respuesta = cliente.post('/api/v1/ventas', json=_venta('a', producto, 2))
+    assert respuesta.status_code == 200 and len(llamadas) == 2
+
+    monkeypatch.setattr(servicio_ventas, '_ventas_por_clave', lambda claves: {})
+    datos = _lote(cliente, _venta('a', producto, 2), _venta('b', producto, 1)).get_json()
+    assert [r['estado'] for r in datos['resultados']] == ['duplicada', 'creada']
+    assert _stock(app, producto) == 22
+
+
+def test_ventas_invalidas(app, cliente, producto):
+    assert cliente.post('/api/v1/ventas', json={**_venta('a', producto, 1), 'clave': 5}).status_code == 400
+    assert cliente.post('/api/v1/ventas', json={**_venta('a', producto, 1), 'clave': 'x' * 65}).status_code == 400
+    for cantidad in (0, -3):
+        respuesta = cliente.post('/api/v1/ventas', json=_venta('a', producto, cantidad))
+        assert respuesta.status_code == 400
+
+    manana = (datetime.now(timezone.utc) + timedelta(hours=20)).isoformat()
+    pasado = (datetime.now(timezone.utc) + timedelta(days=2)).isoformat()
+    assert cliente.post('/api/v1/ventas', json={**_venta('a', producto, 1), 'fecha': pasado}).status_code == 400
+    assert cliente.post('/api/v1/ventas', json={**_venta('a', producto, 1), 'fecha': manana}).status_code == 201
+
+    sin_clave = {'lineas': [{'producto_id': producto, 'cantidad': 1}]}
+    datos = _lote(cliente, sin_clave, _venta('b', producto, -1)).get_json()
+    assert [r['estado'] for r in datos['resultados']] == ['error', 'error']
+    assert cliente.post('/api/v1/ventas/lote', json={'ventas': []}).status_code == 400
+    assert _stock(app, producto) == 24
+
+
+def test_lote_demasiado_grande(app, cliente, producto):
+    app.config['API_MAX_VENTAS_LOTE'] = 2
+    respuesta = _lote(cliente, *(_venta(str(i), producto, 1) for i in range(3)))
+    assert respuesta.status_code == 413
+    assert _stock(app, producto) == 25
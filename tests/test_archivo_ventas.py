@@ -0,0 +1,89 @@
+import os
+from datetime import datetime
+
+import pytest
+
+from app import archivo_ventas, db, exportacion, servicio_ventas
+from app.models import MesArchivado, Venta
+
+ENERO = (datetime(2025, 1, 1), datetime(2025, 2, 1))
+TODO = (datetime(2025, 1, 1), datetime(2025, 4, 1))
+
+
+def _vender(admin, producto, fecha, cantidad=1):
+    venta = servicio_ventas.registrar_venta(admin, {producto: cantidad}, fecha=fecha)
+    db.session.commit()
+    return venta.id
+
+
+def _archivar(mes):
+    archivado, anterior = archivo_ventas.archivar_mes(mes)
+    db.session.commit()
+    archivo_ventas.descartar(anterior)
+    return archivado
+
+
+@pytest.fixture
+def ventas(contexto, admin, producto):
+    """Ids de tres ventas de enero de 2025 y una de febrero."""
+    return [
+        _vender(admin, producto, datetime(2025, 1, 5, 10, 0)),
+        _vender(admin, producto, datetime(2025, 1, 5, 10, 0), cantidad=2),
+        _vender(admin, producto, datetime(2025, 1, 31, 23, 59, 59)),
+        _vender(admin, producto, datetime(2025, 2, 1)),
+    ]
+
+
+def test_archivar_y_leer_el_mes(ventas):
+    antes = list(archivo_ventas._lineas_en_tablas(*ENERO))
+
+    archivado = _archivar('2025-01')
+    assert (archivado.ventas, archivado.lineas, archivado.unidades) == (3, 3, 4)
+    assert Venta.query.filter(Venta.id.in_(ventas[:3])).count() == 0
+    assert list(archivo_ventas.lineas_en_rango(*ENERO)) == antes
+    assert archivo_ventas.verificar() == []
+    assert archivo_ventas.meses_pendientes(1, hoy=datetime(2025, 3, 15)) == ['2025-02']
+
+
+def test_consultas_combinan_archivo_y_tablas(ventas):
+    _archivar('2025-01')
+
+    encontradas = archivo_ventas.ventas_en_rango(*TODO)
+    assert [v.id for v in encontradas] == ventas
+    assert [getattr(v, 'archivada', False) for v in encontradas] == [True, True, True, False]
+    assert [f[0] for f in exportacion.filas_ventas(*TODO)] == ventas
+
+    # Un rango que corta el mes archivado
+    assert [v.id for v in archivo_ventas.ventas_en_rango(datetime(2025, 1, 6), datetime(2025, 2, 2))] == ventas[2:]
+
+
+def test_una_venta_tardia_se_agrega_al_archivo(ventas, admin, producto):
+    primero = _archivar('2025-01').archivo
+    tardia = _vender(admin, producto, datetime(2025, 1, 20))
+    assert archivo_ventas.meses_pendientes(1, hoy=datetime(2025, 3, 15)) == ['2025-01', '2025-02']
+
+    archivado = _archivar('2025-01')
+    assert archivado.archivo != primero
+    assert not os.path.exists(os.path.join(archivo_ventas._directorio(), primero))
+    assert archivado.ventas == 4
+    assert [v.id for v in archivo_ventas.ventas_en_rango(*ENERO)] == [*ventas[:2], tardia, ventas[2]]
+    assert archivo_ventas.verificar() == []
+
+
+def test_verificar_detecta_archivos_alterados(ventas):
+    archivado = _archivar('2025-01')
+    ruta = os.path.join(archivo_ventas._directorio(), archivado.archivo)
+
+    with open(ruta, 'ab') as archivo:
+        archivo.write(b'\0')
+    assert archivo_ventas.verificar() == [f'2025-01: el SHA-256 de {archivado.archivo} no coincide']
+
+    os.remove(ruta)
+    assert archivo_ventas.verificar() == [f'2025-01: falta el archivo {archivado.archivo}']
+
+
+def test_verificar_detecta_totales_que_no_cuadran(ventas):
+    _archivar('2025-01')
+    db.session.get(MesArchivado, '2025-01').ventas = 2
+    db.session.commit()
+    assert archivo_ventas.verificar() == ['2025-01: el contenido no coincide con los totales guardados']
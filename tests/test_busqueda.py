@@ -0,0 +1,26 @@
+from sqlalchemy import inspect, text
+
+from app import busqueda, db, esquema
+
+
+def test_actualizar_esquema_crea_el_indice(contexto, producto):
+    assert not inspect(db.engine).has_table('productos_fts')
+
+    cambios = esquema.actualizar()
+    assert 'índice de búsqueda productos_fts (1 productos)' in cambios
+    assert busqueda._indice_nativo()
+    assert [p.id for p in busqueda.buscar('martillo')] == [producto]
+
+    assert esquema.actualizar() == []
+
+
+def test_ve_el_indice_creado_por_otro_proceso(contexto, producto, monkeypatch):
+    assert not busqueda._indice_nativo()
+
+    # `flask reindexar-productos` desde otra consola
+    with db.engine.begin() as conexion:
+        conexion.execute(text(busqueda._SQL_CREAR['sqlite'][0]))
+    assert not busqueda._indice_nativo()
+
+    monkeypatch.setattr(busqueda, 'TTL_INDICE', 0)
+    assert busqueda._indice_nativo()
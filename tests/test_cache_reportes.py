@@ -0,0 +1,76 @@
+import pytest
+from werkzeug.security import generate_password_hash
+
+from app import create_app, db
+from app.models import Usuario, Venta
+
+URL = '/reportes/ventas_por_usuario'
+
+
+def _crear(tmp_path, **config):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'inventario.db'}",
+        'JINJA_CACHE': False,
+        'METRICAS': False,
+        **config,
+    })
+    with app.app_context():
+        db.create_all()
+        db.session.add(Usuario(nombre='Admin', username='admin', rol='admin',
+                               password=generate_password_hash('clave')))
+        db.session.commit()
+    return app
+
+
+def _cliente(app):
+    # Sin un contexto de app abierto alrededor: cada petición tiene su propio `g`
+    cliente = app.test_client()
+    cliente.post('/login', data={'username': 'admin', 'password': 'clave'})
+    return cliente
+
+
+@pytest.fixture
+def app(tmp_path):
+    """Aplicación con el sello de reportes compartido en archivo."""
+    return _crear(tmp_path, CATALOGO_BACKEND='archivo', CATALOGO_DIR=str(tmp_path / 'catalogo'))
+
+
+def _vender(app, savepoint_deshecho=False):
+    with app.app_context():
+        db.session.add(Venta(usuario_id=1, total=5))
+        db.session.flush()
+        if savepoint_deshecho:
+            with db.session.begin_nested() as savepoint:
+                savepoint.rollback()
+        db.session.commit()
+
+
+def test_revalida_hasta_que_cambian_las_ventas(app):
+    cliente = _cliente(app)
+    primera = cliente.get(URL)
+    assert primera.status_code == 200 and primera.headers['ETag']
+
+    cache = {'If-None-Match': primera.headers['ETag']}
+    assert cliente.get(URL, headers=cache).status_code == 304
+
+    _vender(app)
+    assert cliente.get(URL, headers=cache).status_code == 200
+
+
+def test_un_savepoint_deshecho_no_pierde_el_cambio(app):
+    cliente = _cliente(app)
+    cache = {'If-None-Match': cliente.get(URL).headers['ETag']}
+
+    _vender(app, savepoint_deshecho=True)
+    assert cliente.get(URL, headers=cache).status_code == 200
+
+
+def test_sin_sello_compartido_no_hay_etag(tmp_path):
+    # El sello en memoria no ve los commits de otros workers ni sobrevive a
+    # un reinicio: la página nunca responde 304
+    cliente = _cliente(_crear(tmp_path))
+    respuesta = cliente.get(URL)
+    assert respuesta.status_code == 200
+    assert 'ETag' not in respuesta.headers
+    assert cliente.get(URL, headers={'If-None-Match': '*'}).status_code == 200
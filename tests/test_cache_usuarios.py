@@ -0,0 +1,73 @@
+import pytest
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.models import Usuario
+from test_consultas import contar_sentencias
+
+
+@pytest.fixture
+def vendedor(app):
+    """Id de un vendedor con clave 'clave'."""
+    with app.app_context():
+        usuario = Usuario(nombre='Vendedor', username='vendedor', rol='vendedor',
+                          password=generate_password_hash('clave'))
+        db.session.add(usuario)
+        db.session.commit()
+        return usuario.id
+
+
+@pytest.fixture
+def cliente_vendedor(app, vendedor):
+    cliente = app.test_client()
+    respuesta = cliente.post('/login', data={'username': 'vendedor', 'password': 'clave'})
+    assert respuesta.status_code == 302
+    # Deja la instantánea en la caché
+    assert cliente.get('/dashboard').status_code == 200
+    return cliente
+
+
+def _motor(app):
+    with app.app_context():
+        return db.engine
+
+
+def test_los_roles_se_comprueban_sin_consultar_la_base(app, cliente_vendedor):
+    with contar_sentencias(_motor(app)) as sentencias:
+        assert cliente_vendedor.get('/dashboard').status_code == 200
+        respuesta = cliente_vendedor.get('/usuarios')
+
+    assert respuesta.status_code == 302
+    assert respuesta.headers['Location'].endswith('/dashboard')
+    assert sentencias == []
+
+
+def test_desactivar_vale_desde_la_peticion_siguiente(app, cliente, vendedor, cliente_vendedor):
+    assert cliente.post(f'/usuarios/toggle/{vendedor}').status_code == 302
+
+    respuesta = cliente_vendedor.get('/dashboard')
+    assert respuesta.status_code == 302
+    assert '/login' in respuesta.headers['Location']
+
+
+def test_cambiar_el_rol_vale_desde_la_peticion_siguiente(app, vendedor, cliente_vendedor):
+    assert cliente_vendedor.get('/usuarios').status_code == 302
+
+    with app.app_context():
+        db.session.get(Usuario, vendedor).rol = 'admin'
+        db.session.commit()
+
+    assert cliente_vendedor.get('/usuarios').status_code == 200
+
+
+def test_un_cambio_deshecho_no_toca_la_cache(app, vendedor, cliente_vendedor):
+    with app.app_context():
+        db.session.get(Usuario, vendedor).rol = 'admin'
+        db.session.flush()
+        db.session.rollback()
+        db.session.get(Usuario, vendedor).telefono = '555'
+        db.session.commit()
+
+    with contar_sentencias(_motor(app)) as sentencias:
+        assert cliente_vendedor.get('/usuarios').status_code == 302
+    assert sentencias == []
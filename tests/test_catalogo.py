@@ -0,0 +1,52 @@
+from app import catalogo, create_app, db, servicio_ventas
+from app.models import Producto
+from test_consultas import contar_sentencias
+
+
+def test_vender_no_invalida_el_catalogo(contexto, admin, producto):
+    catalogo.productos()
+    servicio_ventas.registrar_venta(admin, {producto: 5})
+    db.session.commit()
+    db.session.get(Producto, producto).stock = 18
+    db.session.commit()
+
+    assert [p.stock for p in catalogo.productos()] == [18]
+    assert catalogo.estadisticas()['productos'] == {'aciertos': 1, 'fallos': 1}
+
+
+def test_editar_invalida_el_catalogo(contexto, producto):
+    catalogo.productos()
+    db.session.get(Producto, producto).precio = 12
+    db.session.commit()
+
+    assert [p.precio for p in catalogo.productos()] == [12]
+    assert catalogo.estadisticas()['productos'] == {'aciertos': 0, 'fallos': 2}
+
+
+def test_varios_workers_usan_el_backend_en_archivo(app, monkeypatch, tmp_path):
+    monkeypatch.setenv('WEB_CONCURRENCY', '4')
+    otra = create_app({'SQLALCHEMY_DATABASE_URI': app.config['SQLALCHEMY_DATABASE_URI'],
+                       'CATALOGO_DIR': str(tmp_path / 'catalogo'),
+                       'USUARIOS_DIR': str(tmp_path / 'usuarios'), 'JINJA_CACHE': False,
+                       'METRICAS': False})
+    assert isinstance(otra.extensions['catalogo'].backend, catalogo.ArchivoBackend)
+
+
+def test_leer_el_catalogo_consulta_solo_el_stock_de_los_ids(contexto, producto, monkeypatch):
+    categoria_id = db.session.get(Producto, producto).categoria_id
+    db.session.add_all([Producto(nombre=f'Clavo {i}', precio=1, stock=i, stock_minimo=0,
+                                 categoria_id=categoria_id) for i in range(11)])
+    db.session.commit()
+    monkeypatch.setattr(catalogo, 'IDS_POR_CONSULTA', 5)
+    catalogo.productos()
+
+    with contar_sentencias(db.engine) as sentencias:
+        todos = catalogo.productos()
+        assert len(sentencias) == 3
+        assert [p.stock for p in catalogo.productos(ids=[producto])] == [25]
+        assert len(sentencias) == 4
+        assert {p.stock for p in catalogo.productos(con_stock=False)} == {None}
+        assert len(sentencias) == 4
+
+    assert [p.stock for p in todos] == [25, *range(11)]
+    assert all(' IN ' in sql for sql in sentencias)
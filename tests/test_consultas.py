@@ -0,0 +1,63 @@
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from app import db, servicio_ventas
+from app.consultas import venta_completa
+from app.models import Producto
+
+# Presupuesto fijo de sentencias: no debe crecer con las líneas de la venta
+SENTENCIAS_CARGA = 2
+SENTENCIAS_RUTA = 3
+
+
+@contextmanager
+def contar_sentencias(motor):
+    """Junta el SQL que se ejecuta en `motor` dentro del bloque."""
+    sentencias = []
+
+    def registrar(conexion, cursor, sql, parametros, contexto, varios):
+        sentencias.append(sql)
+
+    event.listen(motor, 'before_cursor_execute', registrar)
+    try:
+        yield sentencias
+    finally:
+        event.remove(motor, 'before_cursor_execute', registrar)
+
+
+@pytest.fixture
+def venta_id(app, admin, producto):
+    """Id de una venta de cinco líneas."""
+    with app.app_context():
+        categoria_id = db.session.get(Producto, producto).categoria_id
+        otros = [Producto(nombre=f'Tornillo {i}', precio=1, stock=100, stock_minimo=0,
+                          categoria_id=categoria_id) for i in range(4)]
+        db.session.add_all(otros)
+        db.session.flush()
+        cantidades = {id_: 2 for id_ in [producto, *(p.id for p in otros)]}
+        venta = servicio_ventas.registrar_venta(admin, cantidades)
+        db.session.commit()
+        return venta.id
+
+
+def test_venta_completa_en_dos_sentencias(contexto, venta_id):
+    with contar_sentencias(db.engine) as sentencias:
+        venta = venta_completa(venta_id).one()
+        nombres = [(d.producto.nombre, d.cantidad) for d in venta.detalles]
+        vendedor = venta.vendedor.nombre
+    assert len(nombres) == 5 and vendedor == 'Admin'
+    assert len(sentencias) <= SENTENCIAS_CARGA, sentencias
+
+
+@pytest.mark.parametrize('url', ['/ventas/{}', '/ventas/{}/pdf'])
+def test_rutas_de_la_venta_dentro_del_presupuesto(app, cliente, venta_id, url):
+    url = url.format(venta_id)
+    cliente.get('/dashboard')  # carga y cachea el usuario de la sesión
+    with app.app_context():
+        motor = db.engine
+    with contar_sentencias(motor) as sentencias:
+        respuesta = cliente.get(url)
+    assert respuesta.status_code == 200, respuesta.status_code
+    assert len(sentencias) <= SENTENCIAS_RUTA, sentencias
@@ -0,0 +1,71 @@
+import csv
+import io
+import sys
+from datetime import datetime
+
+import pytest
+
+from app import archivo_ventas, db, exportacion, servicio_ventas
+
+URL = '/reportes/ventas_fecha/exportar?inicio=2025-01-01&fin=2025-02-28'
+
+
+@pytest.fixture
+def ventas(app, admin, producto):
+    """Ids de dos ventas de enero de 2025, ya archivado, y dos de febrero."""
+    with app.app_context():
+        ids = []
+        for fecha, cantidad in [(datetime(2025, 1, 5, 10, 0), 1), (datetime(2025, 1, 31, 23, 59, 59), 2),
+                                (datetime(2025, 2, 1), 3), (datetime(2025, 2, 28, 18, 30), 1)]:
+            ids.append(servicio_ventas.registrar_venta(admin, {producto: cantidad}, fecha=fecha).id)
+            db.session.commit()
+        _, anterior = archivo_ventas.archivar_mes('2025-01')
+        db.session.commit()
+        archivo_ventas.descartar(anterior)
+        return ids
+
+
+def test_csv_en_trozos_con_meses_archivados(cliente, ventas, monkeypatch):
+    monkeypatch.setattr(exportacion, 'FILAS_POR_LOTE', 1)
+
+    respuesta = cliente.get(URL)
+    assert respuesta.status_code == 200
+    assert respuesta.is_streamed
+    assert respuesta.mimetype == 'text/csv'
+    assert 'ventas_2025-01-01_2025-02-28.csv' in respuesta.headers['Content-Disposition']
+
+    trozos = list(respuesta.response)
+    # Un trozo por fila (el encabezado va con la primera) y el resto vacío
+    assert len(trozos) == 5
+    filas = list(csv.reader(io.StringIO(b''.join(trozos).decode())))
+    assert filas[0] == exportacion.COLUMNAS
+    assert [(int(f[0]), f[1], f[6], f[7], f[8]) for f in filas[1:]] == [
+        (ventas[0], '2025-01-05 10:00:00', '1', '10.00', '10.00'),
+        (ventas[1], '2025-01-31 23:59:59', '2', '10.00', '20.00'),
+        (ventas[2], '2025-02-01 00:00:00', '3', '10.00', '30.00'),
+        (ventas[3], '2025-02-28 18:30:00', '1', '10.00', '10.00'),
+    ]
+    assert {f[2] for f in filas[1:]} == {'Admin'}
+
+
+def test_xlsx_con_meses_archivados(cliente, ventas):
+    openpyxl = pytest.importorskip('openpyxl')
+
+    respuesta = cliente.get(URL + '&formato=xlsx')
+    assert respuesta.status_code == 200
+    assert respuesta.mimetype.endswith('spreadsheetml.sheet')
+
+    hoja = openpyxl.load_workbook(io.BytesIO(respuesta.data)).active
+    filas = list(hoja.iter_rows(values_only=True))
+    assert list(filas[0]) == exportacion.COLUMNAS
+    assert [(f[0], f[6], f[8]) for f in filas[1:]] == [
+        (ventas[0], 1, 10.0), (ventas[1], 2, 20.0), (ventas[2], 3, 30.0), (ventas[3], 1, 10.0),
+    ]
+
+
+def test_xlsx_sin_openpyxl(cliente, ventas, monkeypatch):
+    monkeypatch.setitem(sys.modules, 'openpyxl', None)
+
+    respuesta = cliente.get(URL + '&formato=xlsx')
+    assert respuesta.status_code == 302
+    assert respuesta.headers['Location'].endswith('/reportes/ventas_fecha')
@@ -0,0 +1,106 @@
+import io
+import json
+from decimal import Decimal
+
+import pytest
+
+from app import db, importacion, movimientos
+from app.models import Categoria, EventoStock, MovimientoStock, Producto
+
+CSV = """id,nombre,categoria,precio,stock,stock_minimo
+{id},Martillo,Herramientas,12.50,,
+,MARTÍLLO,herramientas,13,3,
+,Tornillo,Fijaciones,0.10,500,50
+,Arandela,fijaciones,0.05,,
+,Sin precio,Fijaciones,abc,1,1
+,,Fijaciones,1,1,1
+999,Fantasma,Fijaciones,1,1,1
+,Tuerca,Fijaciones,0.20,-4,
+"""
+
+
+def _catalogo():
+    return [
+        (f['nombre'], f['categoria'], f['precio'], f['stock'], f['stock_minimo'])
+        for f in importacion.filas_catalogo()
+    ]
+
+
+@pytest.mark.parametrize('formato', ['csv', 'json', 'jsonl'])
+def test_exportar_e_importar_restaura_el_catalogo(contexto, producto, formato):
+    categoria_id = db.session.get(Producto, producto).categoria_id
+    db.session.add_all([
+        Producto(nombre='Llave "inglesa", 12', precio=35, stock=4, stock_minimo=1, categoria_id=categoria_id),
+        Categoria(nombre='Pinturas'),
+    ])
+    db.session.flush()
+    db.session.add(Producto(nombre='Látex', precio=Decimal('1200.99'), stock=0, stock_minimo=3,
+                            categoria_id=Categoria.query.filter_by(nombre='Pinturas').one().id))
+    db.session.commit()
+    salida = io.StringIO()
+    assert importacion.exportar(salida, formato) == 3
+    esperado = _catalogo()
+
+    db.session.get(Producto, producto).precio = 99
+    Producto.query.filter_by(nombre='Látex').one().stock = 40
+    db.session.commit()
+
+    resultado = importacion.importar(io.StringIO(salida.getvalue()), formato, lote=2)
+    assert (resultado.actualizados, resultado.sin_cambios, resultado.creados) == (2, 1, 0)
+    assert resultado.errores == []
+    assert _catalogo() == esperado
+
+
+def test_importar_actualiza_crea_e_informa_errores(contexto, producto):
+    movimientos.iniciar()
+    db.session.commit()
+
+    resultado = importacion.importar(io.StringIO(CSV.format(id=producto)), 'csv', lote=2)
+
+    assert resultado.leidas == 8
+    assert (resultado.creados, resultado.actualizados, resultado.categorias_creadas) == (2, 1, 1)
+    # Los ids inexistentes se detectan al aplicar el lote, después de validar
+    assert sorted(resultado.errores) == [
+        'Fila 5: precio debe ser un número',
+        'Fila 6: nombre y categoria son obligatorios',
+        'Fila 7: no existe el producto 999',
+        'Fila 8: stock no puede ser negativo',
+    ]
+    # La fila 2 encontró al martillo por nombre, sin acentos ni mayúsculas
+    assert _catalogo() == [
+        ('MARTÍLLO', 'Herramientas', 13, 3, 2),
+        ('Tornillo', 'Fijaciones', Decimal('0.10'), 500, 50),
+        ('Arandela', 'Fijaciones', Decimal('0.05'), 0, 0),
+    ]
+
+    ajuste, = MovimientoStock.query.filter_by(tipo='ajuste').all()
+    assert (ajuste.producto_id, ajuste.cantidad) == (producto, -22)
+    # Saldo inicial del martillo y del tornillo; la arandela entra sin stock
+    assert MovimientoStock.query.filter_by(tipo='inicial').count() == 2
+    assert movimientos.inconsistencias() == []
+    assert [(e.tipo, e.producto_id, e.stock) for e in EventoStock.query] == [('stock_bajo', producto, 3)]
+
+    # Volver a importar el mismo archivo no duplica productos ni categorías
+    otra_vez = importacion.importar(io.StringIO(CSV.format(id=producto)), 'csv')
+    assert (otra_vez.creados, otra_vez.categorias_creadas) == (0, 0)
+    assert len(_catalogo()) == 3
+
+
+def test_falta_una_columna_obligatoria(contexto):
+    with pytest.raises(importacion.ImportacionError):
+        importacion.importar(io.StringIO('nombre,precio\nMartillo,1\n'), 'csv')
+
+
+@pytest.mark.parametrize('trozo', [1, 7, 64 * 1024])
+def test_leer_json_entre_trozos(monkeypatch, trozo):
+    monkeypatch.setattr(importacion, 'TROZO', trozo)
+    objetos = [{'nombre': f'Producto {i} [ñ], {{x}}', 'precio': i / 3} for i in range(20)]
+
+    arreglo = json.dumps(objetos, indent=1, ensure_ascii=False)
+    lineas = ''.join(json.dumps(o) + '\n' for o in objetos)
+    envuelto = json.dumps({'productos': objetos})
+    for texto in (arreglo, lineas, envuelto):
+        assert list(importacion.leer_json(io.StringIO(texto))) == objetos
+
+    with pytest.raises(importacion.ImportacionError):
+        list(importacion.leer_json(io.StringIO(arreglo[:-5])))
@@ -0,0 +1,31 @@
+import itertools
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app import db, metricas
+
+
+@pytest.fixture
+def medicion(app):
+    """Petición medida abierta, sin pasar por el cliente de pruebas."""
+    with app.test_request_context('/'):
+        metricas._inicio_peticion()
+        yield metricas._medicion()
+        db.session.remove()
+
+
+def test_una_consulta_que_falla_no_deja_su_inicio_pendiente(medicion, monkeypatch):
+    reloj = itertools.count(10)
+    monkeypatch.setattr(metricas.time, 'perf_counter', lambda: next(reloj))
+    conexion = db.session.connection()
+
+    for _ in range(3):
+        with pytest.raises(OperationalError):
+            conexion.execute(text('SELECT * FROM no_existe'))
+    conexion.execute(text('SELECT 1'))
+
+    assert medicion['consultas'] == 1
+    assert medicion['tiempo_db'] == 1
+    assert not any(isinstance(v, list) for v in conexion.info.values())
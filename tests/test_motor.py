@@ -0,0 +1,47 @@
+from sqlalchemy import text
+
+from app import create_app, db, motor
+
+
+def _pragma(nombre):
+    return db.session.execute(text(f'PRAGMA {nombre}')).scalar()
+
+
+def test_opciones_del_pool_segun_el_dialecto():
+    assert motor.opciones('sqlite:///inventario.db', {}) == {}
+    assert motor.opciones('mysql+pymysql://u:p@localhost/inventario', {'DB_POOL_SIZE': 3}) == {
+        'pool_size': 3,
+        'max_overflow': 20,
+        'pool_timeout': 30,
+        'pool_recycle': 280,
+        'pool_pre_ping': True,
+    }
+
+
+def test_pragmas_por_defecto_en_cada_conexion(contexto):
+    assert _pragma('journal_mode') == 'wal'
+    assert _pragma('synchronous') == 1
+    assert _pragma('busy_timeout') == 5000
+    assert _pragma('mmap_size') == 256 * 1024 * 1024
+
+    # También en las conexiones que abre el pool después de la primera
+    db.engine.dispose()
+    with db.engine.connect() as conexion:
+        assert conexion.execute(text('PRAGMA busy_timeout')).scalar() == 5000
+
+
+def test_pragmas_configurables(tmp_path):
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'otra.db'}",
+        'SQLITE_JOURNAL_MODE': None,
+        'SQLITE_SYNCHRONOUS': 'FULL',
+        'SQLITE_MMAP_MB': None,
+        'SQLITE_BUSY_TIMEOUT_MS': 250,
+        'JINJA_CACHE': False,
+        'METRICAS': False,
+    })
+    with app.app_context():
+        assert _pragma('journal_mode') == 'delete'
+        assert _pragma('synchronous') == 2
+        assert _pragma('busy_timeout') == 250
+        assert _pragma('mmap_size') == 0
@@ -0,0 +1,78 @@
+from datetime import datetime
+
+from sqlalchemy import text
+
+from app import db, esquema
+from app.models import Venta
+from app.paginacion import paginar_ventas
+
+
+def _recorrer(por_pagina, max_paginas=50):
+    """Ids de todas las páginas hacia atrás y luego de vuelta hacia adelante."""
+    hacia_atras, cursor = [], None
+    while True:
+        assert len(hacia_atras) < max_paginas, 'el cursor no avanza'
+        pagina = paginar_ventas(Venta.query, despues=cursor, por_pagina=por_pagina)
+        hacia_atras.append([v.id for v in pagina.items])
+        if not pagina.siguiente:
+            break
+        cursor = pagina.siguiente
+    hacia_adelante, cursor = [], pagina.anterior
+    while cursor:
+        assert len(hacia_adelante) < max_paginas, 'el cursor no retrocede'
+        pagina = paginar_ventas(Venta.query, antes=cursor, por_pagina=por_pagina)
+        hacia_adelante.append([v.id for v in pagina.items])
+        cursor = pagina.anterior
+    return hacia_atras, hacia_adelante
+
+
+def _ids_esperados():
+    return [v.id for v in Venta.query.order_by(Venta.fecha.desc(), Venta.id.desc())]
+
+
+def test_ventas_en_el_mismo_segundo(contexto, admin):
+    # Sin fecha explícita, la base usa CURRENT_TIMESTAMP: todas caen en el mismo segundo
+    momento = datetime(2025, 3, 1, 10, 0, 0)
+    for i in range(30):
+        db.session.add(Venta(usuario_id=admin, total=1, fecha=momento))
+    for i in range(17):
+        db.session.add(Venta(usuario_id=admin, total=1))
+    db.session.commit()
+
+    hacia_atras, hacia_adelante = _recorrer(por_pagina=7)
+    vistos = [id_ for pagina in hacia_atras for id_ in pagina]
+    assert vistos == _ids_esperados()
+    assert len(vistos) == len(set(vistos)) == 47
+    # Volviendo desde la última página se recorren las mismas páginas al revés
+    assert hacia_adelante == hacia_atras[-2::-1]
+
+
+def test_ventas_con_fechas_distintas(contexto, admin):
+    # Escritas por la base, en el formato de CURRENT_TIMESTAMP
+    for i in range(25):
+        db.session.execute(text(
+            "INSERT INTO ventas (usuario_id, total, fecha) "
+            "VALUES (:u, 1, datetime('2025-01-01', :minutos || ' minutes'))"
+        ), {'u': admin, 'minutos': i})
+    db.session.commit()
+
+    hacia_atras, _ = _recorrer(por_pagina=10)
+    vistos = [id_ for pagina in hacia_atras for id_ in pagina]
+    assert [len(p) for p in hacia_atras] == [10, 10, 5]
+    assert vistos == _ids_esperados()
+
+
+def test_actualizar_esquema_normaliza_fechas(contexto, admin):
+    # Filas escritas antes de FechaHora, con microsegundos
+    for i in range(3):
+        db.session.execute(text(
+            "INSERT INTO ventas (usuario_id, total, fecha) VALUES (:u, 1, '2025-02-01 08:00:00.000000')"
+        ), {'u': admin})
+    db.session.commit()
+
+    assert '3 fechas normalizadas en ventas.fecha' in esquema.actualizar()
+    assert db.session.execute(text('SELECT DISTINCT fecha FROM ventas')).scalars().all() == [
+        '2025-02-01 08:00:00'
+    ]
+    hacia_atras, _ = _recorrer(por_pagina=2)
+    assert [id_ for pagina in hacia_atras for id_ in pagina] == _ids_esperados()
@@ -0,0 +1,47 @@
+import json
+import os
+import time
+
+from app import pdf
+
+
+def test_otro_worker_ve_el_estado_del_trabajo(app):
+    with app.test_request_context():
+        clave_pdf = pdf.clave('factura', {'venta': 1})
+        pdf._marcar(app, clave_pdf, 'pendiente', 'factura_1.pdf')
+
+        # Otro proceso no tiene el trabajo en `_trabajos`
+        pdf._trabajos.pop(clave_pdf, None)
+        assert pdf.estado(clave_pdf) == 'pendiente'
+        assert pdf.nombre_descarga(clave_pdf) == 'factura_1.pdf'
+
+        pdf._marcar(app, clave_pdf, 'error', 'factura_1.pdf')
+        assert pdf.estado(clave_pdf) == 'error'
+
+        assert pdf.estado(pdf.clave('factura', {'venta': 2})) is None
+
+
+def test_un_pendiente_abandonado_cuenta_como_error(app):
+    app.config['PDF_PENDIENTE_MAX_SEGUNDOS'] = 60
+    with app.test_request_context():
+        clave_pdf = pdf.clave('factura', {'venta': 1})
+        # El worker que lo generaba se reinició hace dos minutos
+        with open(pdf._ruta_marca(app, clave_pdf), 'w') as archivo:
+            json.dump({'estado': 'pendiente', 'nombre': 'factura_1.pdf',
+                       'momento': time.time() - 120}, archivo)
+        assert pdf.estado(clave_pdf) == 'error'
+
+
+def test_depurar_borra_la_marca_con_el_documento(app):
+    app.config['PDF_CACHE_MAX_DIAS'] = 1
+    with app.test_request_context():
+        clave_pdf = pdf.clave('factura', {'venta': 1})
+        pdf._marcar(app, clave_pdf, 'listo', 'factura_1.pdf')
+        with open(pdf.ruta_cache(clave_pdf), 'wb') as archivo:
+            archivo.write(b'%PDF')
+        viejo = time.time() - 2 * 86400
+        os.utime(pdf.ruta_cache(clave_pdf), (viejo, viejo))
+
+        pdf.depurar_cache(app)
+        assert not os.path.exists(pdf.ruta_cache(clave_pdf))
+        assert not os.path.exists(pdf._ruta_marca(app, clave_pdf))
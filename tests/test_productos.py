@@ -0,0 +1,38 @@
+import sqlite3
+import threading
+import time
+
+from app import db, movimientos
+from app.models import MovimientoStock
+
+
+def test_editar_parte_del_stock_que_dejo_otra_transaccion(app, cliente, producto):
+    with app.app_context():
+        movimientos.iniciar()
+        db.session.commit()
+        ruta = db.engine.url.database
+
+    # Otra venta tiene tomado el bloqueo de escritura cuando llega la edición
+    otra = sqlite3.connect(ruta, isolation_level=None)
+    otra.execute('BEGIN IMMEDIATE')
+    otra.execute('UPDATE productos SET stock = 20 WHERE id = ?', (producto,))
+    otra.execute("INSERT INTO movimientos_stock (fecha, producto_id, tipo, cantidad) "
+                 "VALUES (CURRENT_TIMESTAMP, ?, 'venta', -5)", (producto,))
+
+    respuestas = []
+    edicion = threading.Thread(target=lambda: respuestas.append(cliente.post(
+        f'/productos/editar/{producto}',
+        data={'nombre': 'Martillo', 'precio': '10', 'stock': '30', 'stock_minimo': '2',
+              'categoria_id': '1'}
+    )))
+    edicion.start()
+    time.sleep(0.5)
+    otra.execute('COMMIT')
+    otra.close()
+    edicion.join()
+
+    assert respuestas[0].status_code == 302
+    with app.app_context():
+        ajuste = db.session.query(MovimientoStock.cantidad).filter_by(tipo='ajuste').scalar()
+        assert ajuste == 10
+        assert movimientos.inconsistencias() == []
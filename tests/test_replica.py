@@ -0,0 +1,81 @@
+import pytest
+from flask import g
+from sqlalchemy import insert, select, text, update
+
+from app import create_app, db, replica
+from app.models import Categoria, Producto
+
+
+@pytest.fixture
+def app(tmp_path):
+    """Como la de conftest, con una réplica atrasada: el producto tiene 99 de stock."""
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'inventario.db'}",
+        'REPLICA_DATABASE_URI': f"sqlite:///{tmp_path / 'replica.db'}",
+        'PDF_CACHE_DIR': str(tmp_path / 'pdf'),
+        'ARCHIVO_VENTAS_DIR': str(tmp_path / 'archivo'),
+        'JINJA_CACHE': False,
+        'METRICAS': False,
+    })
+    with app.app_context():
+        db.create_all()
+        motor_replica = db.engines[replica.BIND]
+        db.metadata.create_all(motor_replica)
+        with motor_replica.begin() as conexion:
+            conexion.execute(insert(Categoria), [{'id': 1, 'nombre': 'Herramientas'}])
+            conexion.execute(insert(Producto), [{'id': 1, 'nombre': 'Martillo', 'precio': 10,
+                                                 'stock': 99, 'stock_minimo': 2, 'categoria_id': 1}])
+    yield app
+    with app.app_context():
+        db.drop_all()
+    # init_app registró una metadata para el bind en la extensión compartida;
+    # sin quitarla, create_all() de las demás apps buscaría un motor 'replica'
+    db.metadatas.pop(replica.BIND, None)
+
+
+def _stock(cliente):
+    return cliente.get('/productos/datos').get_json()['filas'][0][4]
+
+
+def test_lecturas_a_la_replica_y_escrituras_a_la_primaria(app, producto):
+    with app.test_request_context('/'):
+        g.usar_replica = True
+        assert db.session.scalar(select(Producto.stock)) == 99
+        assert db.session.execute(text('SELECT stock FROM productos')).scalar() == 99
+        assert db.session.scalar(select(Producto.stock).with_for_update()) == 25
+
+        db.session.execute(update(Producto).values(stock=24))
+        # Con una escritura pendiente todo va a la primaria
+        assert db.session.scalar(select(Producto.stock)) == 24
+        db.session.commit()
+        # Y sigue yendo después del commit, hasta el final de la petición
+        assert db.session.scalar(select(Producto.stock)) == 24
+
+    with app.app_context():
+        assert db.session.scalar(select(Producto.stock)) == 24
+        with db.engines[replica.BIND].connect() as conexion:
+            assert conexion.execute(text('SELECT stock FROM productos')).scalar() == 99
+
+
+def test_sin_marca_la_ruta_lee_de_la_primaria(app, producto):
+    with app.test_request_context('/'):
+        assert db.session.scalar(select(Producto.stock)) == 25
+
+
+def test_el_usuario_que_escribio_lee_de_la_primaria(app, cliente, producto, monkeypatch):
+    assert _stock(cliente) == 99
+
+    respuesta = cliente.post(f'/productos/editar/{producto}', data={
+        'nombre': 'Martillo', 'categoria_id': '1', 'precio': '10', 'stock': '30', 'stock_minimo': '2',
+    })
+    assert respuesta.status_code == 302
+    assert _stock(cliente) == 30
+    # Otro usuario no queda pegado a la primaria
+    otro = app.test_client()
+    otro.post('/login', data={'username': 'admin', 'password': 'clave'})
+    assert _stock(otro) == 99
+
+    ahora = replica.time.time()
+    monkeypatch.setattr(replica.time, 'time', lambda: ahora + app.config.get('REPLICA_PEGAJOSA_SEGUNDOS', 5) + 1)
+    assert _stock(cliente) == 99
@@ -0,0 +1,86 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import func
+
+from app import db, movimientos, reportes, resumenes, servicio_ventas, sintetico
+from app.models import (
+    DetalleVenta, EventoStock, MovimientoStock, Producto, ResumenVentaProducto, ResumenVentaUsuario
+)
+
+FIN = datetime(2025, 6, 15, 12, 0, 0)
+SEMESTRE = (date(2025, 1, 1), date(2025, 7, 1))
+JUNIO = (date(2025, 6, 1), date(2025, 7, 1))
+
+
+def _reportes(base):
+    redondear = lambda filas: [(a, round(b, 2)) for a, b in filas]
+    return {
+        'por_mes': redondear(reportes.ventas_por_mes(base=base)),
+        'por_mes_semestre': redondear(reportes.ventas_por_mes(*SEMESTRE, base=base)),
+        'top_productos': reportes.top_productos(limite=1000, base=base),
+        'top_productos_junio': reportes.top_productos(*JUNIO, limite=1000, base=base),
+        'por_categoria': redondear(reportes.ventas_por_categoria(base=base)),
+        'por_categoria_junio': redondear(reportes.ventas_por_categoria(*JUNIO, base=base)),
+        'por_usuario': [(r.nombre, int(r.cantidad_ventas), round(float(r.total_ventas), 2))
+                        for r in reportes.ventas_por_usuario(base=base)],
+    }
+
+
+@pytest.fixture
+def sembrada(app, admin):
+    """Base con datos sintéticos y los resúmenes reconstruidos."""
+    with app.app_context():
+        sintetico.generar(usuarios=3, productos=30, ventas=400, compras=20, dias=200, fin=FIN)
+        db.session.commit()
+        resumenes.reconstruir()
+    return app
+
+
+def test_los_resumenes_coinciden_con_las_tablas(sembrada):
+    with sembrada.app_context():
+        rapidos = _reportes(base=False)
+        assert rapidos == _reportes(base=True)
+        assert all(rapidos.values())
+
+
+def test_una_venta_actualiza_los_resumenes(sembrada, admin):
+    with sembrada.app_context():
+        antes = db.session.query(func.sum(ResumenVentaUsuario.total)).scalar()
+        producto = Producto.query.filter(Producto.stock > 3).order_by(Producto.id).first()
+        venta = servicio_ventas.registrar_venta(admin, {producto.id: 3}, fecha=FIN)
+        db.session.commit()
+
+        assert db.session.query(func.sum(ResumenVentaUsuario.total)).scalar() == antes + venta.total
+        fila = db.session.get(ResumenVentaProducto, (FIN.date(), producto.id))
+        assert fila.cantidad >= 3
+        assert _reportes(base=False) == _reportes(base=True)
+
+
+def test_eliminar_un_producto_vendido(sembrada, cliente):
+    with sembrada.app_context():
+        producto_id, = (
+            db.session.query(DetalleVenta.producto_id)
+            .group_by(DetalleVenta.producto_id)
+            .order_by(func.count().desc(), DetalleVenta.producto_id)
+            .first()
+        )
+        producto = db.session.get(Producto, producto_id)
+        stock = producto.stock
+        db.session.add(EventoStock(tipo='stock_bajo', producto_id=producto_id, nombre=producto.nombre,
+                                   stock=stock, stock_minimo=producto.stock_minimo))
+        db.session.commit()
+
+    assert cliente.get(f'/productos/eliminar/{producto_id}').status_code == 302
+
+    with sembrada.app_context():
+        assert db.session.get(Producto, producto_id) is None
+        assert _reportes(base=False) == _reportes(base=True)
+        assert ResumenVentaProducto.query.filter_by(producto_id=producto_id).count() == 0
+        assert EventoStock.query.filter_by(producto_id=producto_id).count() == 0
+
+        # El libro conserva la historia y cierra el saldo en cero
+        saldo = db.session.query(func.sum(MovimientoStock.cantidad)).filter_by(producto_id=producto_id).scalar()
+        ultimo = MovimientoStock.query.filter_by(producto_id=producto_id).order_by(MovimientoStock.id.desc()).first()
+        assert (saldo, ultimo.tipo, ultimo.cantidad) == (0, 'ajuste', -stock)
+        assert movimientos.inconsistencias() == []
@@ -0,0 +1,86 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from app import db, movimientos, servicio_compras
+from app.models import Compra, EventoStock, MovimientoStock, Producto
+
+CSV = """﻿producto_id,cantidad,precio_unitario
+{id},5,3.50
+{id},0,3.50
+999,1,1
+{id},1,x
+{id},2,4
+"""
+
+
+@pytest.fixture
+def producto_bajo(contexto, producto):
+    """El producto de conftest con 3 unidades (debajo de su umbral) y su saldo inicial."""
+    db.session.get(Producto, producto).stock = 3
+    movimientos.iniciar()
+    db.session.commit()
+    return producto
+
+
+def test_compra_con_lineas_validas_e_invalidas(admin, producto_bajo):
+    lineas = servicio_compras.lineas_desde_csv(CSV.format(id=producto_bajo).encode())
+    resultados = servicio_compras.registrar_compras(admin, lineas)
+    db.session.commit()
+
+    assert [r['ok'] for r in resultados] == [True, False, False, False, True]
+    assert [r['error'] for r in resultados if not r['ok']] == [
+        'Cantidad debe ser mayor a cero.', 'Producto no encontrado.', 'Datos inválidos.'
+    ]
+
+    # Las dos líneas del mismo producto suman en un solo UPDATE
+    assert db.session.get(Producto, producto_bajo).stock == 10
+    assert [(c.cantidad, c.total) for c in Compra.query.order_by(Compra.id)] == [(5, 17.5), (2, 8)]
+    assert [m.cantidad for m in MovimientoStock.query.filter_by(tipo='compra')] == [5, 2]
+    assert movimientos.inconsistencias() == []
+    assert [(e.tipo, e.stock) for e in EventoStock.query] == [('stock_normal', 10)]
+
+
+def test_compra_sin_lineas_validas_no_escribe(admin, producto_bajo):
+    lineas = servicio_compras.lineas_desde_json({'lineas': [{'producto_id': 999, 'cantidad': 1,
+                                                             'precio_unitario': 1}]})
+    assert [r['ok'] for r in servicio_compras.registrar_compras(admin, lineas)] == [False]
+    db.session.commit()
+    assert Compra.query.count() == 0
+    assert db.session.get(Producto, producto_bajo).stock == 3
+
+
+def test_archivos_de_compra_invalidos():
+    with pytest.raises(servicio_compras.CompraError):
+        servicio_compras.lineas_desde_csv('producto_id,cantidad\n1,2\n')
+    for datos in ('{', '{"lineas": 5}', '[1, 2]'):
+        with pytest.raises(servicio_compras.CompraError):
+            servicio_compras.lineas_desde_json(datos)
+    assert servicio_compras.lineas_desde_json('[{"producto_id": 1}]') == [{'producto_id': 1}]
+
+
+def test_las_alertas_parten_del_stock_bloqueado(app, admin, producto_bajo):
+    # Otra venta tiene tomado el bloqueo de escritura y deja el stock en 1
+    otra = sqlite3.connect(db.engine.url.database, isolation_level=None)
+    otra.execute('BEGIN IMMEDIATE')
+    otra.execute('UPDATE productos SET stock = 1 WHERE id = ?', (producto_bajo,))
+
+    def comprar():
+        with app.app_context():
+            servicio_compras.registrar_compras(
+                admin, [{'producto_id': producto_bajo, 'cantidad': 2, 'precio_unitario': 1}])
+            db.session.commit()
+
+    compra = threading.Thread(target=comprar)
+    compra.start()
+    time.sleep(0.5)
+    otra.execute('COMMIT')
+    otra.close()
+    compra.join()
+
+    db.session.expire_all()
+    assert db.session.get(Producto, producto_bajo).stock == 3
+    # Con 3 unidades sigue bajo su umbral: no hay aviso de reposición
+    assert EventoStock.query.count() == 0
@@ -0,0 +1,50 @@
+import threading
+
+from app import db, movimientos, servicio_ventas
+from app.models import DetalleVenta, Producto, Venta
+
+HILOS = 40
+
+
+def test_ventas_concurrentes_no_dejan_stock_negativo(app, contexto, admin, producto):
+    """Más compradores que stock: se venden exactamente las unidades que había."""
+    movimientos.iniciar()
+    db.session.commit()
+    stock_inicial = db.session.get(Producto, producto).stock
+    assert HILOS > stock_inicial
+
+    barrera = threading.Barrier(HILOS)
+    resultados = []
+    candado = threading.Lock()
+
+    def vender():
+        # Cada hilo con su propio contexto, sesión y conexión a la base en archivo
+        with app.app_context():
+            barrera.wait()
+            try:
+                servicio_ventas.registrar_venta(admin, {producto: 1})
+                db.session.commit()
+                resultado = 'vendida'
+            except servicio_ventas.VentaError:
+                db.session.rollback()
+                resultado = 'sin stock'
+            except Exception as e:
+                db.session.rollback()
+                resultado = repr(e)
+            with candado:
+                resultados.append(resultado)
+
+    hilos = [threading.Thread(target=vender) for _ in range(HILOS)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    db.session.expire_all()
+    assert sorted(set(resultados)) == ['sin stock', 'vendida'], resultados
+    assert resultados.count('vendida') == stock_inicial
+    assert resultados.count('sin stock') == HILOS - stock_inicial
+    assert db.session.get(Producto, producto).stock == 0
+    assert Venta.query.count() == stock_inicial
+    assert db.session.query(db.func.sum(DetalleVenta.cantidad)).scalar() == stock_inicial
+    assert movimientos.inconsistencias() == []